@@ -6,37 +6,44 @@ Author: Your Name
 GitHub: https://github.com/yourusername/DiscordNumericBot
 """
 
-import asyncio
-import discord
-from discord.ext import commands
-import logging
 import sys
 from pathlib import Path
 
 # Добавляем корневую папку в путь
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.bot import NumericBot
+# Первым: отсчёт времени запуска (discord.py импортируется вместе с src.bot)
+from src.utils.startup import startup_timer
+from src.bot import create_bot
 from src.config import Config
-from src.utils.logger import setup_logger
+from src.utils.logger import configure_logging, setup_logger
+from src.utils.runtime import run
 
 # Настройка базового логирования
 logger = setup_logger('main')
 
 
-async def main():
+async def main(config: Config):
     """Главная функция запуска бота"""
     try:
-        # Загружаем конфигурацию
-        config = Config()
-        
         # Проверяем наличие токена
         if not config.token:
             logger.error("Токен бота не найден! Проверьте файл .env или переменные окружения.")
             return
         
+        # Кластерный режим: этот процесс только запускает воркеров
+        if config.cluster_workers > 1:
+            from src.cluster import ClusterSupervisor
+            logger.info("Запуск Discord Numeric Bot в кластерном режиме...")
+            await ClusterSupervisor(config).run()
+            return
+        
         # Инициализируем бота
-        bot = NumericBot(config)
+        startup_timer.record("импорт модулей", startup_timer.elapsed())
+        bot = create_bot(config)
+        
+        # SIGTERM (docker stop) и Ctrl+C: бот дорабатывает начатые команды и закрывается
+        bot.install_signal_handlers()
         
         # Запускаем бота
         logger.info("Запуск Discord Numeric Bot...")
@@ -53,5 +60,15 @@ async def main():
 
 
 if __name__ == "__main__":
+    # Загружаем конфигурацию: профиль выполнения применяется до запуска цикла событий
+    config = Config()
+    configure_logging(
+        config.logs_dir,
+        config.log_level,
+        config.log_format,
+        max_bytes=config.max_log_size_mb * 1024 * 1024,
+        retention_days=config.log_retention_days
+    )
+    
     # Запускаем асинхронную главную функцию
-    asyncio.run(main()) 
\ No newline at end of file
+    run(main(config), config.runtime_profile) 
\ No newline at end of file
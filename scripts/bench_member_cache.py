@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замер памяти кэша участников для профилей MEMORY_PROFILE
+
+Для каждого профиля в отдельном процессе строится синтетический большой
+сервер: GUILD_CREATE с участниками голосовых каналов (как присылает
+Discord), затем - если профиль загружает серверы при запуске - порции
+GUILD_MEMBERS_CHUNK со всеми участниками. Сравнивается RSS процесса до и
+после, без подключения к Discord.
+
+Использование:
+    python scripts/bench_member_cache.py --members 200000 --voice 500
+"""
+
+import argparse
+import gc
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+GUILD_ID = 100000000000000000
+BOT_ID = 900000000000000000
+CHUNK_SIZE = 1000
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса (МБ)"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def member_payload(user_id: int) -> dict:
+    return {
+        "user": {
+            "id": str(user_id),
+            "username": f"user{user_id % 1000000}",
+            "discriminator": "0",
+            "global_name": f"Участник {user_id % 1000000}",
+            "avatar": None
+        },
+        "nick": None,
+        "roles": [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0
+    }
+
+
+def measure(profile: str, members: int, voice: int) -> dict:
+    """Построить сервер в текущем процессе и вернуть замеры"""
+    import discord
+    from src.utils.members import member_cache_options
+
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.voice_states = True
+    options = member_cache_options(profile)
+    client = discord.Client(intents=intents, **options)
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=member_payload(BOT_ID)["user"])
+
+    gc.collect()
+    before = rss_mb()
+
+    voice_channel_id = GUILD_ID + 1
+    user_ids = [GUILD_ID + 10 + index for index in range(members)]
+    voice_ids = user_ids[:voice]
+
+    guild = discord.Guild(data={
+        "id": str(GUILD_ID),
+        "name": "Синтетический сервер",
+        "member_count": members,
+        "large": True,
+        "channels": [{"id": str(voice_channel_id), "type": 2, "name": "Голосовой", "position": 0,
+                      "bitrate": 64000, "user_limit": 0}],
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0}],
+        "voice_states": [
+            {"user_id": str(user_id), "channel_id": str(voice_channel_id), "session_id": "s",
+             "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+             "self_video": False, "suppress": False}
+            for user_id in voice_ids
+        ],
+        # Для больших серверов Discord присылает в GUILD_CREATE участников голосовых каналов
+        "members": [member_payload(user_id) for user_id in voice_ids]
+    }, state=state)
+    state._add_guild(guild)
+
+    if options["chunk_guilds_at_startup"]:
+        for start in range(0, members, CHUNK_SIZE):
+            for data in (member_payload(user_id) for user_id in user_ids[start:start + CHUNK_SIZE]):
+                guild._add_member(discord.Member(data=data, guild=guild, state=state))
+
+    del user_ids, voice_ids
+    gc.collect()
+    after = rss_mb()
+
+    return {
+        "profile": profile,
+        "cached_members": len(guild._members),
+        "voice_members": len(guild.get_channel(voice_channel_id).members),
+        "rss_delta_mb": round(after - before, 1),
+        "rss_total_mb": round(after, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер памяти кэша участников по профилям")
+    parser.add_argument("--members", type=int, default=200000, help="Участников на сервере")
+    parser.add_argument("--voice", type=int, default=500, help="Из них в голосовом канале")
+    parser.add_argument("--profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(measure(args.profile, args.members, args.voice)))
+        return
+
+    from src.utils.members import MEMORY_PROFILES
+
+    print(f"Сервер: {args.members} участников, {args.voice} в голосовом канале\n")
+    print(f"{'Профиль':<10}{'В кэше':>12}{'В голосе':>12}{'RSS +МБ':>12}{'RSS всего':>12}")
+    for profile in MEMORY_PROFILES:
+        # Отдельный процесс - чтобы освобождённая память не искажала замер
+        output = subprocess.run(
+            [sys.executable, __file__, "--profile", profile,
+             "--members", str(args.members), "--voice", str(args.voice)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{result['profile']:<10}{result['cached_members']:>12}{result['voice_members']:>12}"
+            f"{result['rss_delta_mb']:>12}{result['rss_total_mb']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замер профилей выполнения RUNTIME_PROFILE
+
+Цикл событий: пропускная способность стандартного asyncio и uvloop (если
+установлен) - создание и ожидание задач, передача сообщений через
+asyncio.Queue, обратные вызовы call_soon. JSON: разбор и сериализация
+настроек сервера и записей экспорта через utils.fastjson с json и orjson
+(если установлен). Подключение к Discord не нужно.
+
+Использование:
+    python scripts/bench_runtime.py --rounds 5
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils import fastjson
+from src.utils.runtime import HAS_UVLOOP
+
+TASKS = 50000
+QUEUE_MESSAGES = 100000
+CALLBACKS = 200000
+JSON_ITERATIONS = 20000
+
+
+async def bench_tasks() -> float:
+    async def noop():
+        await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(noop() for _ in range(TASKS)))
+    return TASKS / (time.perf_counter() - started)
+
+
+async def bench_queue() -> float:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+
+    async def producer():
+        for index in range(QUEUE_MESSAGES):
+            await queue.put(index)
+        await queue.put(None)
+
+    async def consumer():
+        while await queue.get() is not None:
+            pass
+
+    started = time.perf_counter()
+    await asyncio.gather(producer(), consumer())
+    return QUEUE_MESSAGES / (time.perf_counter() - started)
+
+
+async def bench_callbacks() -> float:
+    loop = asyncio.get_running_loop()
+    finished = loop.create_future()
+    remaining = CALLBACKS
+
+    def step():
+        nonlocal remaining
+        remaining -= 1
+        if remaining:
+            loop.call_soon(step)
+        else:
+            finished.set_result(None)
+
+    started = time.perf_counter()
+    loop.call_soon(step)
+    await finished
+    return CALLBACKS / (time.perf_counter() - started)
+
+
+LOOP_BENCHMARKS = {
+    "задачи/с": bench_tasks,
+    "очередь сообщ/с": bench_queue,
+    "call_soon/с": bench_callbacks,
+}
+
+
+def loop_factories() -> Dict[str, Callable[[], asyncio.AbstractEventLoop]]:
+    factories = {"asyncio": asyncio.new_event_loop}
+    if HAS_UVLOOP:
+        import uvloop
+        factories["uvloop"] = uvloop.new_event_loop
+    return factories
+
+
+def sample_settings() -> dict:
+    """Настройки сервера, близкие к реальным: префикс, роли, каналы, форматы"""
+    return {
+        "prefix": "?",
+        "host_roles": [100000000000000000 + index for index in range(20)],
+        "admin_roles": [200000000000000000 + index for index in range(5)],
+        "log_channel": 300000000000000000,
+        "number_format": "{number:02d}. {name}",
+        "ignored_channels": [400000000000000000 + index for index in range(30)],
+        "language": "ru",
+        "welcome": "Добро пожаловать на игру! Номера раздаёт ведущий.",
+        "limits": {"max_participants": 25, "cooldown": 30}
+    }
+
+
+def sample_record() -> dict:
+    """Запись журнала действий в формате экспорта"""
+    return {
+        "type": "action_log",
+        "data": {
+            "log_id": 123456,
+            "guild_id": 100000000000000000,
+            "user_id": 500000000000000000,
+            "action": "number_command",
+            "details": "Канал: Игровая комната, Участников: 12",
+            "timestamp": "2024-05-01 18:30:00"
+        }
+    }
+
+
+def bench_json(backend_fast: bool) -> Dict[str, float]:
+    """Микросекунд на операцию"""
+    fastjson.use_fast_json(backend_fast)
+    settings = sample_settings()
+    record = sample_record()
+    encoded = fastjson.dumps(settings)
+
+    results = {}
+    for name, func in (
+        ("loads настроек", lambda: fastjson.loads(encoded)),
+        ("dumps настроек", lambda: fastjson.dumps(settings)),
+        ("dumps записи", lambda: fastjson.dumps(record)),
+    ):
+        started = time.perf_counter()
+        for _ in range(JSON_ITERATIONS):
+            func()
+        results[name] = (time.perf_counter() - started) / JSON_ITERATIONS * 1e6
+    fastjson.use_fast_json(False)
+    return results
+
+
+def best_of(rounds: int, measure: Callable[[], float], higher_is_better: bool = True) -> float:
+    values: List[float] = [measure() for _ in range(rounds)]
+    return max(values) if higher_is_better else min(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер профилей выполнения")
+    parser.add_argument("--rounds", type=int, default=3, help="Повторов каждого замера (берётся лучший)")
+    args = parser.parse_args()
+
+    print("Цикл событий (лучший из повторов, больше - лучше)\n")
+    names = list(LOOP_BENCHMARKS)
+    print(f"{'Цикл':<10}" + "".join(f"{name:>18}" for name in names))
+    for loop_name, factory in loop_factories().items():
+        row = []
+        for bench in LOOP_BENCHMARKS.values():
+            def measure():
+                loop = factory()
+                try:
+                    return loop.run_until_complete(bench())
+                finally:
+                    loop.close()
+            row.append(best_of(args.rounds, measure))
+        print(f"{loop_name:<10}" + "".join(f"{value:>18,.0f}" for value in row))
+    if not HAS_UVLOOP:
+        print("uvloop не установлен: pip install uvloop")
+
+    print("\nJSON (мкс на операцию, меньше - лучше)\n")
+    backends = [("json", False)] + ([("orjson", True)] if fastjson.HAS_ORJSON else [])
+    columns = list(bench_json(False))
+    print(f"{'JSON':<10}" + "".join(f"{name:>18}" for name in columns))
+    for backend_name, fast in backends:
+        results = [bench_json(fast) for _ in range(args.rounds)]
+        row = [min(result[name] for result in results) for name in columns]
+        print(f"{backend_name:<10}" + "".join(f"{value:>18.2f}" for value in row))
+    if not fastjson.HAS_ORJSON:
+        print("orjson не установлен: pip install orjson")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Онлайн-резервные копии базы SQLite
+
+Копия снимается через backup API SQLite из отдельного соединения в
+отдельном потоке, по несколько страниц за шаг. База работает в режиме
+WAL, а соединение копирования держит транзакцию чтения: снимок
+согласован, и запись бота во время копирования не ждёт и не
+перезапускает её.
+Готовый снимок проверяется PRAGMA integrity_check, сжимается и
+ротируется (хранятся последние N копий каждого файла).
+
+Файлы копий: <backup_dir>/<имя_бд>_YYYYMMDD_HHMMSS.db[.gz]
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def sqlite_files(storage) -> List[Path]:
+    """Файлы SQLite хранилища (пусто для PostgreSQL и хранилища в памяти)"""
+    from .database import Database
+    from .storage.partitioned import PartitionedDatabase
+
+    if isinstance(storage, PartitionedDatabase):
+        return [Path(partition.db_path) for partition in storage.partitions]
+    if isinstance(storage, Database):
+        return [Path(storage.db_path)]
+    return []
+
+
+class SQLiteBackup:
+    """Снятие, проверка и ротация копий файлов SQLite"""
+
+    def __init__(self, backup_dir: Path, keep: int = 7, compress: bool = True,
+                 pages_per_step: int = 64, step_pause: float = 0.005):
+        """
+        Инициализация
+
+        Args:
+            backup_dir: Директория для копий
+            keep: Сколько последних копий каждого файла хранить
+            compress: Сжимать копии gzip
+            pages_per_step: Страниц за один шаг backup API
+            step_pause: Пауза между шагами (с), на время которой база свободна
+        """
+        self.backup_dir = Path(backup_dir)
+        self.keep = keep
+        self.compress = compress
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause
+
+    async def run(self, sources: List[Path], min_age_hours: float = 0) -> List[Path]:
+        """
+        Снять копии файлов базы
+
+        Args:
+            sources: Файлы SQLite
+            min_age_hours: Пропустить файл, если его последней копии меньше стольких часов
+
+        Returns:
+            Пути созданных копий
+        """
+        created = []
+        for source in sources:
+            age = self._latest_age_hours(source)
+            if age is not None and age < min_age_hours:
+                logger.debug(f"Копия {source.name} свежая ({age:.1f} ч), пропускаем")
+                continue
+            created.append(await asyncio.to_thread(self._backup_file, source))
+            await asyncio.to_thread(self._rotate, source)
+        return created
+
+    def _snapshots(self, source: Path) -> List[Path]:
+        """Копии файла, от старых к новым (имя содержит время)"""
+        return sorted(
+            path for path in self.backup_dir.glob(f"{source.stem}_*.db*")
+            if not path.name.endswith(".tmp")
+        )
+
+    def _latest_age_hours(self, source: Path) -> Optional[float]:
+        snapshots = self._snapshots(source)
+        if not snapshots:
+            return None
+        return (datetime.now().timestamp() - snapshots[-1].stat().st_mtime) / 3600
+
+    def _backup_file(self, source: Path) -> Path:
+        """Снять, проверить и сжать копию одного файла (выполняется в потоке)"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{source.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+        snapshot = self.backup_dir / f"{name}.tmp"
+        started = datetime.now()
+
+        try:
+            src = sqlite3.connect(source, isolation_level=None)
+            dst = sqlite3.connect(snapshot)
+            try:
+                if src.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+                    # Открытая транзакция чтения фиксирует снимок: запись бота
+                    # идёт параллельно и не перезапускает копирование
+                    src.execute("BEGIN")
+                    src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+                    src.backup(dst, pages=self.pages_per_step, sleep=self.step_pause)
+                    src.execute("COMMIT")
+                else:
+                    # Без WAL любая запись перезапускает пошаговую копию - копируем за один шаг
+                    src.backup(dst)
+                result = dst.execute("PRAGMA integrity_check").fetchone()[0]
+                if result != "ok":
+                    raise sqlite3.DatabaseError(f"integrity_check: {result}")
+            finally:
+                dst.close()
+                src.close()
+
+            if self.compress:
+                target = self.backup_dir / f"{name}.gz"
+                packed = self.backup_dir / f"{name}.gz.tmp"
+                with open(snapshot, 'rb') as f_in, gzip.open(packed, 'wb') as f_out:
+                    shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+                os.replace(packed, target)
+                snapshot.unlink()
+            else:
+                target = self.backup_dir / name
+                os.replace(snapshot, target)
+        except BaseException:
+            for leftover in (snapshot, self.backup_dir / f"{name}.gz.tmp"):
+                leftover.unlink(missing_ok=True)
+            raise
+
+        elapsed = (datetime.now() - started).total_seconds()
+        logger.info(
+            f"Резервная копия {source.name} -> {target.name} "
+            f"({target.stat().st_size / 1024:.0f} КБ, {elapsed:.1f} с)"
+        )
+        return target
+
+    def _rotate(self, source: Path) -> None:
+        """Удалить копии сверх лимита (выполняется в потоке)"""
+        snapshots = self._snapshots(source)
+        for old in snapshots[:max(0, len(snapshots) - self.keep)]:
+            old.unlink(missing_ok=True)
+            logger.debug(f"Удалена старая копия {old.name}")
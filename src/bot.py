@@ -6,20 +6,43 @@
 import discord
 from discord.ext import commands
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 import asyncio
+import hashlib
+import importlib.util
+import json
+import signal
 from datetime import datetime
 
 from .config import Config
-from .database import Database
-from .utils.logger import setup_logger
+from .storage import StorageBackend, create_storage
+from .utils.admission import AdmissionController, BotOverloaded
+from .utils.config_watcher import ConfigWatcher
+from .utils.guild_state import GuildStateRegistry
+from .utils.jobs import JobTracker
+from .utils.logger import DiscordLogHandler, attach_log_handler, detach_log_handler, setup_logger
+from .utils.members import member_cache_options
 from .utils.permissions import PermissionSystem
-from .cogs.numbering import NumberingCog
-from .cogs.admin import AdminCog
-from .cogs.settings import SettingsCog
+from .utils.presence import PresenceManager
+from .utils.prefixes import PrefixCache
+from .utils.process_lock import ProcessLock
+from .utils.startup import startup_timer
+from .utils.users import UserResolver
 
 logger = setup_logger('bot')
 
+# Ключ хэша последнего синхронизированного дерева slash-команд
+COMMAND_TREE_META_KEY = "command_tree_hash"
+
+# Расширения (модули команд) и флаги Config.features, которыми они отключаются
+# (None - модуль нельзя отключить). Модуль импортируется только при загрузке.
+EXTENSIONS = {
+    ".cogs.numbering": None,
+    ".cogs.admin": "admin_commands",
+    ".cogs.settings": "settings_commands",
+    ".cogs.maintenance": "maintenance",
+}
+
 
 class NumericBot(commands.Bot):
     """Главный класс Discord бота для нумерации участников"""
@@ -40,14 +63,33 @@ class NumericBot(commands.Bot):
         
         # Инициализация родительского класса
         super().__init__(
-            command_prefix=config.prefix,
+            command_prefix=self._command_prefix,
             intents=intents,
-            help_command=self._create_help_command()
+            help_command=self._create_help_command(),
+            **member_cache_options(config.memory_profile),
+            **self._client_options(config)
         )
         
         self.config = config
-        self.db: Optional[Database] = None
+        self.db: Optional[StorageBackend] = None
         self.permission_system: Optional[PermissionSystem] = None
+        self.presence = PresenceManager(self, config.presence_update_interval)
+        self.user_resolver = UserResolver(self)
+        self.guild_states = GuildStateRegistry(config.guild_state_max, config.guild_state_ttl)
+        self.prefixes = PrefixCache(self, config.prefix)
+        self.admission = AdmissionController(
+            self,
+            config.rate_limits,
+            max_rename_backlog=config.shed_rename_backlog,
+            max_loop_lag=config.shed_loop_lag_ms / 1000,
+            enabled=config.admission_control
+        )
+        self.jobs = JobTracker()
+        self.config_watcher = ConfigWatcher(self, config.config_watch_interval)
+        self._shutdown_task: Optional[asyncio.Task] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._setup_finished = 0.0
+        self.log_alerts: Optional[DiscordLogHandler] = None
         self.start_time = datetime.utcnow()
         
     def _create_help_command(self) -> commands.HelpCommand:
@@ -62,87 +104,228 @@ class NumericBot(commands.Bot):
         )
         return help_command
         
+    async def _command_prefix(self, bot, message: discord.Message) -> str:
+        """Префикс команд сервера (BOT_PREFIX, если свой не задан)"""
+        return await self.prefixes.get(message.guild.id if message.guild else None)
+        
+    @staticmethod
+    def _client_options(config: Config) -> Dict[str, Any]:
+        """Дополнительные параметры клиента discord.py"""
+        return {}
+        
+    @property
+    def owns_all_shards(self) -> bool:
+        """Обслуживает ли процесс все серверы бота (а не часть шардов)"""
+        return True
+        
+    def shard_latencies(self) -> List[Tuple[int, float]]:
+        """Задержка шлюза по шардам: [(shard_id, секунды), ...]"""
+        return [(self.shard_id or 0, self.latency)]
+        
+    def exclusive(self, name: str, wait: bool = False) -> ProcessLock:
+        """
+        Блокировка операции, которая выполняется одним процессом на весь кластер
+        
+        Args:
+            name: Имя операции (имя файла блокировки)
+            wait: Дождаться освобождения вместо пропуска
+            
+        Returns:
+            Контекстный менеджер: ``async with bot.exclusive("backup") as acquired``
+        """
+        return ProcessLock(self.config.cluster_lock_dir / f"{name}.lock", wait=wait)
+        
     async def setup_hook(self):
         """Настройка бота перед запуском"""
         logger.info("Инициализация компонентов бота...")
+        started = startup_timer.elapsed()
         
-        # Инициализация базы данных
-        self.db = Database(self.config.database_path)
-        await self.db.initialize()
-        logger.info("База данных инициализирована")
-        
-        # Инициализация системы прав
+        # Объект хранилища нужен модулям сразу, подключение - только их командам
+        self.db = create_storage(self.config)
         self.permission_system = PermissionSystem(self.db, self.config)
-        logger.info("Система прав инициализирована")
         
-        # Загрузка модулей (cogs)
-        await self.load_cogs()
+        # Контроль допуска для всех текстовых команд - после проверок прав
+        self.before_invoke(self.admission.admit)
+        self.admission.start()
+        self.guild_states.start()
+        
+        # Уведомления об ошибках в канал
+        if self.config.log_channel_id:
+            self.log_alerts = DiscordLogHandler(
+                self, self.config.log_channel_id, interval=self.config.log_alert_interval
+            )
+            await asyncio.to_thread(attach_log_handler, self.log_alerts)
+            self.log_alerts.start()
+            
+        # Изменения config.json применяются без перезапуска
+        if self.config.config_watch_interval > 0:
+            self.config_watcher.start()
         
-        # Синхронизация команд
+        # Подключение к базе и загрузка модулей не зависят друг от друга
+        await asyncio.gather(self._initialize_storage(), self.load_extensions())
+        
+        # Синхронизация команд (только если они изменились) - в фоне, не задерживая подключение к шлюзу
         if self.config.sync_commands_on_start:
-            await self.sync_commands()
-            
-    async def load_cogs(self):
-        """Загрузка всех модулей бота"""
-        cogs = [
-            NumberingCog(self),
-            AdminCog(self),
-            SettingsCog(self)
-        ]
-        
-        for cog in cogs:
-            await self.add_cog(cog)
-            logger.info(f"Загружен модуль: {cog.__class__.__name__}")
-            
-    async def sync_commands(self):
-        """Синхронизация slash-команд с Discord"""
+            self._sync_task = asyncio.create_task(
+                self.sync_commands(force=self.config.force_command_sync)
+            )
+            
+        self._setup_finished = startup_timer.elapsed()
+        startup_timer.record("setup_hook", self._setup_finished - started)
+        
+    async def _initialize_storage(self):
+        with startup_timer.phase("база данных"):
+            await self.db.initialize()
+        logger.info("База данных инициализирована")
+        
+    async def load_extensions(self):
+        """Загрузка модулей бота, включённых в Config.features"""
+        for name, feature in EXTENSIONS.items():
+            if feature and not self.config.features.get(feature, True):
+                logger.info(f"Модуль {name} отключён (features.{feature})")
+                continue
+                
+            short_name = name.rsplit('.', 1)[-1]
+            with startup_timer.phase(f"модуль {short_name}"):
+                await self.load_extension(name, package=__package__)
+            logger.info(f"Загружен модуль: {short_name}")
+            
+    async def apply_features(self) -> List[str]:
+        """
+        Загрузить и выгрузить модули после изменения Config.features
+        
+        Returns:
+            Модули, которые были загружены или выгружены
+        """
+        changed = []
+        for name, feature in EXTENSIONS.items():
+            if not feature:
+                continue
+            enabled = self.config.features.get(feature, True)
+            loaded = importlib.util.resolve_name(name, __package__) in self.extensions
+            short_name = name.rsplit('.', 1)[-1]
+            
+            if enabled and not loaded:
+                await self.load_extension(name, package=__package__)
+                logger.info(f"Загружен модуль: {short_name} (features.{feature})")
+            elif loaded and not enabled:
+                await self.unload_extension(name, package=__package__)
+                logger.info(f"Модуль {short_name} выгружен (features.{feature})")
+            else:
+                continue
+            changed.append(short_name)
+            
+        # Набор slash-команд изменился - синхронизируем (по хэшу, как при запуске)
+        if changed and (self._sync_task is None or self._sync_task.done()):
+            self._sync_task = asyncio.create_task(self.sync_commands())
+        return changed
+        
+
+    def command_tree_hash(self) -> str:
+        """Стабильный хэш глобальных slash-команд в том виде, в котором они уходят в Discord"""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda command: (command.get('type', 1), command['name'])
+        )
+        data = json.dumps(
+            {"application_id": self.application_id, "commands": payload},
+            sort_keys=True, ensure_ascii=False, separators=(',', ':')
+        )
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+        
+    async def sync_commands(self, force: bool = False):
+        """
+        Синхронизация slash-команд с Discord
+        
+        Args:
+            force: Синхронизировать, даже если команды не изменились
+        """
         try:
-            synced = await self.tree.sync()
-            logger.info(f"Синхронизировано {len(synced)} команд")
+            # Воркеры кластера синхронизируют по очереди: следующий увидит сохранённый хэш
+            async with self.exclusive("command_sync", wait=True):
+                await self._sync_commands(force)
         except Exception as e:
             logger.error(f"Ошибка синхронизации команд: {e}")
             
+    async def _sync_commands(self, force: bool):
+        tree_hash = self.command_tree_hash()
+        stored_hash = await self.db.get_meta(COMMAND_TREE_META_KEY)
+        
+        if force:
+            reason = "принудительно (FORCE_COMMAND_SYNC)"
+        elif stored_hash is None:
+            reason = "хэш команд ещё не сохранён"
+        elif stored_hash != tree_hash:
+            reason = f"команды изменились ({stored_hash[:12]} -> {tree_hash[:12]})"
+        else:
+            logger.info(f"Команды не изменились ({tree_hash[:12]}), синхронизация пропущена")
+            return
+            
+        logger.info(f"Синхронизация команд: {reason}")
+        synced = await self.tree.sync()
+        await self.db.set_meta(COMMAND_TREE_META_KEY, tree_hash)
+        logger.info(f"Синхронизировано {len(synced)} команд")
+        
     async def on_ready(self):
         """Событие готовности бота"""
         logger.info(f"Бот {self.user} готов к работе!")
         logger.info(f"ID бота: {self.user.id}")
         logger.info(f"Количество серверов: {len(self.guilds)}")
-        logger.info(f"Префикс команд: {self.config.prefix}")
+        logger.info(f"Префикс команд по умолчанию: {self.config.prefix}")
         
-        # Установка статуса
-        await self.change_presence(
-            activity=discord.Activity(
-                type=discord.ActivityType.watching,
-                name=f"{len(self.guilds)} серверов | {self.config.prefix}help"
+        if startup_timer.ready():
+            startup_timer.record("подключение к шлюзу", startup_timer.ready_after - self._setup_finished)
+            logger.info(f"Время запуска: {startup_timer.summary()}")
+            
+        # Сверка серверов с базой: добавленные, пока бот был офлайн, и покинутые
+        try:
+            # Процесс с частью шардов не видит остальные серверы и
+            # отмечает покинутыми только серверы своих шардов
+            result = await self.db.reconcile_guilds(
+                [(guild.id, guild.name) for guild in self.guilds],
+                shard_count=None if self.owns_all_shards else self.shard_count,
+                shard_ids=None if self.owns_all_shards else self.shard_ids
             )
-        )
+            logger.info(
+                f"Серверы сверены с базой: новых {result['added']}, покинутых {result['left']}"
+            )
+        except Exception as e:
+            logger.error(f"Ошибка сверки серверов с базой: {e}", exc_info=e)
+            
+        # Установка статуса (после нового подключения к шлюзу статус сброшен)
+        self.presence.request_update(force=True)
+        
+    async def on_message(self, message: discord.Message):
+        """Обработка текстовых команд"""
+        # Обычный чат отсеивается по префиксу из памяти, без создания Context
+        if not await self.prefixes.is_command_candidate(message):
+            return
+        if not self.jobs.accepting:
+            await message.channel.send("🔄 Бот перезапускается, повторите команду через минуту.")
+            return
+        await self.process_commands(message)
         
     async def on_guild_join(self, guild: discord.Guild):
         """Событие присоединения к новому серверу"""
         logger.info(f"Бот добавлен на сервер: {guild.name} (ID: {guild.id})")
         
-        # Создание записи в базе данных для нового сервера
-        await self.db.ensure_guild_exists(guild.id)
+        # Создание записи в базе данных (или отмена удаления, если бот вернулся)
+        await self.db.reconcile_guilds([(guild.id, guild.name)], mark_missing=False)
         
         # Обновление статуса
-        await self.change_presence(
-            activity=discord.Activity(
-                type=discord.ActivityType.watching,
-                name=f"{len(self.guilds)} серверов | {self.config.prefix}help"
-            )
-        )
+        self.presence.request_update()
         
     async def on_guild_remove(self, guild: discord.Guild):
         """Событие удаления с сервера"""
         logger.info(f"Бот удалён с сервера: {guild.name} (ID: {guild.id})")
         
+        # Данные удалятся в фоне после отсрочки (GUILD_DATA_GRACE_DAYS)
+        await self.db.mark_guild_left(guild.id)
+        self.guild_states.forget(guild.id)
+        self.prefixes.forget(guild.id)
+        
         # Обновление статуса
-        await self.change_presence(
-            activity=discord.Activity(
-                type=discord.ActivityType.watching,
-                name=f"{len(self.guilds)} серверов | {self.config.prefix}help"
-            )
-        )
+        self.presence.request_update()
         
     async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
         """Обработка ошибок команд"""
@@ -155,6 +338,9 @@ class NumericBot(commands.Bot):
         elif isinstance(error, commands.BadArgument):
             await ctx.send(f"❌ Неверный аргумент: {error}")
             
+        elif isinstance(error, BotOverloaded):
+            await ctx.send("⏳ Бот сейчас перегружен, попробуйте эту команду чуть позже.")
+            
         elif isinstance(error, commands.CheckFailure):
             await ctx.send("❌ У вас недостаточно прав для выполнения этой команды.")
             
@@ -165,13 +351,149 @@ class NumericBot(commands.Bot):
             logger.error(f"Ошибка в команде {ctx.command}: {error}", exc_info=error)
             await ctx.send("❌ Произошла неизвестная ошибка. Администраторы уведомлены.")
             
+    def install_signal_handlers(self, signals=(signal.SIGTERM, signal.SIGINT)) -> None:
+        """
+        Останавливать бота корректно по сигналам (docker stop, systemctl stop, Ctrl+C)
+        
+        Повторный сигнал во время остановки прерывает ожидание команд.
+        """
+        loop = asyncio.get_running_loop()
+        for sig in signals:
+            try:
+                loop.add_signal_handler(sig, self._on_signal, sig)
+            except (NotImplementedError, RuntimeError):
+                # Windows: остаётся KeyboardInterrupt
+                pass
+                
+    def _on_signal(self, sig: signal.Signals) -> None:
+        if self._shutdown_task is None:
+            logger.info(f"Получен сигнал {sig.name}, остановка...")
+            asyncio.create_task(self.close())
+        else:
+            logger.warning(f"Повторный сигнал {sig.name}: команды прерываются немедленно")
+            asyncio.create_task(self.jobs.cancel_all())
+            
     async def close(self):
-        """Корректное закрытие бота"""
+        """
+        Корректное закрытие бота
+        
+        Повторные вызовы ждут уже начатую остановку.
+        """
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.create_task(self._shutdown())
+        await self._shutdown_task
+        
+    async def _shutdown(self):
         logger.info("Закрытие соединений...")
         
+        # Новые команды не принимаются, начатые дорабатывают
+        self.jobs.stop_accepting()
+        interrupted = await self.jobs.drain(self.config.shutdown_timeout)
+        for job in interrupted:
+            await self._report_interrupted(job)
+            
+        self.presence.stop()
+        self.admission.stop()
+        self.config_watcher.stop()
+        self.guild_states.stop()
+        if self._sync_task and not self._sync_task.done():
+            self._sync_task.cancel()
+        
+        # Выгрузка модулей: фоновые задачи останавливаются, открытые сессии завершаются
+        for name in list(self.extensions):
+            try:
+                await self.unload_extension(name)
+            except Exception as e:
+                logger.error(f"Ошибка выгрузки модуля {name}: {e}", exc_info=e)
+                
         # Закрытие базы данных
         if self.db:
             await self.db.close()
             
+        # Последние уведомления об ошибках - пока соединение с Discord открыто
+        if self.log_alerts:
+            # Перезапуск потока логов ждёт записи очереди - не в цикле событий
+            await asyncio.to_thread(detach_log_handler, self.log_alerts)
+            await self.log_alerts.stop()
+            
         # Вызов родительского метода закрытия
-        await super().close() 
\ No newline at end of file
+        await super().close()
+        
+    async def _report_interrupted(self, job) -> None:
+        """Записать прогресс прерванной остановкой команды и предупредить её автора"""
+        logger.warning(f"Команда {job.name} прервана остановкой бота (сервер {job.guild_id}, выполнено {job.progress})")
+        try:
+            if self.db and job.guild_id:
+                await self.db.log_action(
+                    job.guild_id,
+                    job.user_id,
+                    f"{job.name}_interrupted",
+                    f"Прервано остановкой бота, выполнено: {job.progress}"
+                )
+            await job.channel.send(
+                f"⚠️ Бот перезапускается: команда `{job.name}` прервана (выполнено {job.progress}). "
+                f"Повторите её после перезапуска."
+            )
+        except Exception as e:
+            logger.error(f"Не удалось сообщить о прерванной команде {job.name}: {e}")
+
+
+class ShardedNumericBot(NumericBot, commands.AutoShardedBot):
+    """Бот с автоматическим шардингом: отдельное соединение со шлюзом на каждый шард"""
+    
+    @staticmethod
+    def _client_options(config: Config) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"shard_count": config.shard_count}
+        if config.shard_ids:
+            options["shard_ids"] = config.shard_ids
+        return options
+        
+    @property
+    def owns_all_shards(self) -> bool:
+        return not self.shard_ids or len(self.shard_ids) >= (self.shard_count or 0)
+        
+    def shard_latencies(self) -> List[Tuple[int, float]]:
+        return sorted(self.latencies)
+        
+    def _shard_guild_count(self, shard_id: int) -> int:
+        return sum(1 for guild in self.guilds if guild.shard_id == shard_id)
+        
+    async def on_shard_connect(self, shard_id: int):
+        """Шард подключился к шлюзу"""
+        logger.info(f"Шард {shard_id} подключён к шлюзу")
+        
+    async def on_shard_ready(self, shard_id: int):
+        """Шард получил все свои серверы"""
+        logger.info(f"Шард {shard_id} готов, серверов: {self._shard_guild_count(shard_id)}")
+        
+        # После новой сессии шлюза статус шарда сброшен
+        if self.is_ready():
+            self.presence.request_update(force=True)
+            
+    async def on_shard_resumed(self, shard_id: int):
+        """Шард восстановил сессию после обрыва"""
+        logger.info(f"Шард {shard_id} восстановил сессию")
+        
+    async def on_shard_disconnect(self, shard_id: int):
+        """Шард потерял соединение со шлюзом"""
+        logger.warning(f"Шард {shard_id} отключён от шлюза")
+
+
+def create_bot(config: Config) -> NumericBot:
+    """
+    Создать бота с учётом настроек шардинга
+    
+    Args:
+        config: Объект конфигурации
+        
+    Returns:
+        NumericBot или ShardedNumericBot (AUTO_SHARD=true)
+    """
+    if not config.auto_shard:
+        return NumericBot(config)
+        
+    logger.info(
+        f"Автоматический шардинг: шардов {config.shard_count or 'по рекомендации Discord'}, "
+        f"шарды процесса: {config.shard_ids or 'все'}"
+    )
+    return ShardedNumericBot(config)
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Кластерный режим: несколько процессов бота с диапазонами шардов
+
+Один процесс Python использует одно ядро, поэтому при большом числе
+серверов бот запускается набором процессов-воркеров. Каждый воркер - это
+ShardedNumericBot со своим непрерывным диапазоном шардов, а супервизор
+(процесс main.py) только запускает воркеров и перезапускает упавших.
+
+Подключения к шлюзу (IDENTIFY) Discord разрешает не чаще max_concurrency
+за 5 секунд, поэтому воркеры стартуют по расписанию: воркер ждёт, пока
+шарды предыдущих воркеров успеют подключиться.
+
+Операции, которые должны выполняться один раз на кластер (синхронизация
+команд, архивация журнала, резервные копии), воркеры выполняют под
+межпроцессной блокировкой (NumericBot.exclusive).
+"""
+
+import asyncio
+import multiprocessing
+import signal
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import discord
+
+from .config import Config
+from .storage import create_storage
+from .utils.jobs import CANCEL_GRACE
+from .utils.logger import configure_logging, setup_logger
+from .utils.process_lock import HAS_FCNTL
+from .utils.runtime import run
+
+logger = setup_logger('cluster')
+
+# Окно лимита IDENTIFY (сек) на одну «корзину» max_concurrency
+IDENTIFY_INTERVAL = 5.0
+
+# Перезапуск упавшего воркера: начальная и максимальная пауза (сек)
+RESTART_DELAY = 5.0
+RESTART_DELAY_MAX = 300.0
+
+# Воркер, проработавший дольше (сек), считается стабильным - пауза сбрасывается
+STABLE_UPTIME = 60.0
+
+# Код выхода воркера, после которого перезапуск бесполезен (неверный токен и т.п.)
+EXIT_FATAL = 3
+
+# Запас к SHUTDOWN_TIMEOUT + CANCEL_GRACE при ожидании воркера после SIGTERM (сек):
+# выгрузка модулей, закрытие хранилища и соединения с Discord
+STOP_MARGIN = 10.0
+
+
+def shard_ranges(shard_count: int, workers: int) -> List[List[int]]:
+    """
+    Разбить шарды на непрерывные диапазоны почти равного размера
+
+    Args:
+        shard_count: Общее число шардов
+        workers: Число воркеров (не больше числа шардов)
+
+    Returns:
+        Списки ID шардов по воркерам
+    """
+    base, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for index in range(workers):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def identify_delay(shard_ids: List[int], max_concurrency: int) -> float:
+    """Задержка старта воркера: шарды до его первого шарда подключаются раньше"""
+    return (shard_ids[0] // max_concurrency) * IDENTIFY_INTERVAL
+
+
+async def fetch_gateway_info(token: str) -> Tuple[int, int]:
+    """
+    Рекомендованное число шардов и max_concurrency из /gateway/bot
+
+    Returns:
+        (shards, max_concurrency)
+    """
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, session_start_limit = await http.get_bot_gateway()
+        return shards, session_start_limit.get('max_concurrency', 1)
+    finally:
+        await http.close()
+
+
+def run_worker(worker_id: int, shard_ids: List[int], shard_count: int) -> None:
+    """Точка входа процесса-воркера"""
+    # Ctrl+C получает вся группа процессов - воркеров останавливает супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    config = Config()
+    configure_logging(
+        config.logs_dir,
+        config.log_level,
+        config.log_format,
+        file_name=f"worker{worker_id}",
+        max_bytes=config.max_log_size_mb * 1024 * 1024,
+        retention_days=config.log_retention_days
+    )
+    sys.exit(run(_worker_main(config, worker_id, shard_ids, shard_count), config.runtime_profile))
+
+
+async def _worker_main(config: Config, worker_id: int, shard_ids: List[int], shard_count: int) -> int:
+    from .bot import create_bot
+
+    config.auto_shard = True
+    config.shard_count = shard_count
+    config.shard_ids = shard_ids
+
+    bot = create_bot(config)
+    bot.install_signal_handlers((signal.SIGTERM,))
+
+    logger.info(f"Воркер {worker_id}: шарды {shard_ids[0]}-{shard_ids[-1]} из {shard_count}")
+    try:
+        await bot.start(config.token)
+    except (discord.LoginFailure, discord.PrivilegedIntentsRequired) as e:
+        logger.error(f"Воркер {worker_id}: {e}")
+        return EXIT_FATAL
+    finally:
+        await bot.close()
+    return 0
+
+
+class _Worker:
+    """Состояние одного воркера в супервизоре"""
+
+    def __init__(self, worker_id: int, shard_ids: List[int]):
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+        self.process: Optional[multiprocessing.Process] = None
+        self.started_at = 0.0
+        self.restart_delay = RESTART_DELAY
+        self.restart_at: Optional[float] = None
+
+
+class ClusterSupervisor:
+    """Запуск, наблюдение и перезапуск процессов-воркеров"""
+
+    def __init__(self, config: Config):
+        """
+        Инициализация
+
+        Args:
+            config: Объект конфигурации (CLUSTER_WORKERS, SHARD_COUNT)
+        """
+        self.config = config
+        # Воркер дорабатывает команды, отменяет не успевшие и закрывается
+        self.stop_timeout = config.shutdown_timeout + CANCEL_GRACE + STOP_MARGIN
+        self.workers: List[_Worker] = []
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = asyncio.Event()
+
+    def _check_environment(self) -> bool:
+        if not HAS_FCNTL:
+            logger.error("Кластерный режим требует fcntl (Linux/macOS)")
+            return False
+        if not create_storage(self.config).supports_multiprocess:
+            logger.error(
+                "Кластерный режим требует хранилища, общего для процессов "
+                "(DATABASE_URL=postgresql://...)"
+            )
+            return False
+        return True
+
+    async def run(self) -> None:
+        """Запустить кластер и наблюдать за воркерами до остановки"""
+        if not self._check_environment():
+            return
+
+        recommended, max_concurrency = await fetch_gateway_info(self.config.token)
+        shard_count = self.config.shard_count or recommended
+        workers = max(1, min(self.config.cluster_workers, shard_count))
+
+        self.workers = [
+            _Worker(worker_id, shard_ids)
+            for worker_id, shard_ids in enumerate(shard_ranges(shard_count, workers))
+        ]
+        logger.info(
+            f"Кластер: {workers} воркеров, {shard_count} шардов, "
+            f"одновременных подключений: {max_concurrency}"
+        )
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        now = time.monotonic()
+        for worker in self.workers:
+            worker.restart_at = now + identify_delay(worker.shard_ids, max_concurrency)
+
+        try:
+            await self._supervise(shard_count)
+        finally:
+            await self._stop_workers()
+
+    async def _supervise(self, shard_count: int) -> None:
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            for worker in self.workers:
+                if worker.restart_at is not None:
+                    if now >= worker.restart_at:
+                        self._start(worker, shard_count)
+                    continue
+
+                if worker.process.is_alive():
+                    continue
+
+                exitcode = worker.process.exitcode
+                if exitcode == EXIT_FATAL:
+                    logger.error(f"Воркер {worker.worker_id} завершился с фатальной ошибкой, кластер останавливается")
+                    self._stopping.set()
+                    return
+
+                if now - worker.started_at >= STABLE_UPTIME:
+                    worker.restart_delay = RESTART_DELAY
+                logger.warning(
+                    f"Воркер {worker.worker_id} завершился (код {exitcode}), "
+                    f"перезапуск через {worker.restart_delay:.0f} с"
+                )
+                worker.restart_at = now + worker.restart_delay
+                worker.restart_delay = min(worker.restart_delay * 2, RESTART_DELAY_MAX)
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+
+    def _start(self, worker: _Worker, shard_count: int) -> None:
+        worker.process = self._context.Process(
+            target=run_worker,
+            args=(worker.worker_id, worker.shard_ids, shard_count),
+            name=f"numericbot-worker-{worker.worker_id}"
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        logger.info(f"Запущен воркер {worker.worker_id} (PID {worker.process.pid})")
+
+    async def _stop_workers(self) -> None:
+        running = [w.process for w in self.workers if w.process and w.process.is_alive()]
+        if not running:
+            return
+
+        logger.info(f"Остановка воркеров: {len(running)}")
+        for process in running:
+            process.terminate()
+
+        deadline = time.monotonic() + self.stop_timeout
+        for process in running:
+            await asyncio.to_thread(process.join, max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Воркер {process.name} не завершился за {self.stop_timeout:.0f} с, принудительная остановка")
+                process.kill()
+                await asyncio.to_thread(process.join)
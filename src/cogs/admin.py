@@ -11,11 +11,93 @@ from typing import Optional, Union
 import logging
 
 from ..utils.permissions import requires_admin
+from ..utils.periods import PeriodConverter, PERIOD_TITLES
 from ..utils.logger import get_logger
+from ..utils.prefixes import PREFIX_MAX_LENGTH
 
 logger = get_logger(__name__)
 
 
+class LogsPaginator(discord.ui.View):
+    """Постраничный просмотр логов, каждая страница загружается отдельно"""
+    
+    MAX_PER_PAGE = 10
+    
+    def __init__(self, cog: "AdminCog", author_id: int, guild_id: int, per_page: int):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.author_id = author_id
+        self.guild_id = guild_id
+        self.per_page = per_page
+        self.message: Optional[discord.Message] = None
+        
+        # Курсоры начала каждой просмотренной страницы (None - первая)
+        self._cursors = [None]
+        self._next_cursor: Optional[int] = None
+        
+    @property
+    def page(self) -> int:
+        return len(self._cursors)
+        
+    async def load_page(self) -> Optional[discord.Embed]:
+        """Загрузить текущую страницу и обновить кнопки"""
+        result = await self.cog.bot.db.get_logs_page(
+            self.guild_id,
+            before_id=self._cursors[-1],
+            limit=self.per_page
+        )
+        if not result['logs']:
+            return None
+            
+        self._next_cursor = result['next_cursor']
+        self.previous_page.disabled = self.page == 1
+        self.next_page.disabled = self._next_cursor is None
+        
+        return await self.cog.build_logs_embed(result['logs'], self.page)
+        
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message(
+                "❌ Листать логи может только автор команды.",
+                ephemeral=True
+            )
+            return False
+        return True
+        
+    async def _show(self, interaction: discord.Interaction):
+        embed = await self.load_page()
+        if embed is None:
+            # Записи исчезли (например, после архивации) - возвращаемся в начало
+            self._cursors = [None]
+            embed = await self.load_page()
+        if embed is None:
+            await interaction.response.edit_message(
+                content="📋 Нет записей в логах.", embed=None, view=None
+            )
+            self.stop()
+            return
+        await interaction.response.edit_message(embed=embed, view=self)
+        
+    @discord.ui.button(label="◀ Новее", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self._cursors) > 1:
+            self._cursors.pop()
+        await self._show(interaction)
+        
+    @discord.ui.button(label="Старее ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self._next_cursor is not None:
+            self._cursors.append(self._next_cursor)
+        await self._show(interaction)
+        
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+
 class AdminCog(commands.Cog, name="Администрирование"):
     """Административные команды для управления ботом"""
     
@@ -124,20 +206,19 @@ class AdminCog(commands.Cog, name="Администрирование"):
         role_names = {"admin": "Администраторы", "moderator": "Модераторы", "host": "Ведущие"}
         role_emojis = {"admin": "👑", "moderator": "🛡️", "host": "🎙️"}
         
+        # Все показываемые пользователи загружаются одним параллельным запросом
+        resolved = await self.bot.user_resolver.resolve_many(
+            user['user_id'] for role_users in by_role.values() for user in role_users[:10]
+        )
+        
         for role, role_users in by_role.items():
             if not role_users:
                 continue
                 
             user_list = []
             for user_data in role_users[:10]:  # Максимум 10
-                try:
-                    user = self.bot.get_user(user_data['user_id'])
-                    if not user:
-                        user = await self.bot.fetch_user(user_data['user_id'])
-                    name = user.mention if user else f"ID: {user_data['user_id']}"
-                except:
-                    name = f"ID: {user_data['user_id']}"
-                    
+                user = resolved[user_data['user_id']]
+                name = user.mention if user else f"ID: {user_data['user_id']}"
                 user_list.append(f"• {name}")
                 
             if len(role_users) > 10:
@@ -197,6 +278,36 @@ class AdminCog(commands.Cog, name="Администрирование"):
             
         await ctx.send("✅ Требование к никнейму удалено.")
         
+    @commands.command(name="setprefix", aliases=["prefix", "префикс"])
+    @requires_admin()
+    async def set_prefix(self, ctx: commands.Context, prefix: Optional[str] = None):
+        """
+        Установить префикс команд сервера (без аргумента - вернуть стандартный)
+        
+        Использование: !setprefix ?
+        """
+        if prefix is not None and (len(prefix) > PREFIX_MAX_LENGTH or any(c.isspace() for c in prefix)):
+            await ctx.send(f"❌ Префикс - до {PREFIX_MAX_LENGTH} символов без пробелов.")
+            return
+            
+        prefix = await self.bot.prefixes.set(ctx.guild.id, prefix)
+        
+        # Логируем
+        await self.bot.db.log_action(
+            ctx.guild.id,
+            ctx.author.id,
+            "set_prefix",
+            f"Префикс: {prefix}"
+        )
+        
+        embed = discord.Embed(
+            title="✅ Настройка обновлена",
+            description=f"Префикс команд: **{prefix}**\n"
+                       f"Например: `{prefix}number`",
+            color=discord.Color.green()
+        )
+        await ctx.send(embed=embed)
+        
     @commands.command(name="setrole", aliases=["роль"])
     @requires_admin()
     async def add_allowed_role(self, ctx: commands.Context, role: discord.Role):
@@ -259,39 +370,37 @@ class AdminCog(commands.Cog, name="Администрирование"):
         
     @commands.command(name="logs", aliases=["логи", "история"])
     @requires_admin()
-    async def show_logs(self, ctx: commands.Context, limit: int = 20):
+    async def show_logs(self, ctx: commands.Context, per_page: int = 10):
         """
-        Показать последние действия на сервере
+        Показать историю действий на сервере (постранично)
         
-        Использование: !logs [количество]
+        Использование: !logs [записей_на_странице]
         """
-        if limit > 50:
-            limit = 50
-        elif limit < 1:
-            limit = 1
-            
-        logs = await self.bot.db.get_recent_logs(ctx.guild.id, limit)
+        per_page = max(1, min(per_page, LogsPaginator.MAX_PER_PAGE))
+        
+        paginator = LogsPaginator(self, ctx.author.id, ctx.guild.id, per_page)
+        embed = await paginator.load_page()
         
-        if not logs:
+        if embed is None:
             await ctx.send("📋 Нет записей в логах.")
             return
             
+        paginator.message = await ctx.send(embed=embed, view=paginator)
+        
+    async def build_logs_embed(self, logs: list, page: int) -> discord.Embed:
+        """Сформировать embed для страницы логов"""
         embed = discord.Embed(
             title="📜 История действий",
-            description=f"Последние {len(logs)} записей",
             color=discord.Color.blue()
         )
         
+        users = await self.bot.user_resolver.resolve_many(log['user_id'] for log in logs)
+        
         log_text = []
-        for log in logs[:10]:  # Максимум 10 в embed
-            try:
-                user = self.bot.get_user(log['user_id'])
-                if not user:
-                    user = await self.bot.fetch_user(log['user_id'])
-                username = user.name if user else f"ID:{log['user_id']}"
-            except:
-                username = f"ID:{log['user_id']}"
-                
+        for log in logs:
+            user = users[log['user_id']]
+            username = user.name if user else f"ID:{log['user_id']}"
+            
             timestamp = log['timestamp'].split('.')[0]  # Убираем миллисекунды
             action = log['action'].replace('_', ' ').title()
             
@@ -300,23 +409,21 @@ class AdminCog(commands.Cog, name="Администрирование"):
                 log_text.append(f"↳ {log['details']}")
                 
         embed.description = "\n".join(log_text)
+        embed.set_footer(text=f"Страница {page}")
         
-        if len(logs) > 10:
-            embed.set_footer(text=f"Показаны первые 10 из {len(logs)} записей")
-            
-        await ctx.send(embed=embed)
+        return embed
         
     @commands.command(name="stats", aliases=["статистика", "стат"])
-    async def show_stats(self, ctx: commands.Context):
+    async def show_stats(self, ctx: commands.Context, period: PeriodConverter = None):
         """
         Показать статистику сервера
         
-        Использование: !stats
+        Использование: !stats [day|week|month|all]
         """
-        stats = await self.bot.db.get_statistics(ctx.guild.id)
+        stats = await self.bot.db.get_statistics(ctx.guild.id, period)
         
         embed = discord.Embed(
-            title="📊 Статистика сервера",
+            title=f"📊 Статистика сервера {PERIOD_TITLES[period or 'all']}",
             description=ctx.guild.name,
             color=discord.Color.blue()
         )
@@ -324,7 +431,7 @@ class AdminCog(commands.Cog, name="Администрирование"):
         embed.add_field(
             name="📈 Общие данные",
             value=f"Сессий проведено: **{stats['total_sessions']}**\n"
-                  f"Активных ведущих: **{stats['active_hosts']}**",
+                  f"{'Активных ведущих' if period is None else 'Ведущих с сессиями'}: **{stats['active_hosts']}**",
             inline=False
         )
         
@@ -348,7 +455,7 @@ class AdminCog(commands.Cog, name="Администрирование"):
             name="ℹ️ О боте",
             value=f"Версия: **{self.bot.__class__.__module__.split('.')[0]} v2.0**\n"
                   f"Серверов: **{len(self.bot.guilds)}**\n"
-                  f"Префикс: **{self.bot.config.prefix}**",
+                  f"Префикс: **{await self.bot.prefixes.get(ctx.guild.id)}**",
             inline=False
         )
         
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль фоновых задач обслуживания
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from discord.ext import commands, tasks
+
+from ..backup import SQLiteBackup, sqlite_files
+from ..log_archive import LogArchiver
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Ключ bot_meta со временем последнего выполнения задачи обслуживания
+LAST_RUN_KEY = "maintenance_last_run:{}"
+
+
+class MaintenanceCog(commands.Cog, name="Обслуживание"):
+    """Фоновые задачи: архивация журнала, удаление данных покинутых серверов, резервное копирование"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        config = bot.config
+        self.archiver = LogArchiver(
+            bot.db,
+            config.log_archive_dir,
+            config.log_retention_days,
+            batch_size=config.log_archive_batch_size
+        )
+        self.backup = SQLiteBackup(
+            config.backup_dir,
+            keep=config.backup_keep,
+            compress=config.backup_compress,
+            pages_per_step=config.backup_pages_per_step
+        )
+
+    async def cog_load(self):
+        config = self.bot.config
+        self.archive_logs.change_interval(hours=config.maintenance_interval_hours)
+        self.archive_logs.start()
+        self.purge_departed_guilds.change_interval(hours=config.maintenance_interval_hours)
+        self.purge_departed_guilds.start()
+
+        if config.backup_interval_hours <= 0:
+            logger.info("Резервное копирование отключено (BACKUP_INTERVAL_HOURS=0)")
+        elif not sqlite_files(self.bot.db):
+            logger.info("Резервное копирование пропущено: хранилище не SQLite")
+        else:
+            self.backup_database.change_interval(hours=config.backup_interval_hours)
+            self.backup_database.start()
+
+    async def cog_unload(self):
+        self.archive_logs.cancel()
+        self.purge_departed_guilds.cancel()
+        self.backup_database.cancel()
+
+    @tasks.loop(hours=6)
+    async def archive_logs(self):
+        """Перенос старых записей журнала действий в архив"""
+        try:
+            await self._run_once_per_cluster("archive_logs", self.archiver.run)
+        except Exception as e:
+            logger.error(f"Ошибка архивации журнала действий: {e}", exc_info=e)
+
+    @tasks.loop(hours=6)
+    async def purge_departed_guilds(self):
+        """Порционное удаление данных серверов, покинутых дольше срока отсрочки"""
+        try:
+            await self._run_once_per_cluster("purge_departed_guilds", self._purge_departed_guilds)
+        except Exception as e:
+            logger.error(f"Ошибка удаления данных покинутых серверов: {e}", exc_info=e)
+
+    async def _run_once_per_cluster(self, name: str, job) -> None:
+        """
+        Выполнить задачу обслуживания один раз за интервал на весь кластер
+
+        Блокировка не даёт процессам выполнять задачу одновременно, но
+        процессы запускаются в разное время, и без отметки каждый выполнял
+        бы её в свой круг. Время последнего выполнения хранится в bot_meta
+        общего хранилища; если оно свежее интервала, круг пропускается.
+
+        Args:
+            name: Имя задачи (блокировка и ключ bot_meta)
+            job: Корутинная функция задачи
+        """
+        async with self.bot.exclusive(name) as acquired:
+            if not acquired:
+                return
+
+            key = LAST_RUN_KEY.format(name)
+            interval = timedelta(hours=self.bot.config.maintenance_interval_hours * 0.9)
+            last_run = await self.bot.db.get_meta(key)
+            if last_run and datetime.utcnow() - datetime.fromisoformat(last_run) < interval:
+                logger.debug(f"Задача {name} уже выполнена в {last_run}, круг пропущен")
+                return
+
+            await job()
+            await self.bot.db.set_meta(key, datetime.utcnow().isoformat(timespec='seconds'))
+
+    async def _purge_departed_guilds(self):
+        config = self.bot.config
+        left_before = (
+            datetime.utcnow() - timedelta(days=config.guild_data_grace_days)
+        ).strftime('%Y-%m-%d %H:%M:%S')
+
+        guild_ids = await self.bot.db.get_departed_guilds(left_before)
+        for guild_id in guild_ids:
+            # Вернувшийся на сервер бот снимает отметку - тогда purge вернёт 0
+            if self.bot.get_guild(guild_id):
+                continue
+            deleted = 0
+            while (batch := await self.bot.db.purge_guild_data(guild_id, config.guild_purge_batch_size)):
+                deleted += batch
+                await asyncio.sleep(self.archiver.pause)
+            logger.info(f"Удалены данные покинутого сервера {guild_id}: {deleted} записей")
+
+        if guild_ids:
+            await self.archiver.reclaim_space()
+
+    @tasks.loop(hours=24)
+    async def backup_database(self):
+        """Онлайн-копия файлов SQLite"""
+        async with self.bot.exclusive("backup_database") as acquired:
+            if not acquired:
+                return
+            # После перезапуска и в других процессах кластера не копируем
+            # заново, если свежая копия уже есть
+            min_age = self.bot.config.backup_interval_hours * 0.9
+            try:
+                await self.backup.run(sqlite_files(self.bot.db), min_age_hours=min_age)
+            except Exception as e:
+                logger.error(f"Ошибка резервного копирования базы данных: {e}", exc_info=e)
+
+    @archive_logs.before_loop
+    @purge_departed_guilds.before_loop
+    @backup_database.before_loop
+    async def _wait_until_ready(self):
+        # Обслуживание не задерживает запуск, а список серверов для
+        # purge_departed_guilds известен только после on_ready
+        await self.bot.wait_until_ready()
+
+async def setup(bot):
+    """Подключение модуля к боту"""
+    await bot.add_cog(MaintenanceCog(bot))
@@ -7,12 +7,14 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import random
-import re
 from typing import List, Optional
 import logging
 
 from ..utils.permissions import requires_host_permission
+from ..utils.periods import PeriodConverter, PERIOD_TITLES
 from ..utils.logger import get_logger
+from ..utils.admission import BotOverloaded
+from ..utils.members import voice_channel_members
 
 logger = get_logger(__name__)
 
@@ -22,7 +24,18 @@ class NumberingCog(commands.Cog, name="Нумерация"):
     
     def __init__(self, bot):
         self.bot = bot
-        self.active_sessions = {}  # guild_id: session_id
+        
+    async def cog_unload(self):
+        """Завершить открытые сессии нумерации (при остановке бота)"""
+        active_sessions = self.bot.guild_states.active_sessions()
+        for guild_id, session_id in active_sessions.items():
+            try:
+                await self.bot.db.end_numbering_session(session_id)
+            except Exception as e:
+                logger.error(f"Не удалось завершить сессию #{session_id}: {e}")
+            self.bot.guild_states.get(guild_id).session_id = None
+        if active_sessions:
+            logger.info(f"Завершено открытых сессий нумерации: {len(active_sessions)}")
         
     def remove_numbers(self, nickname: str) -> str:
         """
@@ -34,8 +47,8 @@ class NumberingCog(commands.Cog, name="Нумерация"):
         Returns:
             Очищенный никнейм
         """
-        for pattern in self.bot.config.number_formats:
-            nickname = re.sub(pattern, '', nickname)
+        for pattern in self.bot.config.number_patterns:
+            nickname = pattern.sub('', nickname)
         return nickname.strip()
         
     @commands.command(name="number", aliases=["номера", "num"])
@@ -54,7 +67,7 @@ class NumberingCog(commands.Cog, name="Нумерация"):
         voice_channel = ctx.author.voice.channel
         
         # Получаем участников (исключая автора команды)
-        members = [m for m in voice_channel.members if m != ctx.author]
+        members = [m for m in await voice_channel_members(voice_channel) if m != ctx.author]
         
         if not members:
             await ctx.send("❌ В канале нет других участников для нумерации!")
@@ -82,7 +95,8 @@ class NumberingCog(commands.Cog, name="Нумерация"):
             host_id,
             len(members)
         )
-        self.active_sessions[ctx.guild.id] = session_id
+        state = self.bot.guild_states.get(ctx.guild.id)
+        state.session_id = session_id
         
         # Генерируем случайные номера
         numbers = list(range(1, len(members) + 1))
@@ -93,25 +107,32 @@ class NumberingCog(commands.Cog, name="Нумерация"):
         failed_members = []
         results = []
         
-        # Присваиваем номера
-        for member, number in zip(members, numbers):
-            old_nick = member.display_name
-            clean_nick = self.remove_numbers(old_nick)
-            new_nick = f"{number:02d}. {clean_nick}"
+        # Присваиваем номера (очередь переименований учитывается для сброса нагрузки;
+        # переименования сервера выполняются по одной команде, не перемешиваясь)
+        with self.bot.jobs.track("number", ctx, len(members)) as job, \
+                self.bot.admission.rename_batch(len(members)) as batch:
+            async with state.lock:
+                for member, number in zip(members, numbers):
+                    old_nick = member.display_name
+                    clean_nick = self.remove_numbers(old_nick)
+                    new_nick = f"{number:02d}. {clean_nick}"
             
-            try:
-                await member.edit(nick=new_nick)
-                success_count += 1
-                results.append(f"✅ {old_nick} → **{new_nick}**")
-                logger.info(f"Переименован: {old_nick} → {new_nick}")
-            except discord.Forbidden:
-                failed_members.append((member, new_nick))
-                results.append(f"❌ {old_nick} → **{new_nick}** *(недостаточно прав)*")
-                logger.warning(f"Не удалось переименовать {member.name}: недостаточно прав")
-            except Exception as e:
-                failed_members.append((member, new_nick))
-                results.append(f"❌ {old_nick} → **{new_nick}** *(ошибка)*")
-                logger.error(f"Ошибка переименования {member.name}: {e}")
+                    try:
+                        await member.edit(nick=new_nick)
+                        success_count += 1
+                        results.append(f"✅ {old_nick} → **{new_nick}**")
+                        logger.info(f"Переименован: {old_nick} → {new_nick}")
+                    except discord.Forbidden:
+                        failed_members.append((member, new_nick))
+                        results.append(f"❌ {old_nick} → **{new_nick}** *(недостаточно прав)*")
+                        logger.warning(f"Не удалось переименовать {member.name}: недостаточно прав")
+                    except Exception as e:
+                        failed_members.append((member, new_nick))
+                        results.append(f"❌ {old_nick} → **{new_nick}** *(ошибка)*")
+                        logger.error(f"Ошибка переименования {member.name}: {e}")
+                    finally:
+                        batch.done()
+                        job.advance()
                 
         # Создаём embed с результатами
         embed = discord.Embed(
@@ -166,7 +187,7 @@ class NumberingCog(commands.Cog, name="Нумерация"):
             return
             
         voice_channel = ctx.author.voice.channel
-        members = voice_channel.members
+        members = await voice_channel_members(voice_channel)
         
         # Логируем действие
         await self.bot.db.log_action(
@@ -177,32 +198,41 @@ class NumberingCog(commands.Cog, name="Нумерация"):
         )
         
         # Завершаем активную сессию
-        if ctx.guild.id in self.active_sessions:
-            await self.bot.db.end_numbering_session(self.active_sessions[ctx.guild.id])
-            del self.active_sessions[ctx.guild.id]
+        state = self.bot.guild_states.get(ctx.guild.id)
+        if state.session_id is not None:
+            await self.bot.db.end_numbering_session(state.session_id)
+            state.session_id = None
             
         # Результаты
         success_count = 0
         changed_count = 0
         
-        for member in members:
-            old_nick = member.display_name
-            new_nick = self.remove_numbers(old_nick)
+        with self.bot.jobs.track("clear", ctx, len(members)) as job, \
+                self.bot.admission.rename_batch(len(members)) as batch:
+            async with state.lock:
+                for member in members:
+                    old_nick = member.display_name
+                    new_nick = self.remove_numbers(old_nick)
             
-            # Пропускаем, если ничего не изменилось
-            if old_nick == new_nick:
-                continue
+                    # Пропускаем, если ничего не изменилось
+                    if old_nick == new_nick:
+                        batch.done()
+                        job.advance()
+                        continue
                 
-            changed_count += 1
+                    changed_count += 1
             
-            try:
-                await member.edit(nick=new_nick if new_nick else member.name)
-                success_count += 1
-                logger.info(f"Очищен никнейм: {old_nick} → {new_nick}")
-            except discord.Forbidden:
-                logger.warning(f"Не удалось очистить никнейм {member.name}: недостаточно прав")
-            except Exception as e:
-                logger.error(f"Ошибка очистки никнейма {member.name}: {e}")
+                    try:
+                        await member.edit(nick=new_nick if new_nick else member.name)
+                        success_count += 1
+                        logger.info(f"Очищен никнейм: {old_nick} → {new_nick}")
+                    except discord.Forbidden:
+                        logger.warning(f"Не удалось очистить никнейм {member.name}: недостаточно прав")
+                    except Exception as e:
+                        logger.error(f"Ошибка очистки никнейма {member.name}: {e}")
+                    finally:
+                        batch.done()
+                        job.advance()
                 
         # Создаём embed с результатами
         embed = discord.Embed(
@@ -220,6 +250,31 @@ class NumberingCog(commands.Cog, name="Нумерация"):
         
         await ctx.send(embed=embed)
         
+    async def admit_interaction(self, interaction: discord.Interaction,
+                                ctx: commands.Context, name: str) -> bool:
+        """
+        Контроль допуска для slash-команды (текстовые проходят его в bot.on_message и bot.before_invoke)
+        
+        Returns:
+            True, если команду можно выполнять; иначе пользователю уже отправлен ответ
+        """
+        if not self.bot.jobs.accepting:
+            await interaction.response.send_message(
+                "🔄 Бот перезапускается, повторите команду через минуту.",
+                ephemeral=True
+            )
+            return False
+            
+        try:
+            return await self.bot.admission.admit(ctx, name)
+        except commands.CommandOnCooldown as e:
+            message = f"⏱️ Команда на перезарядке. Попробуйте через {e.retry_after:.1f} сек."
+        except BotOverloaded:
+            message = "⏳ Бот сейчас перегружен, попробуйте эту команду чуть позже."
+            
+        await interaction.response.send_message(message, ephemeral=True)
+        return False
+        
     @app_commands.command(name="number", description="Присвоить случайные номера участникам канала")
     @app_commands.check(lambda interaction: True)  # Проверка прав будет внутри команды
     async def slash_number(self, interaction: discord.Interaction):
@@ -235,6 +290,9 @@ class NumberingCog(commands.Cog, name="Нумерация"):
             )
             return
             
+        if not await self.admit_interaction(interaction, ctx, "number"):
+            return
+            
         # Отправляем начальный ответ
         await interaction.response.defer()
         
@@ -254,24 +312,30 @@ class NumberingCog(commands.Cog, name="Нумерация"):
             )
             return
             
+        if not await self.admit_interaction(interaction, ctx, "clear"):
+            return
+            
         await interaction.response.defer()
         await self.clear_numbers(ctx)
         
     @commands.command(name="hosts", aliases=["ведущие", "хосты"])
-    async def list_hosts(self, ctx: commands.Context):
+    async def list_hosts(self, ctx: commands.Context, period: PeriodConverter = None):
         """
         Показать список ведущих сервера
         
-        Использование: !hosts
+        Использование: !hosts [day|week|month|all]
         """
-        hosts = await self.bot.db.get_active_hosts(ctx.guild.id)
+        hosts = await self.bot.db.get_active_hosts(ctx.guild.id, period)
         
         if not hosts:
-            await ctx.send("📋 На этом сервере пока нет сохранённых ведущих.")
+            if period:
+                await ctx.send(f"📋 Нет ведущих с сессиями {PERIOD_TITLES[period]}.")
+            else:
+                await ctx.send("📋 На этом сервере пока нет сохранённых ведущих.")
             return
             
         embed = discord.Embed(
-            title="👥 Ведущие сервера",
+            title=f"👥 Ведущие сервера {PERIOD_TITLES[period or 'all']}",
             description=f"Всего ведущих: **{len(hosts)}**",
             color=discord.Color.blue()
         )
@@ -279,16 +343,14 @@ class NumberingCog(commands.Cog, name="Нумерация"):
         # Сортируем по количеству сессий
         hosts.sort(key=lambda h: h['sessions_count'], reverse=True)
         
+        users = await self.bot.user_resolver.resolve_many(host['user_id'] for host in hosts[:10])
+        
         host_list = []
         for i, host in enumerate(hosts[:10], 1):
-            try:
-                user = self.bot.get_user(host['user_id'])
-                if not user:
-                    user = await self.bot.fetch_user(host['user_id'])
-                name = user.mention if user else f"ID: {host['user_id']}"
-            except:
-                name = f"ID: {host['user_id']}"
-                
+            # Без ответа Discord - сохранённый никнейм ведущего
+            user = users[host['user_id']]
+            name = user.mention if user else host['nickname'] or f"ID: {host['user_id']}"
+            
             sessions = host['sessions_count']
             emoji = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
             
@@ -7,13 +7,36 @@ import discord
 from discord.ext import commands
 import json
 import logging
+import math
 import platform
+import tempfile
 from datetime import datetime
 
-from ..utils.permissions import requires_permission
+from ..export import GuildExporter
+from ..restore import IMPORT_MODES, ExportFormatError, restore_export
+from ..utils.permissions import requires_permission, requires_admin, requires_global_admin
 
 logger = logging.getLogger(__name__)
 
+# Подписи итогов импорта
+IMPORT_TITLES = {
+    "settings": "Настройки",
+    "authorized_user": "Права",
+    "host": "Ведущие",
+    "session": "Сессии",
+    "action_log": "Журнал",
+}
+
+# Сколько шардов перечислять поимённо в !ping и !info
+SHARD_LIST_LIMIT = 10
+
+
+def format_latency(seconds: float) -> str:
+    """Задержка в мс для вывода (до первого heartbeat шлюза - прочерк)"""
+    if not math.isfinite(seconds):
+        return "—"
+    return f"{round(seconds * 1000)}мс"
+
 
 class SettingsCog(commands.Cog, name="Настройки"):
     """Команды для просмотра и управления настройками"""
@@ -21,6 +44,17 @@ class SettingsCog(commands.Cog, name="Настройки"):
     def __init__(self, bot):
         self.bot = bot
         
+    def _shard_summary(self, current: int = None) -> str:
+        """Задержка по шардам построчно (текущий шард отмечен стрелкой)"""
+        latencies = self.bot.shard_latencies()
+        lines = [
+            f"{'➡️' if shard_id == current else '▫️'} Шард {shard_id}: {format_latency(latency)}"
+            for shard_id, latency in latencies[:SHARD_LIST_LIMIT]
+        ]
+        if len(latencies) > SHARD_LIST_LIMIT:
+            lines.append(f"...и ещё {len(latencies) - SHARD_LIST_LIMIT}")
+        return "\n".join(lines)
+        
     @commands.command(name="settings", aliases=["настройки", "config"])
     @requires_permission()
     async def show_settings(self, ctx: commands.Context):
@@ -41,7 +75,7 @@ class SettingsCog(commands.Cog, name="Настройки"):
         # Основные настройки
         embed.add_field(
             name="🔧 Основные",
-            value=f"**Префикс:** `{self.bot.config.prefix}`\n"
+            value=f"**Префикс:** `{await self.bot.prefixes.get(ctx.guild.id)}`\n"
                   f"**Язык:** `{guild_settings.get('language', self.bot.config.default_language)}`",
             inline=True
         )
@@ -109,7 +143,10 @@ class SettingsCog(commands.Cog, name="Настройки"):
             "auto_save_hosts": "💾 Автосохранение ведущих",
             "multi_language": "🌐 Мультиязычность",
             "slash_commands": "⚡ Slash-команды",
-            "web_dashboard": "🌐 Веб-панель"
+            "web_dashboard": "🌐 Веб-панель",
+            "admin_commands": "🛡️ Команды администрирования",
+            "settings_commands": "⚙️ Команды настроек",
+            "maintenance": "🧹 Обслуживание базы"
         }
         
         enabled_features = []
@@ -131,18 +168,14 @@ class SettingsCog(commands.Cog, name="Настройки"):
         
         # Глобальные администраторы
         if self.bot.permission_system.is_admin(ctx.author):
-            global_admins = self.bot.config.global_admins
+            global_admins = sorted(self.bot.config.global_admins)
             if global_admins:
-                admin_mentions = []
-                for admin_id in global_admins[:3]:
-                    try:
-                        user = self.bot.get_user(admin_id)
-                        if not user:
-                            user = await self.bot.fetch_user(admin_id)
-                        admin_mentions.append(user.mention if user else f"ID:{admin_id}")
-                    except:
-                        admin_mentions.append(f"ID:{admin_id}")
-                        
+                users = await self.bot.user_resolver.resolve_many(global_admins[:3])
+                admin_mentions = [
+                    users[admin_id].mention if users[admin_id] else f"ID:{admin_id}"
+                    for admin_id in global_admins[:3]
+                ]
+                
                 admin_text = ", ".join(admin_mentions)
                 if len(global_admins) > 3:
                     admin_text += f" *...и ещё {len(global_admins) - 3}*"
@@ -159,48 +192,181 @@ class SettingsCog(commands.Cog, name="Настройки"):
     @requires_permission()
     async def export_settings(self, ctx: commands.Context):
         """
-        Экспортировать настройки сервера
+        Экспортировать данные сервера (настройки, права, ведущие, сессии, логи)
         
         Использование: !export
         """
-        # Получаем все данные
-        settings = await self.bot.db.get_guild_settings(ctx.guild.id)
-        authorized_users = await self.bot.db.get_authorized_users(ctx.guild.id)
-        hosts = await self.bot.db.get_active_hosts(ctx.guild.id)
-        
-        export_data = {
-            "guild_id": ctx.guild.id,
-            "guild_name": ctx.guild.name,
-            "export_date": discord.utils.utcnow().isoformat(),
-            "settings": settings,
-            "authorized_users": authorized_users,
-            "hosts": hosts
-        }
+        async with ctx.typing():
+            exporter = GuildExporter(self.bot.db)
+            export_file = await exporter.export([
+                {"guild_id": ctx.guild.id, "guild_name": ctx.guild.name}
+            ])
+            
+        try:
+            if not await self._check_export_size(ctx, export_file, ctx.guild.filesize_limit):
+                return
+                
+            file = discord.File(
+                fp=export_file,
+                filename=f"export_{ctx.guild.id}_{discord.utils.utcnow().strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
+            )
+            
+            embed = discord.Embed(
+                title="📤 Экспорт данных",
+                description="Данные сервера экспортированы в сжатый NDJSON файл.\n"
+                            f"Записей: **{exporter.records}**",
+                color=discord.Color.green()
+            )
+            
+            # Логируем
+            await self.bot.db.log_action(
+                ctx.guild.id,
+                ctx.author.id,
+                "export_settings",
+                f"Экспортировано записей: {exporter.records}"
+            )
+            
+            await ctx.send(embed=embed, file=file)
+        finally:
+            export_file.close()
+            
+    @commands.command(name="exportall", aliases=["экспорт_всех"])
+    @requires_global_admin()
+    async def export_all(self, ctx: commands.Context):
+        """
+        Экспортировать данные всех серверов в один архив (отправляется в ЛС)
         
-        # Создаём JSON
-        json_data = json.dumps(export_data, indent=2, ensure_ascii=False)
+        Использование: !exportall
+        """
+        async with ctx.typing():
+            guilds = await self.bot.db.list_guilds()
+            exporter = GuildExporter(self.bot.db)
+            export_file = await exporter.export(guilds)
+            
+        try:
+            # Лимит размера файла в личных сообщениях - базовый
+            if not await self._check_export_size(ctx, export_file, discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES):
+                return
+                
+            file = discord.File(
+                fp=export_file,
+                filename=f"export_all_{discord.utils.utcnow().strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
+            )
+            
+            try:
+                await ctx.author.send(
+                    f"📤 Экспорт всех серверов: **{len(guilds)}** серверов, **{exporter.records}** записей.",
+                    file=file
+                )
+            except discord.Forbidden:
+                await ctx.send("❌ Не удалось отправить файл в личные сообщения. Откройте ЛС для бота.")
+                return
+                
+            logger.info(f"Глобальный экспорт выполнен пользователем {ctx.author.id}: {len(guilds)} серверов")
+            await ctx.send("✅ Архив отправлен в личные сообщения.")
+        finally:
+            export_file.close()
+            
+    @commands.command(name="import", aliases=["импорт", "restore"])
+    @requires_admin()
+    async def import_data(self, ctx: commands.Context, mode: str = "merge"):
+        """
+        Загрузить данные сервера из файла экспорта (файл прикрепляется к сообщению)
         
-        # Создаём файл
-        file = discord.File(
-            fp=json_data.encode('utf-8'),
-            filename=f"settings_{ctx.guild.id}_{discord.utils.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
-        )
+        Использование: !import [merge|replace]
+        merge - добавить к текущим данным, replace - заменить данные сервера
+        """
+        mode = mode.lower()
+        if mode not in IMPORT_MODES:
+            await ctx.send(f"❌ Неизвестный режим. Доступно: {', '.join(IMPORT_MODES)}")
+            return
+            
+        if not ctx.message.attachments:
+            await ctx.send("❌ Прикрепите к сообщению файл экспорта (.ndjson.gz).")
+            return
+            
+        with tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024) as import_file, \
+                self.bot.jobs.track("import", ctx):
+            async with ctx.typing():
+                await ctx.message.attachments[0].save(import_file)
+                try:
+                    results = await restore_export(
+                        self.bot.db, import_file, mode, target_guild_id=ctx.guild.id
+                    )
+                except ExportFormatError as e:
+                    await ctx.send(f"❌ Файл не загружен, данные не изменены: {e}")
+                    return
+                except ValueError as e:
+                    await ctx.send(f"❌ {e}")
+                    return
+                    
+        # Настройки (и префикс) могли смениться
+        self.bot.prefixes.forget(ctx.guild.id)
         
+        imported = results[0]['imported'] if results else {}
         embed = discord.Embed(
-            title="📤 Экспорт настроек",
-            description="Настройки сервера экспортированы в JSON файл.",
+            title="📥 Импорт данных",
+            description=f"Режим: **{mode}**",
             color=discord.Color.green()
         )
-        
+        for record_type, title in IMPORT_TITLES.items():
+            embed.add_field(name=title, value=str(imported.get(record_type, 0)), inline=True)
+            
         # Логируем
         await self.bot.db.log_action(
             ctx.guild.id,
             ctx.author.id,
-            "export_settings",
-            "Экспортированы настройки сервера"
+            "import_data",
+            f"Режим: {mode}, загружено: {imported}"
         )
         
-        await ctx.send(embed=embed, file=file)
+        await ctx.send(embed=embed)
+        
+    @commands.command(name="reloadconfig", aliases=["перезагрузить_конфиг"])
+    @requires_global_admin()
+    async def reload_config(self, ctx: commands.Context):
+        """
+        Перечитать config.json без перезапуска бота
+        
+        Использование: !reloadconfig
+        """
+        try:
+            changes = await self.bot.config_watcher.reload()
+        except ValueError as e:
+            await ctx.send(f"❌ Конфигурация не загружена, действуют прежние настройки: {e}")
+            return
+            
+        embed = discord.Embed(
+            title="🔄 Перезагрузка конфигурации",
+            color=discord.Color.green()
+        )
+        embed.add_field(
+            name="Применено",
+            value=", ".join(f"`{key}`" for key in changes["applied"]) or "*Без изменений*",
+            inline=False
+        )
+        if changes["restart_required"]:
+            embed.add_field(
+                name="После перезапуска",
+                value=", ".join(f"`{key}`" for key in changes["restart_required"]),
+                inline=False
+            )
+            
+        logger.info(f"Конфигурация перезагружена пользователем {ctx.author.id}")
+        await ctx.send(embed=embed)
+        
+    async def _check_export_size(self, ctx: commands.Context, export_file, limit: int) -> bool:
+        """Проверить, что файл экспорта помещается в лимит загрузки Discord"""
+        size = export_file.seek(0, 2)
+        export_file.seek(0)
+        
+        if size > limit:
+            await ctx.send(
+                f"❌ Файл экспорта слишком большой ({size / 1024 / 1024:.1f} МБ, "
+                f"лимит {limit / 1024 / 1024:.0f} МБ)."
+            )
+            return False
+        return True
         
     @commands.command(name="info", aliases=["botinfo", "about"])
     async def info(self, ctx: commands.Context):
@@ -232,13 +398,28 @@ class SettingsCog(commands.Cog, name="Настройки"):
             inline=True
         )
         
+        presence = self.bot.presence.stats
+        guild_states = self.bot.guild_states.footprint()
         embed.add_field(
             name="⚙️ Техническая информация",
             value=f"**discord.py:** {discord.__version__}\n"
-                  f"**Python:** {platform.python_version()}",
+                  f"**Python:** {platform.python_version()}\n"
+                  f"**Обновления статуса:** {presence['published']} отправлено, "
+                  f"{presence['coalesced']} объединено, {presence['skipped']} без изменений\n"
+                  f"**Состояние серверов:** {guild_states['guilds']} в памяти "
+                  f"(~{guild_states['bytes'] / 1024:.0f} КБ), {guild_states['sessions']} сессий, "
+                  f"{guild_states['evicted']} вытеснено",
             inline=False
         )
 
+        if isinstance(self.bot, commands.AutoShardedBot):
+            current = ctx.guild.shard_id if ctx.guild else None
+            embed.add_field(
+                name=f"🧩 Шарды ({len(self.bot.shards)} из {self.bot.shard_count})",
+                value=self._shard_summary(current),
+                inline=False
+            )
+
         repo_url = "https://github.com/fruzenkov/DiscordNumericBot"
         embed.add_field(
             name="🔗 Ссылка на GitHub",
@@ -263,14 +444,19 @@ class SettingsCog(commands.Cog, name="Настройки"):
         message = await ctx.send("🏓 Измеряю задержку...")
         end = time.perf_counter()
         
-        # Задержка API
-        api_latency = round(self.bot.latency * 1000)
+        # Задержка шлюза шарда, который обслуживает этот сервер
+        shard_id = ctx.guild.shard_id if ctx.guild else 0
+        latency = dict(self.bot.shard_latencies()).get(shard_id, self.bot.latency)
+        api_latency = round(latency * 1000) if math.isfinite(latency) else None
         
         # Задержка сообщения
         message_latency = round((end - start) * 1000)
         
         # Определяем цвет по задержке
-        if api_latency < 100:
+        if api_latency is None:
+            color = discord.Color.light_grey()
+            status = "⚪ Нет данных"
+        elif api_latency < 100:
             color = discord.Color.green()
             status = "🟢 Отлично"
         elif api_latency < 200:
@@ -285,9 +471,10 @@ class SettingsCog(commands.Cog, name="Настройки"):
             color=color
         )
         
+        sharded = isinstance(self.bot, commands.AutoShardedBot)
         embed.add_field(
-            name="📡 WebSocket",
-            value=f"{api_latency}мс",
+            name=f"📡 WebSocket (шард {shard_id})" if sharded else "📡 WebSocket",
+            value=format_latency(latency),
             inline=True
         )
         
@@ -303,6 +490,24 @@ class SettingsCog(commands.Cog, name="Настройки"):
             inline=True
         )
         
+        if sharded:
+            embed.add_field(
+                name="🧩 Шарды",
+                value=self._shard_summary(shard_id),
+                inline=False
+            )
+            
+        load = self.bot.admission.stats
+        overload = self.bot.admission.overload_reason()
+        embed.add_field(
+            name="⚖️ Нагрузка",
+            value=f"Цикл событий: {load['loop_lag_ms']}мс\n"
+                  f"Очередь переименований: {load['rename_backlog']}\n"
+                  f"Ограничено команд: {load['throttled'] + load['shed']}"
+                  + (f"\n⏳ Сброс нагрузки: {overload}" if overload else ""),
+            inline=False
+        )
+            
         await message.edit(content=None, embed=embed)
 
 
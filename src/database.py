@@ -4,16 +4,206 @@
 """
 
 import aiosqlite
-import json
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+import contextlib
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 from pathlib import Path
 import logging
 
+from .storage.base import StorageBackend
+from .utils import fastjson
+
 logger = logging.getLogger(__name__)
 
 
-class Database:
+# Запросы порционного чтения разделов сервера: (SQL, имена колонок).
+# Первая колонка - ключ продолжения.
+EXPORT_QUERIES = {
+    "hosts": (
+        """SELECT host_id, user_id, nickname, is_active, sessions_count, last_session, created_at 
+           FROM hosts 
+           WHERE guild_id = ? AND host_id > ? 
+           ORDER BY host_id 
+           LIMIT ?""",
+        ("host_id", "user_id", "nickname", "is_active", "sessions_count", "last_session", "created_at")
+    ),
+    "sessions": (
+        """SELECT s.session_id, s.channel_id, s.host_id, h.user_id, 
+                  s.participants_count, s.started_at, s.ended_at 
+           FROM numbering_sessions s 
+           LEFT JOIN hosts h ON h.host_id = s.host_id 
+           WHERE s.guild_id = ? AND s.session_id > ? 
+           ORDER BY s.session_id 
+           LIMIT ?""",
+        ("session_id", "channel_id", "host_id", "host_user_id", 
+         "participants_count", "started_at", "ended_at")
+    ),
+    "action_logs": (
+        """SELECT log_id, user_id, action, details, timestamp 
+           FROM action_logs 
+           WHERE guild_id = ? AND log_id > ? 
+           ORDER BY log_id 
+           LIMIT ?""",
+        ("log_id", "user_id", "action", "details", "timestamp")
+    ),
+}
+
+# Пересчёт дневных агрегатов по истории сессий ({where} - фильтр по серверу)
+ROLLUP_BACKFILL_SQL = """INSERT INTO host_daily_stats
+    (guild_id, day, host_id, sessions_count, participants_count)
+    SELECT guild_id, date(started_at), host_id,
+           COUNT(*), COALESCE(SUM(participants_count), 0)
+    FROM numbering_sessions
+    {where}
+    GROUP BY guild_id, date(started_at), host_id"""
+
+# Порционное удаление данных покинутого сервера (см. purge_guild_data);
+# порядок учитывает внешние ключи
+PURGE_STATEMENTS = (
+    """DELETE FROM action_logs WHERE log_id IN
+       (SELECT log_id FROM action_logs WHERE guild_id = ? LIMIT ?)""",
+    """DELETE FROM host_daily_stats WHERE (guild_id, day, host_id) IN
+       (SELECT guild_id, day, host_id FROM host_daily_stats WHERE guild_id = ? LIMIT ?)""",
+    """DELETE FROM numbering_sessions WHERE session_id IN
+       (SELECT session_id FROM numbering_sessions WHERE guild_id = ? LIMIT ?)""",
+    """DELETE FROM hosts WHERE host_id IN
+       (SELECT host_id FROM hosts WHERE guild_id = ? LIMIT ?)""",
+    """DELETE FROM authorized_users WHERE rowid IN
+       (SELECT rowid FROM authorized_users WHERE guild_id = ? LIMIT ?)""",
+)
+
+# Промежуточные таблицы импорта: существуют только на соединении импорта
+# (temp) и заполняются без блокировки записи в основную базу
+IMPORT_STAGING_SCHEMA = """
+    CREATE TEMP TABLE import_authorized_users (
+        user_id INTEGER PRIMARY KEY,
+        role TEXT,
+        added_by INTEGER,
+        added_at TIMESTAMP
+    );
+    CREATE TEMP TABLE import_hosts (
+        user_id INTEGER PRIMARY KEY,
+        nickname TEXT,
+        is_active INTEGER,
+        sessions_count INTEGER,
+        last_session TIMESTAMP,
+        created_at TIMESTAMP
+    );
+    CREATE TEMP TABLE import_sessions (
+        seq INTEGER PRIMARY KEY,
+        channel_id INTEGER,
+        host_user_id INTEGER,
+        participants_count INTEGER,
+        started_at TIMESTAMP,
+        ended_at TIMESTAMP
+    );
+    CREATE TEMP TABLE import_logs (
+        seq INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        action TEXT,
+        details TEXT,
+        timestamp TIMESTAMP
+    );
+    CREATE TEMP TABLE import_host_totals (
+        host_id INTEGER PRIMARY KEY,
+        sessions INTEGER,
+        last_started TIMESTAMP
+    );
+"""
+
+# Запись порции экспорта в промежуточные таблицы (повторы ведущих и прав - последняя)
+IMPORT_STAGING_STATEMENTS = {
+    "authorized_user": (
+        """INSERT OR REPLACE INTO temp.import_authorized_users
+           (user_id, role, added_by, added_at) VALUES (?, ?, ?, ?)""",
+        lambda u: (u['user_id'], u['role'], u.get('added_by'), u.get('added_at'))
+    ),
+    "host": (
+        """INSERT OR REPLACE INTO temp.import_hosts
+           (user_id, nickname, is_active, sessions_count, last_session, created_at)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        lambda h: (
+            h['user_id'], h.get('nickname'), int(h.get('is_active', True)),
+            h.get('sessions_count') or 0, h.get('last_session'), h.get('created_at')
+        )
+    ),
+    "session": (
+        """INSERT INTO temp.import_sessions
+           (channel_id, host_user_id, participants_count, started_at, ended_at)
+           VALUES (?, ?, ?, ?, ?)""",
+        lambda s: (
+            s['channel_id'], s.get('host_user_id'), s.get('participants_count'),
+            s['started_at'], s.get('ended_at')
+        )
+    ),
+    "action_log": (
+        """INSERT INTO temp.import_logs (user_id, action, details, timestamp)
+           VALUES (?, ?, ?, ?)""",
+        lambda log: (log['user_id'], log['action'], log.get('details'), log['timestamp'])
+    ),
+}
+
+# Перенос промежуточных таблиц в сервер ?1 (одна транзакция, см. import_guild_data).
+# История сверяется по естественному ключу, а не по времени последней записи:
+# повторный импорт ничего не дублирует и догружает пропущенное в любом месте
+IMPORT_APPLY_STATEMENTS = (
+    ("authorized_user",
+     """INSERT OR REPLACE INTO authorized_users (user_id, guild_id, role, added_by, added_at)
+        SELECT user_id, ?1, role, added_by, COALESCE(added_at, CURRENT_TIMESTAMP)
+        FROM temp.import_authorized_users"""),
+    # Обновление ведущих должно идти раньше вставки новых
+    ("host",
+     """UPDATE hosts SET
+            nickname = (SELECT i.nickname FROM temp.import_hosts i WHERE i.user_id = hosts.user_id),
+            is_active = (SELECT i.is_active FROM temp.import_hosts i WHERE i.user_id = hosts.user_id)
+        WHERE guild_id = ?1 AND user_id IN (SELECT user_id FROM temp.import_hosts)"""),
+    ("host",
+     """INSERT INTO hosts
+        (guild_id, user_id, nickname, is_active, sessions_count, last_session, created_at)
+        SELECT ?1, i.user_id, i.nickname, i.is_active, i.sessions_count, i.last_session,
+               COALESCE(i.created_at, CURRENT_TIMESTAMP)
+        FROM temp.import_hosts i
+        WHERE NOT EXISTS (SELECT 1 FROM hosts h WHERE h.guild_id = ?1 AND h.user_id = i.user_id)"""),
+    ("session",
+     """INSERT INTO numbering_sessions
+        (guild_id, channel_id, host_id, participants_count, started_at, ended_at)
+        SELECT ?1, i.channel_id,
+               (SELECT h.host_id FROM hosts h WHERE h.guild_id = ?1 AND h.user_id = i.host_user_id),
+               i.participants_count, i.started_at, i.ended_at
+        FROM temp.import_sessions i
+        WHERE NOT EXISTS (
+            SELECT 1 FROM numbering_sessions s
+            WHERE s.guild_id = ?1 AND s.started_at = i.started_at AND s.channel_id = i.channel_id
+        )
+        ORDER BY i.seq"""),
+    ("action_log",
+     """INSERT INTO action_logs (guild_id, user_id, action, details, timestamp)
+        SELECT ?1, i.user_id, i.action, i.details, i.timestamp
+        FROM temp.import_logs i
+        WHERE NOT EXISTS (
+            SELECT 1 FROM action_logs l
+            WHERE l.timestamp = i.timestamp AND l.guild_id = ?1 AND l.user_id = i.user_id
+              AND l.action = i.action AND l.details IS i.details
+        )
+        ORDER BY i.seq"""),
+)
+
+# Счётчики ведущих сервера ?1 по итоговой истории (без UPDATE ... FROM - SQLite 3.24+)
+IMPORT_HOST_TOTALS_STATEMENTS = (
+    """INSERT INTO temp.import_host_totals (host_id, sessions, last_started)
+       SELECT host_id, COUNT(*), MAX(started_at)
+       FROM numbering_sessions WHERE guild_id = ?1 AND host_id IS NOT NULL
+       GROUP BY host_id""",
+    """UPDATE hosts SET
+           sessions_count = (SELECT t.sessions FROM temp.import_host_totals t WHERE t.host_id = hosts.host_id),
+           last_session = (SELECT t.last_started FROM temp.import_host_totals t WHERE t.host_id = hosts.host_id)
+       WHERE guild_id = ?1 AND host_id IN (SELECT host_id FROM temp.import_host_totals)""",
+)
+
+# Таблицы сервера, очищаемые при импорте с заменой (порядок учитывает внешние ключи)
+IMPORT_REPLACE_TABLES = ("action_logs", "host_daily_stats", "numbering_sessions", "hosts", "authorized_users")
+
+
+class Database(StorageBackend):
     """Класс для работы с базой данных SQLite"""
     
     def __init__(self, db_path: Path):
@@ -30,12 +220,42 @@ class Database:
         """Инициализация базы данных и создание таблиц"""
         try:
             self.connection = await aiosqlite.connect(str(self.db_path))
+            await self._configure_auto_vacuum()
+            # WAL: чтение (в том числе резервное копирование) не блокирует запись
+            async with self.connection.execute("PRAGMA journal_mode = WAL"):
+                pass
             await self._create_tables()
             logger.info(f"База данных инициализирована: {self.db_path}")
         except Exception as e:
             logger.error(f"Ошибка инициализации базы данных: {e}")
             raise
             
+    async def _configure_auto_vacuum(self):
+        """
+        Включить инкрементальный auto_vacuum (освобождение страниц порциями)
+        
+        Новая база создаётся сразу в этом режиме. Для существующей он
+        вступает в силу только после полного VACUUM, который блокирует всю
+        базу - при запуске он не выполняется, а только предлагается в логе.
+        """
+        async with self.connection.execute("PRAGMA auto_vacuum") as cursor:
+            mode = (await cursor.fetchone())[0]
+        if mode == 2:  # INCREMENTAL
+            return
+            
+        async with self.connection.execute("PRAGMA page_count") as cursor:
+            page_count = (await cursor.fetchone())[0]
+        if page_count == 0:
+            async with self.connection.execute("PRAGMA auto_vacuum = INCREMENTAL"):
+                pass
+            return
+            
+        logger.warning(
+            "База данных не в режиме auto_vacuum=INCREMENTAL: место после архивации журнала "
+            "не возвращается файловой системе. Однократно при остановленном боте выполните: "
+            f"sqlite3 {self.db_path} \"PRAGMA auto_vacuum = INCREMENTAL; VACUUM;\""
+        )
+                
     async def _create_tables(self):
         """Создание необходимых таблиц"""
         async with self.connection.executescript("""
@@ -44,7 +264,8 @@ class Database:
                 guild_id INTEGER PRIMARY KEY,
                 guild_name TEXT,
                 joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                settings TEXT DEFAULT '{}'
+                settings TEXT DEFAULT '{}',
+                left_at TIMESTAMP  -- бот покинул сервер; данные удаляются после отсрочки
             );
             
             -- Таблица пользователей с правами
@@ -97,11 +318,52 @@ class Database:
             
             -- Индексы для производительности
             CREATE INDEX IF NOT EXISTS idx_hosts_guild ON hosts(guild_id);
-            CREATE INDEX IF NOT EXISTS idx_sessions_guild ON numbering_sessions(guild_id);
-            CREATE INDEX IF NOT EXISTS idx_logs_guild ON action_logs(guild_id);
+            CREATE INDEX IF NOT EXISTS idx_sessions_guild_started ON numbering_sessions(guild_id, started_at);
+            CREATE INDEX IF NOT EXISTS idx_logs_guild_log ON action_logs(guild_id, log_id);
             CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON action_logs(timestamp);
+            
+            -- Покрываются idx_logs_guild_log и idx_sessions_guild_started
+            DROP INDEX IF EXISTS idx_logs_guild;
+            DROP INDEX IF EXISTS idx_sessions_guild;
+            
+            -- Дневные агрегаты по ведущим (для рейтингов за период)
+            CREATE TABLE IF NOT EXISTS host_daily_stats (
+                guild_id INTEGER,
+                day DATE,
+                host_id INTEGER,
+                sessions_count INTEGER DEFAULT 0,
+                participants_count INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, day, host_id),
+                FOREIGN KEY (host_id) REFERENCES hosts(host_id)
+            ) WITHOUT ROWID;
+            
+            -- Служебные значения бота (хэш команд и т.п.)
+            CREATE TABLE IF NOT EXISTS bot_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
         """):
             pass
+
+        # Базы, созданные до появления left_at
+        async with self.connection.execute("PRAGMA table_info(guilds)") as cursor:
+            guild_columns = {row[1] for row in await cursor.fetchall()}
+        if "left_at" not in guild_columns:
+            async with self.connection.execute("ALTER TABLE guilds ADD COLUMN left_at TIMESTAMP"):
+                pass
+        async with self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_guilds_left ON guilds(left_at) WHERE left_at IS NOT NULL"
+        ):
+            pass
+        
+        # Заполняем агрегаты из истории, если таблица только что появилась
+        async with self.connection.execute(
+            "SELECT EXISTS (SELECT 1 FROM host_daily_stats)"
+        ) as cursor:
+            has_rollups = (await cursor.fetchone())[0]
+        if not has_rollups:
+            await self.backfill_host_rollups()
             
     async def ensure_guild_exists(self, guild_id: int, guild_name: str = None) -> None:
         """Убедиться, что сервер существует в базе данных"""
@@ -119,7 +381,7 @@ class Database:
         ) as cursor:
             row = await cursor.fetchone()
             if row:
-                return json.loads(row[0])
+                return fastjson.loads(row[0])
             return {}
             
     async def update_guild_settings(self, guild_id: int, settings: Dict[str, Any]) -> None:
@@ -127,10 +389,119 @@ class Database:
         await self.ensure_guild_exists(guild_id)
         async with self.connection.execute(
             "UPDATE guilds SET settings = ? WHERE guild_id = ?",
-            (json.dumps(settings, ensure_ascii=False), guild_id)
+            (fastjson.dumps(settings), guild_id)
+        ):
+            await self.connection.commit()
+            
+    async def get_meta(self, key: str) -> Optional[str]:
+        """Получить служебное значение"""
+        async with self.connection.execute(
+            "SELECT value FROM bot_meta WHERE key = ?", (key,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+            
+    async def set_meta(self, key: str, value: str) -> None:
+        """Сохранить служебное значение"""
+        async with self.connection.execute(
+            """INSERT INTO bot_meta (key, value) VALUES (?, ?) 
+               ON CONFLICT (key) DO UPDATE 
+               SET value = excluded.value, updated_at = CURRENT_TIMESTAMP""",
+            (key, value)
         ):
             await self.connection.commit()
             
+    async def reconcile_guilds(self, guilds: List[Tuple[int, Optional[str]]],
+                               mark_missing: bool = True, shard_count: Optional[int] = None,
+                               shard_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        """Сверить серверы бота с базой одной транзакцией"""
+        async with self.connection.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS current_guilds (guild_id INTEGER PRIMARY KEY, guild_name TEXT)"
+        ):
+            pass
+        async with self.connection.execute("DELETE FROM temp.current_guilds"):
+            pass
+        await self.connection.executemany(
+            "INSERT OR REPLACE INTO temp.current_guilds (guild_id, guild_name) VALUES (?, ?)",
+            guilds
+        )
+        
+        async with self.connection.execute(
+            """SELECT COUNT(*) FROM temp.current_guilds c
+               WHERE NOT EXISTS (SELECT 1 FROM guilds g WHERE g.guild_id = c.guild_id)"""
+        ) as cursor:
+            added = (await cursor.fetchone())[0]
+            
+        async with self.connection.execute(
+            """INSERT INTO guilds (guild_id, guild_name)
+               SELECT guild_id, guild_name FROM temp.current_guilds WHERE true
+               ON CONFLICT (guild_id) DO UPDATE
+               SET guild_name = COALESCE(excluded.guild_name, guilds.guild_name), left_at = NULL"""
+        ):
+            pass
+            
+        left = 0
+        if mark_missing:
+            query = """UPDATE guilds SET left_at = CURRENT_TIMESTAMP
+                   WHERE left_at IS NULL
+                     AND guild_id NOT IN (SELECT guild_id FROM temp.current_guilds)"""
+            params: List[int] = []
+            if shard_ids is not None:
+                # Только серверы шардов этого процесса
+                query += f" AND (guild_id >> 22) % ? IN ({', '.join('?' * len(shard_ids))})"
+                params = [shard_count, *shard_ids]
+                
+            async with self.connection.execute(query, params) as cursor:
+                left = cursor.rowcount
+                
+        await self.connection.commit()
+        return {"added": added, "left": left}
+        
+    async def mark_guild_left(self, guild_id: int) -> None:
+        """Отметить, что бот покинул сервер"""
+        async with self.connection.execute(
+            "UPDATE guilds SET left_at = CURRENT_TIMESTAMP WHERE guild_id = ? AND left_at IS NULL",
+            (guild_id,)
+        ):
+            await self.connection.commit()
+            
+    async def get_departed_guilds(self, left_before: str, limit: int = 100) -> List[int]:
+        """Серверы, покинутые раньше указанного момента"""
+        return [guild_id for _, guild_id in await self.get_departed_guilds_with_time(left_before, limit)]
+        
+    async def get_departed_guilds_with_time(self, left_before: str,
+                                            limit: int = 100) -> List[Tuple[str, int]]:
+        """Покинутые серверы с моментом ухода: [(left_at, guild_id)] по возрастанию left_at"""
+        async with self.connection.execute(
+            """SELECT left_at, guild_id FROM guilds
+               WHERE left_at IS NOT NULL AND left_at < ?
+               ORDER BY left_at, guild_id
+               LIMIT ?""",
+            (left_before, limit)
+        ) as cursor:
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+            
+    async def purge_guild_data(self, guild_id: int, batch_size: int = 500) -> int:
+        """Удалить следующую порцию данных покинутого сервера"""
+        async with self.connection.execute(
+            "SELECT left_at FROM guilds WHERE guild_id = ?", (guild_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if not row or row[0] is None:
+            # Бот вернулся на сервер (или сервер уже удалён)
+            return 0
+            
+        for statement in PURGE_STATEMENTS:
+            async with self.connection.execute(statement, (guild_id, batch_size)) as cursor:
+                deleted = cursor.rowcount
+            if deleted:
+                await self.connection.commit()
+                return deleted
+                
+        async with self.connection.execute("DELETE FROM guilds WHERE guild_id = ?", (guild_id,)):
+            await self.connection.commit()
+        return 0
+        
     async def add_authorized_user(self, guild_id: int, user_id: int, role: str, added_by: int) -> None:
         """Добавить авторизованного пользователя"""
         async with self.connection.execute(
@@ -199,15 +570,32 @@ class Database:
                 
         return host_id
         
-    async def get_active_hosts(self, guild_id: int) -> List[Dict[str, Any]]:
-        """Получить список активных ведущих"""
-        async with self.connection.execute(
-            """SELECT host_id, user_id, nickname, sessions_count, last_session 
-               FROM hosts 
-               WHERE guild_id = ? AND is_active = 1 
-               ORDER BY sessions_count DESC""",
-            (guild_id,)
-        ) as cursor:
+    async def get_active_hosts(self, guild_id: int, period: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Получить список активных ведущих
+        
+        Args:
+            guild_id: ID сервера
+            period: Период рейтинга (day, week, month) или None - за всё время
+        """
+        if period is None:
+            query = """SELECT host_id, user_id, nickname, sessions_count, last_session 
+                       FROM hosts 
+                       WHERE guild_id = ? AND is_active = 1 
+                       ORDER BY sessions_count DESC"""
+            params = (guild_id,)
+        else:
+            # Считаем по дневным агрегатам, а не по сырым сессиям
+            query = """SELECT h.host_id, h.user_id, h.nickname, 
+                              SUM(r.sessions_count) AS period_sessions, h.last_session 
+                       FROM host_daily_stats r 
+                       JOIN hosts h ON h.host_id = r.host_id 
+                       WHERE r.guild_id = ? AND r.day >= ? AND h.is_active = 1 
+                       GROUP BY r.host_id 
+                       ORDER BY period_sessions DESC"""
+            params = (guild_id, self._period_start(period))
+            
+        async with self.connection.execute(query, params) as cursor:
             rows = await cursor.fetchall()
             return [
                 {
@@ -238,6 +626,18 @@ class Database:
                    last_session = CURRENT_TIMESTAMP 
                WHERE host_id = ?""",
             (host_id,)
+        ):
+            pass
+            
+        # Обновляем дневной агрегат
+        async with self.connection.execute(
+            """INSERT INTO host_daily_stats 
+               (guild_id, day, host_id, sessions_count, participants_count) 
+               VALUES (?, date('now'), ?, 1, ?) 
+               ON CONFLICT (guild_id, day, host_id) DO UPDATE 
+               SET sessions_count = sessions_count + 1, 
+                   participants_count = participants_count + excluded.participants_count""",
+            (guild_id, host_id, participants_count)
         ):
             await self.connection.commit()
             
@@ -260,30 +660,117 @@ class Database:
         ):
             await self.connection.commit()
             
-    async def get_recent_logs(self, guild_id: int, limit: int = 50) -> List[Dict[str, Any]]:
-        """Получить последние логи"""
+    async def get_logs_page(self, guild_id: int, before_id: Optional[int] = None,
+                            limit: int = 10) -> Dict[str, Any]:
+        """
+        Получить страницу логов (keyset-пагинация по log_id)
+        
+        Args:
+            guild_id: ID сервера
+            before_id: Курсор - log_id, после которого продолжать (None - с начала)
+            limit: Размер страницы
+            
+        Returns:
+            Словарь с записями ('logs') и курсором следующей страницы ('next_cursor')
+        """
+        # Берём на одну запись больше, чтобы узнать, есть ли следующая страница
+        if before_id is None:
+            query = """SELECT log_id, user_id, action, details, timestamp 
+                       FROM action_logs 
+                       WHERE guild_id = ? 
+                       ORDER BY log_id DESC 
+                       LIMIT ?"""
+            params = (guild_id, limit + 1)
+        else:
+            query = """SELECT log_id, user_id, action, details, timestamp 
+                       FROM action_logs 
+                       WHERE guild_id = ? AND log_id < ? 
+                       ORDER BY log_id DESC 
+                       LIMIT ?"""
+            params = (guild_id, before_id, limit + 1)
+            
+        async with self.connection.execute(query, params) as cursor:
+            rows = await cursor.fetchall()
+            
+        logs = [
+            {
+                "log_id": row[0],
+                "user_id": row[1],
+                "action": row[2],
+                "details": row[3],
+                "timestamp": row[4]
+            }
+            for row in rows[:limit]
+        ]
+        next_cursor = logs[-1]['log_id'] if len(rows) > limit else None
+        
+        return {"logs": logs, "next_cursor": next_cursor}
+        
+    async def get_logs_before(self, cutoff: str, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Получить самые старые логи, записанные раньше указанного момента
+        
+        Args:
+            cutoff: Граница в формате 'YYYY-MM-DD HH:MM:SS' (UTC)
+            limit: Максимальное количество записей
+        """
         async with self.connection.execute(
-            """SELECT log_id, user_id, action, details, timestamp 
+            """SELECT log_id, guild_id, user_id, action, details, timestamp 
                FROM action_logs 
-               WHERE guild_id = ? 
-               ORDER BY timestamp DESC 
+               WHERE timestamp < ? 
+               ORDER BY timestamp 
                LIMIT ?""",
-            (guild_id, limit)
+            (cutoff, limit)
         ) as cursor:
             rows = await cursor.fetchall()
             return [
                 {
                     "log_id": row[0],
-                    "user_id": row[1],
-                    "action": row[2],
-                    "details": row[3],
-                    "timestamp": row[4]
+                    "guild_id": row[1],
+                    "user_id": row[2],
+                    "action": row[3],
+                    "details": row[4],
+                    "timestamp": row[5]
                 }
                 for row in rows
             ]
             
-    async def get_statistics(self, guild_id: int) -> Dict[str, Any]:
-        """Получить статистику сервера"""
+    async def delete_logs(self, log_ids: List[int]) -> None:
+        """Удалить записи логов по их ID"""
+        await self.connection.executemany(
+            "DELETE FROM action_logs WHERE log_id = ?",
+            [(log_id,) for log_id in log_ids]
+        )
+        await self.connection.commit()
+        
+    async def incremental_vacuum(self, pages: int = 100) -> int:
+        """
+        Вернуть файловой системе часть свободных страниц
+        
+        Args:
+            pages: Сколько страниц освободить за один шаг
+            
+        Returns:
+            Количество свободных страниц, оставшихся в файле
+        """
+        async with self.connection.execute(f"PRAGMA incremental_vacuum({int(pages)})") as cursor:
+            await cursor.fetchall()
+        await self.connection.commit()
+        
+        async with self.connection.execute("PRAGMA freelist_count") as cursor:
+            return (await cursor.fetchone())[0]
+            
+    async def get_statistics(self, guild_id: int, period: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Получить статистику сервера
+        
+        Args:
+            guild_id: ID сервера
+            period: Период статистики (day, week, month) или None - за всё время
+        """
+        if period is not None:
+            return await self._get_period_statistics(guild_id, period)
+            
         stats = {}
         
         # Количество сессий
@@ -321,8 +808,187 @@ class Database:
             
         return stats
         
+    async def _get_period_statistics(self, guild_id: int, period: str) -> Dict[str, Any]:
+        """Статистика сервера за период по дневным агрегатам"""
+        since = self._period_start(period)
+        stats = {}
+        
+        # Сессии и ведущие за период (ведущие - только активные, как в топе)
+        async with self.connection.execute(
+            """SELECT COALESCE(SUM(r.sessions_count), 0), 
+                      COUNT(DISTINCT CASE WHEN h.is_active = 1 THEN r.host_id END) 
+               FROM host_daily_stats r 
+               LEFT JOIN hosts h ON h.host_id = r.host_id 
+               WHERE r.guild_id = ? AND r.day >= ?""",
+            (guild_id, since)
+        ) as cursor:
+            row = await cursor.fetchone()
+            stats['total_sessions'] = row[0]
+            stats['active_hosts'] = row[1]
+            
+        # Топ ведущих за период
+        async with self.connection.execute(
+            """SELECT h.user_id, h.nickname, SUM(r.sessions_count) AS period_sessions 
+               FROM host_daily_stats r 
+               JOIN hosts h ON h.host_id = r.host_id 
+               WHERE r.guild_id = ? AND r.day >= ? AND h.is_active = 1 
+               GROUP BY r.host_id 
+               ORDER BY period_sessions DESC 
+               LIMIT 5""",
+            (guild_id, since)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            stats['top_hosts'] = [
+                {
+                    "user_id": row[0],
+                    "nickname": row[1],
+                    "sessions_count": row[2]
+                }
+                for row in rows
+            ]
+            
+        return stats
+        
+    async def backfill_host_rollups(self, guild_id: Optional[int] = None) -> None:
+        """
+        Пересчитать дневные агрегаты ведущих по истории сессий
+        
+        Args:
+            guild_id: ID сервера или None для всех серверов
+        """
+        where = "WHERE guild_id = ?" if guild_id is not None else ""
+        params = (guild_id,) if guild_id is not None else ()
+        
+        async with self.connection.execute(
+            f"DELETE FROM host_daily_stats {where}", params
+        ):
+            pass
+            
+        async with self.connection.execute(
+            ROLLUP_BACKFILL_SQL.format(where=where), params
+        ) as cursor:
+            restored = cursor.rowcount
+            await self.connection.commit()
+            
+        if restored:
+            logger.info(f"Восстановлено дневных агрегатов ведущих: {restored}")
+            
+    async def list_guilds(self) -> List[Dict[str, Any]]:
+        """Получить все серверы из базы"""
+        async with self.connection.execute(
+            "SELECT guild_id, guild_name FROM guilds ORDER BY guild_id"
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [{"guild_id": row[0], "guild_name": row[1]} for row in rows]
+            
+    async def iter_export_rows(self, section: str, guild_id: int,
+                               chunk_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Читать раздел данных сервера порциями"""
+        query, columns = EXPORT_QUERIES[section]
+        last_id = 0
+        
+        while True:
+            async with self.connection.execute(query, (guild_id, last_id, chunk_size)) as cursor:
+                rows = await cursor.fetchall()
+            if not rows:
+                break
+                
+            chunk = [dict(zip(columns, row)) for row in rows]
+            if section == "hosts":
+                for host in chunk:
+                    host['is_active'] = bool(host['is_active'])
+            yield chunk
+            
+            if len(rows) < chunk_size:
+                break
+            last_id = rows[-1][0]
+
+    async def import_guild_data(self, guild_id: int, guild_name: Optional[str],
+                                batches: AsyncIterator[List[Tuple[str, Dict[str, Any]]]],
+                                replace: bool = False) -> Dict[str, int]:
+        """
+        Загрузить данные сервера из экспорта одной короткой транзакцией
+        
+        Загрузка идёт через отдельное соединение. Порции файла сначала
+        записываются во временные таблицы этого соединения - основная база
+        при этом не блокируется, сколько бы ни длилось чтение и разбор
+        файла. Затем одна транзакция BEGIN IMMEDIATE (удаление при replace,
+        перенос записей, пересчёт счётчиков и агрегатов) применяет всё
+        разом: запросы бота ждут только этот шаг из INSERT ... SELECT, а
+        сбой или отмена на любом этапе оставляют данные сервера прежними.
+        """
+        imported = {record_type: 0 for record_type in ("settings", "authorized_user", "host", "session", "action_log")}
+        settings: Optional[Dict[str, Any]] = None
+        
+        async with aiosqlite.connect(self.db_path) as conn:
+            await conn.executescript(IMPORT_STAGING_SCHEMA)
+            
+            async for batch in batches:
+                grouped = self._group_import_batch(batch)
+                for data in grouped.pop("settings", []):
+                    settings = data if settings is None else {**settings, **data}
+                    imported["settings"] += 1
+                for record_type, (statement, to_params) in IMPORT_STAGING_STATEMENTS.items():
+                    rows = grouped.get(record_type)
+                    if rows:
+                        await conn.executemany(statement, [to_params(row) for row in rows])
+                await conn.commit()
+                
+            params = (guild_id,)
+            async with self._import_transaction(conn):
+                await conn.execute(
+                    "INSERT OR IGNORE INTO guilds (guild_id, guild_name) VALUES (?, ?)",
+                    (guild_id, guild_name)
+                )
+                if settings is not None:
+                    if not replace:
+                        async with conn.execute(
+                            "SELECT settings FROM guilds WHERE guild_id = ?", params
+                        ) as cursor:
+                            row = await cursor.fetchone()
+                        settings = {**fastjson.loads(row[0] or '{}'), **settings}
+                    await conn.execute(
+                        "UPDATE guilds SET settings = ? WHERE guild_id = ?",
+                        (fastjson.dumps(settings), guild_id)
+                    )
+                    
+                if replace:
+                    for table in IMPORT_REPLACE_TABLES:
+                        await conn.execute(f"DELETE FROM {table} WHERE guild_id = ?", params)
+                        
+                for record_type, statement in IMPORT_APPLY_STATEMENTS:
+                    async with conn.execute(statement, params) as cursor:
+                        imported[record_type] += cursor.rowcount
+                        
+                # Счётчики ведущих и агрегаты - по итоговой истории
+                for statement in IMPORT_HOST_TOTALS_STATEMENTS:
+                    await conn.execute(statement, params)
+                await conn.execute("DELETE FROM host_daily_stats WHERE guild_id = ?", params)
+                await conn.execute(ROLLUP_BACKFILL_SQL.format(where="WHERE guild_id = ?"), params)
+                
+        return imported
+        
+    @staticmethod
+    @contextlib.asynccontextmanager
+    async def _import_transaction(conn: aiosqlite.Connection) -> AsyncIterator[None]:
+        """Транзакция записи на соединении импорта: фиксация или откат целиком"""
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+            
     async def close(self):
         """Закрыть соединение с базой данных"""
         if self.connection:
+            # Перенос WAL в основной файл: после остановки база - один файл
+            try:
+                await self.connection.commit()
+                async with self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)"):
+                    pass
+            except Exception as e:
+                logger.warning(f"Не удалось выполнить checkpoint WAL: {e}")
             await self.connection.close()
             logger.info("Соединение с базой данных закрыто") 
\ No newline at end of file
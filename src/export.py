@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Потоковый экспорт данных серверов
+
+Формат - NDJSON, сжатый gzip: одна JSON-запись на строку.
+
+    {"type": "header", "format": "numericbot-export", "version": 1, ...}
+    {"type": "guild", "guild_id": ..., "guild_name": ...}
+    {"type": "settings", "guild_id": ..., "data": {...}}
+    {"type": "authorized_user", "guild_id": ..., "data": {...}}
+    {"type": "host", "guild_id": ..., "data": {...}}
+    {"type": "session", "guild_id": ..., "data": {...}}
+    {"type": "action_log", "guild_id": ..., "data": {...}}
+    ... (следующие серверы)
+    {"type": "end", "guilds": N, "records": M}
+
+Данные читаются из хранилища порциями и сразу сжимаются во временный
+файл, который переносится на диск при превышении порога, поэтому
+потребление памяти не зависит от объёма истории сервера.
+"""
+
+import asyncio
+import gzip
+import logging
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from .utils import fastjson
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = "numericbot-export"
+EXPORT_VERSION = 1
+
+# Тип записи для каждого порционного раздела хранилища
+SECTION_RECORD_TYPES = {
+    "hosts": "host",
+    "sessions": "session",
+    "action_logs": "action_log",
+}
+
+
+class GuildExporter:
+    """Экспорт одного или нескольких серверов в сжатый NDJSON"""
+
+    def __init__(self, database, chunk_size: int = 500,
+                 spool_limit: int = 4 * 1024 * 1024):
+        """
+        Инициализация экспортёра
+
+        Args:
+            database: Хранилище данных
+            chunk_size: Размер порции чтения из хранилища
+            spool_limit: Сколько байт держать в памяти до переноса файла на диск
+        """
+        self.db = database
+        self.chunk_size = chunk_size
+        self.spool_limit = spool_limit
+        self.records = 0
+
+    async def export(self, guilds: List[Dict[str, Any]]) -> tempfile.SpooledTemporaryFile:
+        """
+        Выгрузить серверы во временный файл
+
+        Args:
+            guilds: Серверы [{'guild_id', 'guild_name'}, ...]
+
+        Returns:
+            Файл (gzip), перемотанный в начало; вызывающий должен его закрыть
+        """
+        output = tempfile.SpooledTemporaryFile(max_size=self.spool_limit)
+        gz = gzip.GzipFile(fileobj=output, mode='wb')
+        self.records = 0
+
+        try:
+            await self._write(gz, [{
+                "type": "header",
+                "format": EXPORT_FORMAT,
+                "version": EXPORT_VERSION,
+                "exported_at": datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+                "guilds": len(guilds)
+            }])
+
+            for guild in guilds:
+                await self._export_guild(gz, guild['guild_id'], guild.get('guild_name'))
+
+            await self._write(gz, [{
+                "type": "end",
+                "guilds": len(guilds),
+                "records": self.records
+            }])
+            await asyncio.to_thread(gz.close)
+        except BaseException:
+            gz.close()
+            output.close()
+            raise
+
+        output.seek(0)
+        return output
+
+    async def _export_guild(self, gz: gzip.GzipFile, guild_id: int, guild_name: str) -> None:
+        """Записать все разделы одного сервера"""
+        settings = await self.db.get_guild_settings(guild_id)
+        authorized_users = await self.db.get_authorized_users(guild_id)
+
+        await self._write(gz, [
+            {"type": "guild", "guild_id": guild_id, "guild_name": guild_name}
+        ])
+        await self._write(gz, [
+            {"type": "settings", "guild_id": guild_id, "data": settings}
+        ], count=True)
+        await self._write(gz, [
+            {"type": "authorized_user", "guild_id": guild_id, "data": user}
+            for user in authorized_users
+        ], count=True)
+
+        for section, record_type in SECTION_RECORD_TYPES.items():
+            async for chunk in self.db.iter_export_rows(section, guild_id, self.chunk_size):
+                await self._write(gz, [
+                    {"type": record_type, "guild_id": guild_id, "data": row}
+                    for row in chunk
+                ], count=True)
+
+    async def _write(self, gz: gzip.GzipFile, records: Iterable[Dict[str, Any]],
+                     count: bool = False) -> None:
+        """Сериализовать порцию и сжать её вне цикла событий"""
+        lines = [fastjson.dumps(record) for record in records]
+        if not lines:
+            return
+        if count:
+            self.records += len(lines)
+        data = ("\n".join(lines) + "\n").encode('utf-8')
+        await asyncio.to_thread(gz.write, data)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Архивация журнала действий (action_logs)
+
+Записи старше срока хранения небольшими порциями переносятся из основной
+базы в сжатые файлы по месяцам: action_logs_YYYY-MM.ndjson.gz. Каждая
+порция дописывается отдельным gzip-блоком, поэтому файл читается обычным
+gzip.open. Архив можно просматривать без бота:
+
+    python -m src.log_archive data/archive --guild 123 --month 2025-01
+"""
+
+import argparse
+import asyncio
+import gzip
+import logging
+import sys
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .utils import fastjson
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PATTERN = "action_logs_{month}.ndjson.gz"
+
+# Сколько последних ID помнить для отсева повторов (не меньше размера порции)
+DEDUP_WINDOW = 10000
+
+
+class LogArchiver:
+    """Перенос старых записей журнала действий в архив"""
+
+    def __init__(self, database, archive_dir: Path, retention_days: int,
+                 batch_size: int = 500, vacuum_pages: int = 200,
+                 pause: float = 0.05):
+        """
+        Инициализация архиватора
+
+        Args:
+            database: Объект базы данных
+            archive_dir: Директория для архивных файлов
+            retention_days: Сколько дней записи остаются в основной базе
+            batch_size: Размер порции переносимых записей
+            vacuum_pages: Сколько страниц освобождать за один шаг
+            pause: Пауза между порциями (сек), чтобы не держать блокировку записи
+        """
+        self.db = database
+        self.archive_dir = Path(archive_dir)
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.pause = pause
+
+    async def run(self) -> int:
+        """
+        Выполнить архивацию и освободить место в файле базы
+
+        Returns:
+            Количество перенесённых записей
+        """
+        if self.retention_days <= 0:
+            return 0
+
+        cutoff = (datetime.utcnow() - timedelta(days=self.retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+        archived = 0
+
+        while True:
+            logs = await self.db.get_logs_before(cutoff, self.batch_size)
+            if not logs:
+                break
+
+            # Сначала пишем в архив, потом удаляем: при сбое запись может
+            # продублироваться в архиве, но не потеряться
+            await asyncio.to_thread(self._append_to_archive, logs)
+            await self.db.delete_logs([log['log_id'] for log in logs])
+            archived += len(logs)
+
+            if len(logs) < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+
+        if archived:
+            logger.info(f"Перенесено в архив записей журнала: {archived}")
+
+        await self.reclaim_space()
+        return archived
+
+    async def reclaim_space(self) -> None:
+        """Постепенно вернуть свободные страницы файловой системе"""
+        previous = None
+        while True:
+            remaining = await self.db.incremental_vacuum(self.vacuum_pages)
+            # Без auto_vacuum=INCREMENTAL страницы не освобождаются - не крутимся
+            if remaining <= 0 or remaining == previous:
+                break
+            previous = remaining
+            await asyncio.sleep(self.pause)
+
+    def _append_to_archive(self, logs: List[Dict[str, Any]]) -> None:
+        """Дописать записи в архивные файлы соответствующих месяцев"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+        by_month = defaultdict(list)
+        for log in logs:
+            by_month[str(log['timestamp'])[:7]].append(log)
+
+        for month, month_logs in by_month.items():
+            path = self.archive_dir / ARCHIVE_PATTERN.format(month=month)
+            lines = "".join(
+                fastjson.dumps(log) + "\n" for log in month_logs
+            )
+            with gzip.open(path, 'ab') as f:
+                f.write(lines.encode('utf-8'))
+
+
+def iter_archived_logs(archive_dir: Path, guild_id: Optional[int] = None,
+                       month: Optional[str] = None,
+                       dedup_window: int = DEDUP_WINDOW) -> Iterator[Dict[str, Any]]:
+    """
+    Прочитать записи из архива
+
+    Повторы возможны после сбоя между записью порции и её удалением из базы:
+    та же порция дописывается в тот же файл сразу следом. Поэтому повторы
+    ищутся только среди последних dedup_window записей файла - память не
+    растёт с размером архива.
+
+    Args:
+        archive_dir: Директория с архивными файлами
+        guild_id: Фильтр по серверу
+        month: Фильтр по месяцу в формате YYYY-MM
+        dedup_window: Сколько последних ID файла помнить (не меньше размера порции)
+
+    Yields:
+        Записи журнала действий в порядке месяцев
+    """
+    pattern = ARCHIVE_PATTERN.format(month=month or "*")
+
+    for path in sorted(Path(archive_dir).glob(pattern)):
+        recent = deque()
+        seen = set()
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                log = fastjson.loads(line)
+                log_id = log['log_id']
+                if log_id in seen:
+                    continue
+                seen.add(log_id)
+                recent.append(log_id)
+                if len(recent) > dedup_window:
+                    seen.discard(recent.popleft())
+                if guild_id is not None and log['guild_id'] != guild_id:
+                    continue
+                yield log
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Просмотр архива журнала действий из командной строки"""
+    parser = argparse.ArgumentParser(description="Просмотр архива журнала действий")
+    parser.add_argument("archive_dir", type=Path, help="Директория архива")
+    parser.add_argument("--guild", type=int, help="ID сервера")
+    parser.add_argument("--month", help="Месяц в формате YYYY-MM")
+    parser.add_argument("--action", help="Фильтр по типу действия")
+    args = parser.parse_args(argv)
+
+    for log in iter_archived_logs(args.archive_dir, args.guild, args.month):
+        if args.action and log['action'] != args.action:
+            continue
+        sys.stdout.write(fastjson.dumps(log) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
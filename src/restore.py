@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Восстановление данных серверов из файлов экспорта (см. src/export.py)
+
+Файл читается потоком дважды: сначала целиком проверяется формат, затем
+данные каждого сервера загружаются порциями и применяются атомарно: при
+сбое данные сервера остаются прежними (см. StorageBackend.import_guild_data).
+
+Режимы:
+    merge   - добавить к существующим данным: настройки и права обновляются,
+              ведущие сопоставляются по user_id, из истории (сессии, журнал)
+              добавляются только записи, которых ещё нет
+    replace - удалить данные сервера и загрузить их из файла
+
+Запуск без бота (хранилище берётся из конфигурации):
+
+    python -m src.restore export.ndjson.gz --mode merge
+"""
+
+import argparse
+import asyncio
+import gzip
+import logging
+import sys
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .export import EXPORT_FORMAT, EXPORT_VERSION
+from .utils import fastjson
+
+logger = logging.getLogger(__name__)
+
+IMPORT_MODES = ("merge", "replace")
+
+# Обязательные поля данных для каждого типа записи
+REQUIRED_FIELDS = {
+    "authorized_user": {"user_id": int, "role": str},
+    "host": {"user_id": int},
+    "session": {"channel_id": int, "started_at": str},
+    "action_log": {"user_id": int, "action": str, "timestamp": str},
+}
+
+
+class ExportFormatError(ValueError):
+    """Файл экспорта повреждён или имеет неверный формат"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"строка {line}: {message}")
+        self.line = line
+
+
+def _open_lines(fileobj: BinaryIO) -> Iterator[bytes]:
+    """Строки файла экспорта (gzip или несжатый NDJSON)"""
+    fileobj.seek(0)
+    magic = fileobj.read(2)
+    fileobj.seek(0)
+    if magic == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    return iter(fileobj)
+
+
+def _parse(line_number: int, raw: bytes) -> Dict[str, Any]:
+    try:
+        record = fastjson.loads(raw)
+    except ValueError as e:
+        raise ExportFormatError(line_number, f"некорректный JSON ({e})")
+    if not isinstance(record, dict) or not isinstance(record.get("type"), str):
+        raise ExportFormatError(line_number, "запись без поля type")
+    return record
+
+
+def _check_data(line_number: int, record: Dict[str, Any]) -> None:
+    """Проверить поля данных записи"""
+    data = record.get("data")
+    if record["type"] == "settings":
+        if not isinstance(data, dict):
+            raise ExportFormatError(line_number, "settings.data должно быть объектом")
+        return
+
+    required = REQUIRED_FIELDS.get(record["type"])
+    if required is None:
+        raise ExportFormatError(line_number, f"неизвестный тип записи {record['type']!r}")
+    if not isinstance(data, dict):
+        raise ExportFormatError(line_number, f"{record['type']}.data должно быть объектом")
+    for field, field_type in required.items():
+        if not isinstance(data.get(field), field_type):
+            raise ExportFormatError(line_number, f"{record['type']}.{field}: ожидается {field_type.__name__}")
+
+
+def validate_export(fileobj: BinaryIO) -> List[Dict[str, Any]]:
+    """
+    Проверить файл экспорта целиком, не загружая его в память
+
+    Args:
+        fileobj: Файл экспорта (с поддержкой seek)
+
+    Returns:
+        Серверы из файла: [{'guild_id', 'guild_name', 'records'}, ...]
+
+    Raises:
+        ExportFormatError: Если файл повреждён
+    """
+    guilds: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    header_seen = end_seen = False
+    records = 0
+    line_number = 0
+
+    try:
+        for line_number, raw in enumerate(_open_lines(fileobj), 1):
+            if not raw.strip():
+                continue
+            if end_seen:
+                raise ExportFormatError(line_number, "данные после записи end")
+
+            record = _parse(line_number, raw)
+            record_type = record["type"]
+
+            if not header_seen:
+                if record_type != "header" or record.get("format") != EXPORT_FORMAT:
+                    raise ExportFormatError(line_number, "это не файл экспорта бота")
+                if record.get("version") != EXPORT_VERSION:
+                    raise ExportFormatError(line_number, f"неподдерживаемая версия {record.get('version')}")
+                header_seen = True
+                continue
+
+            if record_type == "guild":
+                if not isinstance(record.get("guild_id"), int):
+                    raise ExportFormatError(line_number, "guild.guild_id должно быть числом")
+                current = {"guild_id": record["guild_id"], "guild_name": record.get("guild_name"), "records": 0}
+                guilds.append(current)
+            elif record_type == "end":
+                if record.get("records") != records or record.get("guilds") != len(guilds):
+                    raise ExportFormatError(line_number, "количество записей не совпадает с итогом")
+                end_seen = True
+            else:
+                if current is None or record.get("guild_id") != current["guild_id"]:
+                    raise ExportFormatError(line_number, "запись вне блока своего сервера")
+                _check_data(line_number, record)
+                current["records"] += 1
+                records += 1
+    except (OSError, EOFError) as e:
+        raise ExportFormatError(line_number, f"не удалось распаковать файл ({e})")
+
+    if not header_seen:
+        raise ExportFormatError(line_number, "пустой файл")
+    if not end_seen:
+        raise ExportFormatError(line_number, "файл обрезан (нет записи end)")
+    return guilds
+
+
+class _GuildStream:
+    """Последовательное чтение файла экспорта по серверам"""
+
+    def __init__(self, fileobj: BinaryIO, batch_size: int):
+        self._lines = _open_lines(fileobj)
+        self._batch_size = batch_size
+        self._pending: Optional[Dict[str, Any]] = None
+
+    def _next_record(self) -> Optional[Dict[str, Any]]:
+        if self._pending is not None:
+            record, self._pending = self._pending, None
+            return record
+        for raw in self._lines:
+            if raw.strip():
+                return fastjson.loads(raw)
+        return None
+
+    def next_guild(self) -> Optional[Dict[str, Any]]:
+        """Перейти к следующей записи guild"""
+        while True:
+            record = self._next_record()
+            if record is None or record["type"] == "end":
+                return None
+            if record["type"] == "guild":
+                return record
+
+    def _read_batch(self) -> List[Tuple[str, Dict[str, Any]]]:
+        batch = []
+        while len(batch) < self._batch_size:
+            record = self._next_record()
+            if record is None:
+                break
+            if record["type"] in ("guild", "end"):
+                self._pending = record
+                break
+            batch.append((record["type"], record["data"]))
+        return batch
+
+    async def batches(self) -> AsyncIterator[List[Tuple[str, Dict[str, Any]]]]:
+        """Порции записей текущего сервера; чтение и распаковка - в потоке"""
+        while True:
+            batch = await asyncio.to_thread(self._read_batch)
+            if not batch:
+                return
+            yield batch
+
+
+async def restore_export(database, fileobj: BinaryIO, mode: str = "merge",
+                         target_guild_id: Optional[int] = None,
+                         batch_size: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Загрузить файл экспорта в хранилище
+
+    Args:
+        database: Хранилище данных
+        fileobj: Файл экспорта (с поддержкой seek)
+        mode: merge или replace
+        target_guild_id: Загрузить данные в другой сервер (только для экспорта одного сервера)
+        batch_size: Размер порции для executemany
+
+    Returns:
+        Итоги по серверам: [{'guild_id', 'guild_name', 'imported': {...}}, ...]
+
+    Raises:
+        ExportFormatError: Если файл повреждён (ничего не загружается)
+        ValueError: Если параметры не подходят к файлу
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Неизвестный режим: {mode}")
+
+    guilds = await asyncio.to_thread(validate_export, fileobj)
+    if target_guild_id is not None and len(guilds) != 1:
+        raise ValueError("Перенос в другой сервер возможен только для экспорта одного сервера")
+
+    stream = _GuildStream(fileobj, batch_size)
+    results = []
+
+    while True:
+        guild = await asyncio.to_thread(stream.next_guild)
+        if guild is None:
+            break
+
+        guild_id = target_guild_id if target_guild_id is not None else guild["guild_id"]
+        imported = await database.import_guild_data(
+            guild_id,
+            guild.get("guild_name"),
+            stream.batches(),
+            replace=(mode == "replace")
+        )
+        logger.info(f"Сервер {guild_id} восстановлен ({mode}): {imported}")
+        results.append({"guild_id": guild_id, "guild_name": guild.get("guild_name"), "imported": imported})
+
+    return results
+
+
+async def _run_offline(path: Path, mode: str, target_guild_id: Optional[int]) -> int:
+    from .config import Config
+    from .storage import create_storage
+
+    database = create_storage(Config())
+    await database.initialize()
+    try:
+        with open(path, 'rb') as f:
+            results = await restore_export(database, f, mode, target_guild_id)
+    except (ExportFormatError, ValueError) as e:
+        logger.error(f"Импорт отменён: {e}")
+        return 1
+    finally:
+        await database.close()
+
+    for result in results:
+        logger.info(f"{result['guild_id']} ({result['guild_name']}): {result['imported']}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description="Восстановление данных из файла экспорта")
+    parser.add_argument("path", type=Path, help="Файл экспорта (.ndjson.gz)")
+    parser.add_argument("--mode", choices=IMPORT_MODES, default="merge")
+    parser.add_argument("--guild-id", type=int, help="Загрузить в другой сервер")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    return asyncio.run(_run_offline(args.path, args.mode, args.guild_id))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Интерфейс хранилища данных бота
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..utils.periods import PERIOD_DAYS
+
+# Разделы данных сервера, которые читаются порциями (экспорт)
+EXPORT_SECTIONS = ("hosts", "sessions", "action_logs")
+
+
+class StorageBackend(ABC):
+    """
+    Базовый класс хранилища
+
+    Все реализации (SQLite, PostgreSQL, в памяти) возвращают одинаковые
+    структуры: словари с теми же ключами, временные метки - строки
+    'YYYY-MM-DD HH:MM:SS' в UTC.
+    """
+
+    # Поддерживает ли хранилище несколько процессов бота одновременно
+    supports_multiprocess = False
+
+    @abstractmethod
+    async def initialize(self) -> None:
+        """Подключиться к хранилищу и создать схему"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Закрыть соединение с хранилищем"""
+
+    # Серверы и настройки
+
+    @abstractmethod
+    async def ensure_guild_exists(self, guild_id: int, guild_name: str = None) -> None:
+        """Убедиться, что сервер существует в хранилище"""
+
+    @abstractmethod
+    async def get_guild_settings(self, guild_id: int) -> Dict[str, Any]:
+        """Получить настройки сервера"""
+
+    @abstractmethod
+    async def update_guild_settings(self, guild_id: int, settings: Dict[str, Any]) -> None:
+        """Обновить настройки сервера"""
+
+    @abstractmethod
+    async def reconcile_guilds(self, guilds: List[Tuple[int, Optional[str]]],
+                               mark_missing: bool = True, shard_count: Optional[int] = None,
+                               shard_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        """
+        Сверить серверы бота с хранилищем одной транзакцией
+
+        Отсутствующие серверы добавляются, у имеющихся обновляется название
+        и снимается отметка об уходе.
+
+        Args:
+            guilds: Серверы бота [(guild_id, guild_name), ...]
+            mark_missing: Отметить ушедшими серверы, которых нет в списке
+            shard_count: Общее число шардов (вместе с shard_ids)
+            shard_ids: Шарды процесса - ушедшими отмечаются только их серверы,
+                серверы других шардов этот процесс не видит
+
+        Returns:
+            {'added': ..., 'left': ...}
+        """
+
+    @abstractmethod
+    async def mark_guild_left(self, guild_id: int) -> None:
+        """Отметить, что бот покинул сервер (данные удаляются позже)"""
+
+    @abstractmethod
+    async def get_departed_guilds(self, left_before: str, limit: int = 100) -> List[int]:
+        """Серверы, покинутые раньше указанного момента"""
+
+    @abstractmethod
+    async def purge_guild_data(self, guild_id: int, batch_size: int = 500) -> int:
+        """
+        Удалить следующую порцию данных покинутого сервера
+
+        Returns:
+            Сколько записей удалено (0 - сервер удалён полностью)
+        """
+
+    # Служебные значения бота (ключ - значение)
+
+    @abstractmethod
+    async def get_meta(self, key: str) -> Optional[str]:
+        """Получить служебное значение"""
+
+    @abstractmethod
+    async def set_meta(self, key: str, value: str) -> None:
+        """Сохранить служебное значение"""
+
+    # Авторизованные пользователи
+
+    @abstractmethod
+    async def add_authorized_user(self, guild_id: int, user_id: int, role: str, added_by: int) -> None:
+        """Добавить авторизованного пользователя"""
+
+    @abstractmethod
+    async def remove_authorized_user(self, guild_id: int, user_id: int) -> None:
+        """Удалить авторизованного пользователя"""
+
+    @abstractmethod
+    async def get_authorized_users(self, guild_id: int) -> List[Dict[str, Any]]:
+        """Получить список авторизованных пользователей"""
+
+    # Ведущие и сессии
+
+    @abstractmethod
+    async def add_or_update_host(self, guild_id: int, user_id: int, nickname: str) -> int:
+        """Добавить или обновить ведущего, вернуть host_id"""
+
+    @abstractmethod
+    async def get_active_hosts(self, guild_id: int, period: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Получить список активных ведущих (за всё время или за период)"""
+
+    @abstractmethod
+    async def start_numbering_session(self, guild_id: int, channel_id: int,
+                                      host_id: int, participants_count: int) -> int:
+        """Начать сессию нумерации, вернуть session_id"""
+
+    @abstractmethod
+    async def end_numbering_session(self, session_id: int) -> None:
+        """Завершить сессию нумерации"""
+
+    @abstractmethod
+    async def get_statistics(self, guild_id: int, period: Optional[str] = None) -> Dict[str, Any]:
+        """Получить статистику сервера (за всё время или за период)"""
+
+    @abstractmethod
+    async def backfill_host_rollups(self, guild_id: Optional[int] = None) -> None:
+        """Пересчитать дневные агрегаты ведущих по истории сессий"""
+
+    # Журнал действий
+
+    @abstractmethod
+    async def log_action(self, guild_id: int, user_id: int, action: str, details: str = "") -> None:
+        """Записать действие в журнал"""
+
+    async def get_recent_logs(self, guild_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        """Получить последние записи журнала"""
+        page = await self.get_logs_page(guild_id, limit=limit)
+        return page['logs']
+
+    @abstractmethod
+    async def get_logs_page(self, guild_id: int, before_id: Optional[int] = None,
+                            limit: int = 10) -> Dict[str, Any]:
+        """Получить страницу журнала: {'logs': [...], 'next_cursor': log_id или None}"""
+
+    @abstractmethod
+    async def get_logs_before(self, cutoff: str, limit: int = 500) -> List[Dict[str, Any]]:
+        """Получить самые старые записи журнала раньше указанного момента"""
+
+    @abstractmethod
+    async def delete_logs(self, log_ids: List[int]) -> None:
+        """Удалить записи журнала по их ID"""
+
+    async def incremental_vacuum(self, pages: int = 100) -> int:
+        """
+        Вернуть часть свободного места хранилищу
+
+        Returns:
+            Сколько свободных страниц осталось (0 - делать нечего)
+        """
+        return 0
+
+    # Выгрузка данных
+
+    @abstractmethod
+    async def list_guilds(self) -> List[Dict[str, Any]]:
+        """Получить все серверы: [{'guild_id', 'guild_name'}, ...]"""
+
+    @abstractmethod
+    def iter_export_rows(self, section: str, guild_id: int,
+                         chunk_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Читать раздел данных сервера порциями (keyset по первичному ключу)
+
+        Args:
+            section: Один из EXPORT_SECTIONS
+            guild_id: ID сервера
+            chunk_size: Размер порции
+
+        Yields:
+            Списки записей; между порциями соединение свободно для других запросов
+        """
+
+    @abstractmethod
+    async def import_guild_data(self, guild_id: int, guild_name: Optional[str],
+                                batches: AsyncIterator[List[Tuple[str, Dict[str, Any]]]],
+                                replace: bool = False) -> Dict[str, int]:
+        """
+        Загрузить данные сервера из экспорта
+
+        Ведущие сопоставляются по user_id, сессии привязываются к ведущим
+        через host_user_id. Без replace из истории добавляются только
+        записи, которых ещё нет (сессии сверяются по каналу и времени
+        начала, журнал - по пользователю, действию, деталям и времени),
+        поэтому повторный импорт того же файла ничего не дублирует.
+        Счётчики ведущих и дневные агрегаты пересчитываются по итогам
+        загрузки. Импорт атомарен: при сбое данные сервера не меняются.
+        PostgreSQL загружает сервер одной транзакцией; SQLite сначала
+        складывает файл во временные таблицы и переносит их одной
+        короткой транзакцией, чтобы не блокировать запись бота на всё
+        время чтения файла.
+
+        Args:
+            guild_id: ID сервера
+            guild_name: Название сервера (для нового сервера)
+            batches: Порции записей [(тип, данные), ...] в формате экспорта
+            replace: Удалить данные сервера перед загрузкой
+
+        Returns:
+            Количество загруженных записей по типам (для SQLite - записанных,
+            без пропущенных повторов)
+        """
+
+    # Общие помощники
+
+    @staticmethod
+    def _group_import_batch(batch: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Разложить порцию импорта по типам записей, сохраняя порядок"""
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for record_type, data in batch:
+            grouped.setdefault(record_type, []).append(data)
+        return grouped
+
+    @staticmethod
+    def _guild_shard(guild_id: int, shard_count: int) -> int:
+        """Шард сервера (формула Discord)"""
+        return (guild_id >> 22) % shard_count
+
+    @staticmethod
+    def _period_start(period: str) -> str:
+        """Первый день окна рейтинга (UTC, как и CURRENT_TIMESTAMP)"""
+        days = PERIOD_DAYS[period]
+        return (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+
+    @staticmethod
+    def _now() -> str:
+        """Текущее время UTC в формате хранилища"""
+        return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+"""
+Хранилище в памяти процесса (для тестов и бенчмарков)
+"""
+
+import bisect
+import copy
+import itertools
+import logging
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .base import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStorage(StorageBackend):
+    """Хранилище без внешних зависимостей; данные теряются при перезапуске"""
+
+    def __init__(self):
+        self.guilds: Dict[int, Dict[str, Any]] = {}
+        self.authorized_users: Dict[tuple, Dict[str, Any]] = {}  # (guild_id, user_id)
+        self.hosts: Dict[int, Dict[str, Any]] = {}  # host_id
+        self.sessions: Dict[int, Dict[str, Any]] = {}  # session_id
+        self.action_logs: Dict[int, Dict[str, Any]] = {}  # log_id
+        self.host_daily_stats: Dict[tuple, List[int]] = {}  # (guild_id, day, host_id)
+        self.meta: Dict[str, str] = {}
+
+        # Отсортированные log_id каждого сервера - аналог индекса (guild_id, log_id)
+        self._guild_logs: Dict[int, List[int]] = defaultdict(list)
+        self._host_ids = itertools.count(1)
+        self._session_ids = itertools.count(1)
+        self._log_ids = itertools.count(1)
+
+    async def initialize(self) -> None:
+        logger.info("Используется хранилище в памяти")
+
+    async def close(self) -> None:
+        pass
+
+    async def ensure_guild_exists(self, guild_id: int, guild_name: str = None) -> None:
+        self.guilds.setdefault(guild_id, {
+            "guild_name": guild_name,
+            "joined_at": self._now(),
+            "settings": {},
+            "left_at": None
+        })
+
+    async def get_guild_settings(self, guild_id: int) -> Dict[str, Any]:
+        guild = self.guilds.get(guild_id)
+        return copy.deepcopy(guild['settings']) if guild else {}
+
+    async def update_guild_settings(self, guild_id: int, settings: Dict[str, Any]) -> None:
+        await self.ensure_guild_exists(guild_id)
+        self.guilds[guild_id]['settings'] = copy.deepcopy(settings)
+
+    async def get_meta(self, key: str) -> Optional[str]:
+        return self.meta.get(key)
+
+    async def set_meta(self, key: str, value: str) -> None:
+        self.meta[key] = value
+
+    async def reconcile_guilds(self, guilds: List[Tuple[int, Optional[str]]],
+                               mark_missing: bool = True, shard_count: Optional[int] = None,
+                               shard_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        current = dict(guilds)
+        added = 0
+        for guild_id, guild_name in current.items():
+            if guild_id not in self.guilds:
+                added += 1
+            await self.ensure_guild_exists(guild_id, guild_name)
+            guild = self.guilds[guild_id]
+            guild['guild_name'] = guild_name or guild['guild_name']
+            guild['left_at'] = None
+
+        left = 0
+        if mark_missing:
+            now = self._now()
+            for guild_id, guild in self.guilds.items():
+                if guild_id in current or guild['left_at'] is not None:
+                    continue
+                if shard_ids is not None and self._guild_shard(guild_id, shard_count) not in shard_ids:
+                    continue
+                guild['left_at'] = now
+                left += 1
+        return {"added": added, "left": left}
+
+    async def mark_guild_left(self, guild_id: int) -> None:
+        guild = self.guilds.get(guild_id)
+        if guild and guild['left_at'] is None:
+            guild['left_at'] = self._now()
+
+    async def get_departed_guilds(self, left_before: str, limit: int = 100) -> List[int]:
+        departed = sorted(
+            (guild['left_at'], guild_id) for guild_id, guild in self.guilds.items()
+            if guild['left_at'] is not None and guild['left_at'] < left_before
+        )
+        return [guild_id for _, guild_id in departed[:limit]]
+
+    async def purge_guild_data(self, guild_id: int, batch_size: int = 500) -> int:
+        # В памяти порции не нужны - удаляем сразу
+        guild = self.guilds.get(guild_id)
+        if not guild or guild['left_at'] is None:
+            return 0
+        self._drop_guild_data(guild_id)
+        del self.guilds[guild_id]
+        return 0
+
+    async def add_authorized_user(self, guild_id: int, user_id: int, role: str, added_by: int) -> None:
+        self.authorized_users[(guild_id, user_id)] = {
+            "user_id": user_id,
+            "role": role,
+            "added_by": added_by,
+            "added_at": self._now()
+        }
+
+    async def remove_authorized_user(self, guild_id: int, user_id: int) -> None:
+        self.authorized_users.pop((guild_id, user_id), None)
+
+    async def get_authorized_users(self, guild_id: int) -> List[Dict[str, Any]]:
+        return [
+            dict(user)
+            for (user_guild_id, _), user in self.authorized_users.items()
+            if user_guild_id == guild_id
+        ]
+
+    async def add_or_update_host(self, guild_id: int, user_id: int, nickname: str) -> int:
+        for host in self.hosts.values():
+            if host['guild_id'] == guild_id and host['user_id'] == user_id:
+                host['nickname'] = nickname
+                host['is_active'] = True
+                return host['host_id']
+
+        host_id = next(self._host_ids)
+        self.hosts[host_id] = {
+            "host_id": host_id,
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "nickname": nickname,
+            "is_active": True,
+            "sessions_count": 0,
+            "last_session": None,
+            "created_at": self._now()
+        }
+        return host_id
+
+    async def get_active_hosts(self, guild_id: int, period: Optional[str] = None) -> List[Dict[str, Any]]:
+        if period is None:
+            counts = {
+                host_id: host['sessions_count']
+                for host_id, host in self.hosts.items()
+                if host['guild_id'] == guild_id
+            }
+        else:
+            counts = self._period_counts(guild_id, period)
+
+        hosts = []
+        for host_id, sessions in counts.items():
+            host = self.hosts.get(host_id)
+            if not host or not host['is_active']:
+                continue
+            hosts.append({
+                "host_id": host_id,
+                "user_id": host['user_id'],
+                "nickname": host['nickname'],
+                "sessions_count": sessions,
+                "last_session": host['last_session']
+            })
+
+        hosts.sort(key=lambda h: h['sessions_count'], reverse=True)
+        return hosts
+
+    async def start_numbering_session(self, guild_id: int, channel_id: int,
+                                      host_id: int, participants_count: int) -> int:
+        now = self._now()
+        session_id = next(self._session_ids)
+        self.sessions[session_id] = {
+            "session_id": session_id,
+            "guild_id": guild_id,
+            "channel_id": channel_id,
+            "host_id": host_id,
+            "participants_count": participants_count,
+            "started_at": now,
+            "ended_at": None
+        }
+
+        host = self.hosts.get(host_id)
+        if host:
+            host['sessions_count'] += 1
+            host['last_session'] = now
+
+        rollup = self.host_daily_stats.setdefault((guild_id, now[:10], host_id), [0, 0])
+        rollup[0] += 1
+        rollup[1] += participants_count
+
+        return session_id
+
+    async def end_numbering_session(self, session_id: int) -> None:
+        session = self.sessions.get(session_id)
+        if session:
+            session['ended_at'] = self._now()
+
+    async def get_statistics(self, guild_id: int, period: Optional[str] = None) -> Dict[str, Any]:
+        hosts = await self.get_active_hosts(guild_id, period)
+
+        if period is None:
+            total_sessions = sum(1 for s in self.sessions.values() if s['guild_id'] == guild_id)
+        else:
+            total_sessions = sum(self._period_counts(guild_id, period).values())
+
+        return {
+            "total_sessions": total_sessions,
+            "active_hosts": len(hosts),
+            "top_hosts": [
+                {
+                    "user_id": host['user_id'],
+                    "nickname": host['nickname'],
+                    "sessions_count": host['sessions_count']
+                }
+                for host in hosts[:5]
+            ]
+        }
+
+    def _period_counts(self, guild_id: int, period: str) -> Dict[int, int]:
+        """Количество сессий ведущих за период по дневным агрегатам"""
+        since = self._period_start(period)
+        counts: Dict[int, int] = defaultdict(int)
+        for (rollup_guild_id, day, host_id), (sessions, _) in self.host_daily_stats.items():
+            if rollup_guild_id == guild_id and day >= since:
+                counts[host_id] += sessions
+        return counts
+
+    async def backfill_host_rollups(self, guild_id: Optional[int] = None) -> None:
+        for key in [k for k in self.host_daily_stats if guild_id is None or k[0] == guild_id]:
+            del self.host_daily_stats[key]
+
+        for session in self.sessions.values():
+            if guild_id is not None and session['guild_id'] != guild_id:
+                continue
+            key = (session['guild_id'], session['started_at'][:10], session['host_id'])
+            rollup = self.host_daily_stats.setdefault(key, [0, 0])
+            rollup[0] += 1
+            rollup[1] += session['participants_count'] or 0
+
+    async def log_action(self, guild_id: int, user_id: int, action: str, details: str = "") -> None:
+        log_id = next(self._log_ids)
+        self.action_logs[log_id] = {
+            "log_id": log_id,
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "action": action,
+            "details": details,
+            "timestamp": self._now()
+        }
+        self._guild_logs[guild_id].append(log_id)
+
+    async def get_logs_page(self, guild_id: int, before_id: Optional[int] = None,
+                            limit: int = 10) -> Dict[str, Any]:
+        log_ids = self._guild_logs.get(guild_id, [])
+        end = len(log_ids) if before_id is None else bisect.bisect_left(log_ids, before_id)
+        start = max(0, end - limit)
+
+        logs = []
+        for log_id in reversed(log_ids[start:end]):
+            log = dict(self.action_logs[log_id])
+            del log['guild_id']
+            logs.append(log)
+
+        next_cursor = logs[-1]['log_id'] if start > 0 and logs else None
+        return {"logs": logs, "next_cursor": next_cursor}
+
+    async def get_logs_before(self, cutoff: str, limit: int = 500) -> List[Dict[str, Any]]:
+        old_logs = []
+        for log in self.action_logs.values():
+            if log['timestamp'] < cutoff:
+                old_logs.append(dict(log))
+                if len(old_logs) >= limit:
+                    break
+        return old_logs
+
+    async def delete_logs(self, log_ids: List[int]) -> None:
+        for log_id in log_ids:
+            log = self.action_logs.pop(log_id, None)
+            if log is None:
+                continue
+            guild_logs = self._guild_logs[log['guild_id']]
+            index = bisect.bisect_left(guild_logs, log_id)
+            if index < len(guild_logs) and guild_logs[index] == log_id:
+                del guild_logs[index]
+
+    async def list_guilds(self) -> List[Dict[str, Any]]:
+        return [
+            {"guild_id": guild_id, "guild_name": guild['guild_name']}
+            for guild_id, guild in sorted(self.guilds.items())
+        ]
+
+    async def iter_export_rows(self, section: str, guild_id: int,
+                               chunk_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        if section == "hosts":
+            rows = [
+                {key: host[key] for key in (
+                    "host_id", "user_id", "nickname", "is_active",
+                    "sessions_count", "last_session", "created_at"
+                )}
+                for host in self.hosts.values() if host['guild_id'] == guild_id
+            ]
+        elif section == "sessions":
+            rows = []
+            for session in self.sessions.values():
+                if session['guild_id'] != guild_id:
+                    continue
+                host = self.hosts.get(session['host_id'])
+                row = {key: value for key, value in session.items() if key != "guild_id"}
+                row['host_user_id'] = host['user_id'] if host else None
+                rows.append(row)
+        elif section == "action_logs":
+            rows = [
+                {key: value for key, value in self.action_logs[log_id].items() if key != "guild_id"}
+                for log_id in self._guild_logs.get(guild_id, [])
+            ]
+        else:
+            raise KeyError(section)
+
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
+    async def import_guild_data(self, guild_id: int, guild_name: Optional[str],
+                                batches: AsyncIterator[List[Tuple[str, Dict[str, Any]]]],
+                                replace: bool = False) -> Dict[str, int]:
+        # Сначала читаем всё, затем применяем без await - изменения видны разом
+        grouped: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        async for batch in batches:
+            for record_type, rows in self._group_import_batch(batch).items():
+                grouped[record_type].extend(rows)
+
+        await self.ensure_guild_exists(guild_id, guild_name)
+        if replace:
+            self._drop_guild_data(guild_id)
+
+        # История сверяется по естественному ключу с записями, бывшими до импорта
+        known_sessions = {
+            (s['channel_id'], s['started_at']) for s in self.sessions.values() if s['guild_id'] == guild_id
+        }
+        known_logs = {
+            self._log_key(self.action_logs[log_id]) for log_id in self._guild_logs.get(guild_id, [])
+        }
+
+        guild = self.guilds[guild_id]
+        for settings in grouped["settings"]:
+            guild['settings'] = copy.deepcopy(settings if replace else {**guild['settings'], **settings})
+
+        for user in grouped["authorized_user"]:
+            self.authorized_users[(guild_id, user['user_id'])] = {
+                "user_id": user['user_id'],
+                "role": user['role'],
+                "added_by": user.get('added_by'),
+                "added_at": user.get('added_at') or self._now()
+            }
+
+        hosts_by_user = {
+            host['user_id']: host for host in self.hosts.values() if host['guild_id'] == guild_id
+        }
+        for data in grouped["host"]:
+            host = hosts_by_user.get(data['user_id'])
+            if host is None:
+                host_id = next(self._host_ids)
+                host = self.hosts[host_id] = hosts_by_user[data['user_id']] = {
+                    "host_id": host_id,
+                    "guild_id": guild_id,
+                    "user_id": data['user_id'],
+                    "sessions_count": data.get('sessions_count') or 0,
+                    "last_session": data.get('last_session'),
+                    "created_at": data.get('created_at') or self._now()
+                }
+            host['nickname'] = data.get('nickname')
+            host['is_active'] = bool(data.get('is_active', True))
+
+        sessions = [s for s in grouped["session"] if (s['channel_id'], s['started_at']) not in known_sessions]
+        for data in sessions:
+            host = hosts_by_user.get(data.get('host_user_id'))
+            session_id = next(self._session_ids)
+            self.sessions[session_id] = {
+                "session_id": session_id,
+                "guild_id": guild_id,
+                "channel_id": data['channel_id'],
+                "host_id": host['host_id'] if host else None,
+                "participants_count": data.get('participants_count'),
+                "started_at": data['started_at'],
+                "ended_at": data.get('ended_at')
+            }
+
+        logs = [log for log in grouped["action_log"] if self._log_key(log) not in known_logs]
+        for data in logs:
+            log_id = next(self._log_ids)
+            self.action_logs[log_id] = {
+                "log_id": log_id,
+                "guild_id": guild_id,
+                "user_id": data['user_id'],
+                "action": data['action'],
+                "details": data.get('details'),
+                "timestamp": data['timestamp']
+            }
+            self._guild_logs[guild_id].append(log_id)
+
+        # Счётчики ведущих - по итоговой истории
+        recount: Dict[int, List[Any]] = {}
+        for session in self.sessions.values():
+            if session['guild_id'] == guild_id and session['host_id'] in self.hosts:
+                entry = recount.setdefault(session['host_id'], [0, ""])
+                entry[0] += 1
+                entry[1] = max(entry[1], session['started_at'])
+        for host_id, (count, last_started) in recount.items():
+            self.hosts[host_id]['sessions_count'] = count
+            self.hosts[host_id]['last_session'] = last_started
+
+        await self.backfill_host_rollups(guild_id)
+
+        return {
+            "settings": len(grouped["settings"]),
+            "authorized_user": len(grouped["authorized_user"]),
+            "host": len(grouped["host"]),
+            "session": len(sessions),
+            "action_log": len(logs)
+        }
+
+    @staticmethod
+    def _log_key(log: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Естественный ключ записи журнала для сверки при импорте"""
+        return (log['user_id'], log['action'], log.get('details'), log['timestamp'])
+
+    def _drop_guild_data(self, guild_id: int) -> None:
+        """Удалить все данные сервера, кроме самой записи о сервере"""
+        for key in [key for key in self.authorized_users if key[0] == guild_id]:
+            del self.authorized_users[key]
+        for table in (self.hosts, self.sessions):
+            for key in [key for key, row in table.items() if row['guild_id'] == guild_id]:
+                del table[key]
+        for log_id in self._guild_logs.pop(guild_id, []):
+            del self.action_logs[log_id]
+        for key in [key for key in self.host_daily_stats if key[0] == guild_id]:
+            del self.host_daily_stats[key]
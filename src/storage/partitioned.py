@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite, разделённый по серверам на несколько файлов
+
+Каждый сервер целиком живёт в одном файле-разделе, который выбирается по
+хэшу guild_id. У каждого раздела своё соединение и свой поток записи,
+поэтому записи разных серверов не ждут друг друга.
+
+ID записей (host_id, session_id, log_id) внутри раздела локальные; наружу
+они выдаются как local_id * N + номер_раздела, чтобы операции по одному ID
+(например, end_numbering_session) находили свой раздел.
+"""
+
+import asyncio
+import heapq
+import logging
+import zlib
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .base import StorageBackend
+from ..database import Database
+
+logger = logging.getLogger(__name__)
+
+
+def partition_index(guild_id: int, partitions: int) -> int:
+    """Номер раздела для сервера (стабилен между запусками и процессами)"""
+    return zlib.crc32(int(guild_id).to_bytes(8, 'little', signed=True)) % partitions
+
+
+def partition_paths(db_path: Path, partitions: int) -> List[Path]:
+    """Пути к файлам разделов: data/bot.db -> data/bot.p0.db, data/bot.p1.db, ..."""
+    db_path = Path(db_path)
+    if partitions == 1:
+        return [db_path]
+    return [
+        db_path.with_name(f"{db_path.stem}.p{index}{db_path.suffix}")
+        for index in range(partitions)
+    ]
+
+
+class PartitionedDatabase(StorageBackend):
+    """Маршрутизация данных серверов по нескольким файлам SQLite"""
+
+    def __init__(self, db_path: Path, partitions: int):
+        """
+        Инициализация разделённой базы
+
+        Args:
+            db_path: Базовый путь к базе данных
+            partitions: Количество файлов-разделов
+        """
+        if partitions < 2:
+            raise ValueError("Для разделения нужно минимум 2 раздела")
+
+        self.db_path = Path(db_path)
+        self.partitions = [Database(path) for path in partition_paths(db_path, partitions)]
+
+    # Маршрутизация
+
+    def _for_guild(self, guild_id: int) -> Tuple[int, Database]:
+        index = partition_index(guild_id, len(self.partitions))
+        return index, self.partitions[index]
+
+    def _encode(self, index: int, local_id: Optional[int]) -> Optional[int]:
+        if local_id is None:
+            return None
+        return local_id * len(self.partitions) + index
+
+    def _decode(self, global_id: int) -> Tuple[int, Database, int]:
+        local_id, index = divmod(global_id, len(self.partitions))
+        return index, self.partitions[index], local_id
+
+    async def _fan_out(self, method: str, *args) -> List[Any]:
+        """Вызвать метод на всех разделах параллельно"""
+        return await asyncio.gather(
+            *(getattr(partition, method)(*args) for partition in self.partitions)
+        )
+
+    # Жизненный цикл
+
+    async def initialize(self) -> None:
+        await self._fan_out("initialize")
+        logger.info(f"Разделов базы данных: {len(self.partitions)}")
+
+    async def close(self) -> None:
+        await self._fan_out("close")
+
+    # Служебные значения хранятся в первом разделе
+
+    async def get_meta(self, key: str) -> Optional[str]:
+        return await self.partitions[0].get_meta(key)
+
+    async def set_meta(self, key: str, value: str) -> None:
+        await self.partitions[0].set_meta(key, value)
+
+    # Данные одного сервера
+
+    async def ensure_guild_exists(self, guild_id: int, guild_name: str = None) -> None:
+        _, db = self._for_guild(guild_id)
+        await db.ensure_guild_exists(guild_id, guild_name)
+
+    async def get_guild_settings(self, guild_id: int) -> Dict[str, Any]:
+        _, db = self._for_guild(guild_id)
+        return await db.get_guild_settings(guild_id)
+
+    async def update_guild_settings(self, guild_id: int, settings: Dict[str, Any]) -> None:
+        _, db = self._for_guild(guild_id)
+        await db.update_guild_settings(guild_id, settings)
+
+    async def mark_guild_left(self, guild_id: int) -> None:
+        _, db = self._for_guild(guild_id)
+        await db.mark_guild_left(guild_id)
+
+    async def purge_guild_data(self, guild_id: int, batch_size: int = 500) -> int:
+        _, db = self._for_guild(guild_id)
+        return await db.purge_guild_data(guild_id, batch_size)
+
+    async def add_authorized_user(self, guild_id: int, user_id: int, role: str, added_by: int) -> None:
+        _, db = self._for_guild(guild_id)
+        await db.add_authorized_user(guild_id, user_id, role, added_by)
+
+    async def remove_authorized_user(self, guild_id: int, user_id: int) -> None:
+        _, db = self._for_guild(guild_id)
+        await db.remove_authorized_user(guild_id, user_id)
+
+    async def get_authorized_users(self, guild_id: int) -> List[Dict[str, Any]]:
+        _, db = self._for_guild(guild_id)
+        return await db.get_authorized_users(guild_id)
+
+    async def add_or_update_host(self, guild_id: int, user_id: int, nickname: str) -> int:
+        index, db = self._for_guild(guild_id)
+        return self._encode(index, await db.add_or_update_host(guild_id, user_id, nickname))
+
+    async def get_active_hosts(self, guild_id: int, period: Optional[str] = None) -> List[Dict[str, Any]]:
+        index, db = self._for_guild(guild_id)
+        hosts = await db.get_active_hosts(guild_id, period)
+        for host in hosts:
+            host['host_id'] = self._encode(index, host['host_id'])
+        return hosts
+
+    async def start_numbering_session(self, guild_id: int, channel_id: int,
+                                      host_id: int, participants_count: int) -> int:
+        index, db, local_host_id = self._decode(host_id)
+        session_id = await db.start_numbering_session(
+            guild_id, channel_id, local_host_id, participants_count
+        )
+        return self._encode(index, session_id)
+
+    async def end_numbering_session(self, session_id: int) -> None:
+        _, db, local_id = self._decode(session_id)
+        await db.end_numbering_session(local_id)
+
+    async def get_statistics(self, guild_id: int, period: Optional[str] = None) -> Dict[str, Any]:
+        _, db = self._for_guild(guild_id)
+        return await db.get_statistics(guild_id, period)
+
+    async def log_action(self, guild_id: int, user_id: int, action: str, details: str = "") -> None:
+        _, db = self._for_guild(guild_id)
+        await db.log_action(guild_id, user_id, action, details)
+
+    async def get_logs_page(self, guild_id: int, before_id: Optional[int] = None,
+                            limit: int = 10) -> Dict[str, Any]:
+        index, db = self._for_guild(guild_id)
+        local_before = self._decode(before_id)[2] if before_id is not None else None
+
+        page = await db.get_logs_page(guild_id, local_before, limit)
+        for log in page['logs']:
+            log['log_id'] = self._encode(index, log['log_id'])
+        page['next_cursor'] = self._encode(index, page['next_cursor'])
+        return page
+
+    async def import_guild_data(self, guild_id: int, guild_name: Optional[str],
+                                batches: AsyncIterator[List[Tuple[str, Dict[str, Any]]]],
+                                replace: bool = False) -> Dict[str, int]:
+        # Экспорт ссылается на ведущих по user_id, поэтому ID не перекодируются
+        _, db = self._for_guild(guild_id)
+        return await db.import_guild_data(guild_id, guild_name, batches, replace)
+
+    # Операции по всем серверам
+
+    async def reconcile_guilds(self, guilds: List[Tuple[int, Optional[str]]],
+                               mark_missing: bool = True, shard_count: Optional[int] = None,
+                               shard_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        # Каждый раздел получает свои серверы (в том числе пустой список -
+        # тогда все его серверы отмечаются ушедшими)
+        by_partition: List[List[Tuple[int, Optional[str]]]] = [[] for _ in self.partitions]
+        for guild in guilds:
+            by_partition[self._for_guild(guild[0])[0]].append(guild)
+
+        results = await asyncio.gather(*(
+            partition.reconcile_guilds(partition_guilds, mark_missing, shard_count, shard_ids)
+            for partition, partition_guilds in zip(self.partitions, by_partition)
+        ))
+        return {
+            "added": sum(result['added'] for result in results),
+            "left": sum(result['left'] for result in results)
+        }
+
+    async def get_departed_guilds(self, left_before: str, limit: int = 100) -> List[int]:
+        results = await self._fan_out("get_departed_guilds_with_time", left_before, limit)
+        # Каждый раздел уже отсортирован по left_at - сливаем, затем ограничиваем
+        merged = heapq.merge(*results)
+        return [guild_id for _, (_, guild_id) in zip(range(limit), merged)]
+
+    async def backfill_host_rollups(self, guild_id: Optional[int] = None) -> None:
+        if guild_id is not None:
+            _, db = self._for_guild(guild_id)
+            await db.backfill_host_rollups(guild_id)
+        else:
+            await self._fan_out("backfill_host_rollups")
+
+    async def get_logs_before(self, cutoff: str, limit: int = 500) -> List[Dict[str, Any]]:
+        results = await self._fan_out("get_logs_before", cutoff, limit)
+
+        for index, logs in enumerate(results):
+            for log in logs:
+                log['log_id'] = self._encode(index, log['log_id'])
+
+        # Каждый раздел уже отсортирован по времени - сливаем
+        merged = heapq.merge(*results, key=lambda log: (log['timestamp'], log['log_id']))
+        return [log for _, log in zip(range(limit), merged)]
+
+    async def delete_logs(self, log_ids: List[int]) -> None:
+        by_partition: Dict[int, List[int]] = {}
+        for log_id in log_ids:
+            index, _, local_id = self._decode(log_id)
+            by_partition.setdefault(index, []).append(local_id)
+
+        await asyncio.gather(*(
+            self.partitions[index].delete_logs(local_ids)
+            for index, local_ids in by_partition.items()
+        ))
+
+    async def incremental_vacuum(self, pages: int = 100) -> int:
+        return sum(await self._fan_out("incremental_vacuum", pages))
+
+    async def list_guilds(self) -> List[Dict[str, Any]]:
+        results = await self._fan_out("list_guilds")
+        return list(heapq.merge(*results, key=lambda guild: guild['guild_id']))
+
+    async def iter_export_rows(self, section: str, guild_id: int,
+                               chunk_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        index, db = self._for_guild(guild_id)
+
+        async for chunk in db.iter_export_rows(section, guild_id, chunk_size):
+            for row in chunk:
+                for key in ("host_id", "session_id", "log_id"):
+                    if key in row:
+                        row[key] = self._encode(index, row[key])
+            yield chunk
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Перераспределение базы SQLite по разделам
+
+Бот должен быть остановлен. Примеры:
+
+    # Один файл -> 4 раздела
+    python -m src.storage.repartition data/bot.db --to 4
+
+    # 4 раздела -> 8 разделов в новом каталоге
+    python -m src.storage.repartition data/bot.db --from 4 --to 8 --output data/new/bot.db
+
+    # 4 раздела -> обратно в один файл
+    python -m src.storage.repartition data/bot.db --from 4 --to 1 --output data/merged.db
+
+Исходные файлы не изменяются; новые создаются рядом. ID записей в
+разделах локальные, поэтому при переносе записи получают новые ID, а
+ссылки на ведущих (host_id в сессиях и дневных агрегатах) переписываются
+по таблице соответствия. Служебные значения бота (bot_meta: хэш
+синхронизированных команд, время последнего обслуживания) хранятся в
+разделе 0 и переносятся в новый раздел 0. После копирования число
+записей и итоги по каждому ведущему сверяются с исходными.
+"""
+
+import argparse
+import asyncio
+import logging
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..database import Database
+from .partitioned import partition_index, partition_paths
+
+logger = logging.getLogger(__name__)
+
+# Таблицы с колонкой guild_id, в порядке зависимостей
+TABLES = ["guilds", "authorized_users", "hosts", "numbering_sessions", "action_logs", "host_daily_stats"]
+
+# Собственный ID записи (назначается заново) и колонка-ссылка на ведущего
+ROW_IDS = {"hosts": "host_id", "numbering_sessions": "session_id", "action_logs": "log_id"}
+HOST_REFERENCES = ("numbering_sessions", "host_daily_stats")
+
+# Итоги по ведущему для сверки: сессий в счётчике, сессий в истории, сессий и участников в агрегатах
+HOST_TOTALS_SQL = """
+    SELECT h.guild_id, h.user_id, h.host_id, h.sessions_count,
+           (SELECT COUNT(*) FROM numbering_sessions s WHERE s.host_id = h.host_id),
+           (SELECT COALESCE(SUM(r.sessions_count), 0) FROM host_daily_stats r WHERE r.host_id = h.host_id),
+           (SELECT COALESCE(SUM(r.participants_count), 0) FROM host_daily_stats r WHERE r.host_id = h.host_id)
+    FROM hosts h
+    ORDER BY h.host_id"""
+
+
+class RepartitionError(Exception):
+    """Данные после переноса не совпали с исходными"""
+
+
+async def _create_schema(paths: List[Path]) -> None:
+    """Создать пустые файлы со схемой бота"""
+    for path in paths:
+        db = Database(path)
+        await db.initialize()
+        await db.close()
+
+
+def repartition(db_path: Path, source_partitions: int, target_partitions: int,
+                target_path: Optional[Path] = None) -> List[Path]:
+    """
+    Скопировать данные в новый набор разделов
+
+    Args:
+        db_path: Базовый путь исходной базы
+        source_partitions: Количество исходных разделов (1 - один файл)
+        target_partitions: Количество новых разделов
+        target_path: Базовый путь новой базы (по умолчанию db_path)
+
+    Returns:
+        Пути к созданным файлам
+    """
+    sources = partition_paths(db_path, source_partitions)
+    targets = partition_paths(target_path or db_path, target_partitions)
+
+    missing = [path for path in sources if not path.exists()]
+    if missing:
+        raise FileNotFoundError(f"Не найдены исходные файлы: {', '.join(map(str, missing))}")
+    existing = [path for path in targets if path.exists()]
+    if existing:
+        raise FileExistsError(f"Файлы уже существуют: {', '.join(map(str, existing))}")
+
+    asyncio.run(_create_schema(targets))
+
+    for index, target in enumerate(targets):
+        conn = sqlite3.connect(target)
+        conn.create_function(
+            "partition_of", 1,
+            lambda guild_id: partition_index(guild_id, target_partitions),
+            deterministic=True
+        )
+        try:
+            for source in sources:
+                conn.execute("ATTACH DATABASE ? AS src", (str(source),))
+                with conn:
+                    _copy_partition(conn, index, f"{source.name} -> {target.name}")
+                    # Служебные значения - только в разделе 0 (PartitionedDatabase.get_meta)
+                    if index == 0 and source == sources[0]:
+                        _copy_meta(conn, f"{source.name} -> {target.name}")
+                conn.execute("DETACH DATABASE src")
+        finally:
+            conn.close()
+
+    verify(sources, targets)
+    return targets
+
+
+def _copy_partition(conn: sqlite3.Connection, index: int, label: str) -> None:
+    """Скопировать из src в main записи серверов раздела index с новыми ID"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS host_map (old_id INTEGER PRIMARY KEY, new_id INTEGER)")
+    conn.execute("DELETE FROM temp.host_map")
+
+    for table in TABLES:
+        row_id = ROW_IDS.get(table)
+        columns = [
+            row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")
+            if row[1] != row_id
+        ]
+
+        if table == "hosts":
+            # По одному: новый ID каждого ведущего нужен для ссылок
+            copied = 0
+            for old_id, *values in conn.execute(
+                f"SELECT host_id, {', '.join(columns)} FROM src.hosts "
+                f"WHERE partition_of(guild_id) = ? ORDER BY host_id",
+                (index,)
+            ).fetchall():
+                cursor = conn.execute(
+                    f"INSERT INTO main.hosts ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    values
+                )
+                conn.execute("INSERT INTO temp.host_map VALUES (?, ?)", (old_id, cursor.lastrowid))
+                copied += 1
+        else:
+            selected = [
+                "(SELECT new_id FROM temp.host_map WHERE old_id = t.host_id)"
+                if column == "host_id" and table in HOST_REFERENCES else f"t.{column}"
+                for column in columns
+            ]
+            order = f" ORDER BY t.{row_id}" if row_id else ""
+            copied = conn.execute(
+                f"INSERT INTO main.{table} ({', '.join(columns)}) "
+                f"SELECT {', '.join(selected)} FROM src.{table} t "
+                f"WHERE partition_of(t.guild_id) = ?{order}",
+                (index,)
+            ).rowcount
+        logger.info(f"{label}: {table} ({copied})")
+
+
+def _copy_meta(conn: sqlite3.Connection, label: str) -> None:
+    """Скопировать bot_meta из src в main"""
+    copied = conn.execute(
+        "INSERT OR REPLACE INTO main.bot_meta (key, value, updated_at) "
+        "SELECT key, value, updated_at FROM src.bot_meta"
+    ).rowcount
+    logger.info(f"{label}: bot_meta ({copied})")
+
+
+def _read_totals(paths: List[Path]) -> Tuple[Dict[str, int], Dict[Tuple[int, int, int], Tuple[int, ...]]]:
+    """
+    Число записей по таблицам и итоги по ведущим для набора файлов
+
+    Ведущий определяется сервером, пользователем и порядковым номером среди
+    его записей в hosts - ID в разных наборах файлов разные.
+    """
+    counts: Dict[str, int] = dict.fromkeys(TABLES, 0)
+    hosts: Dict[Tuple[int, int, int], Tuple[int, ...]] = {}
+    for path in paths:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for table in TABLES:
+                counts[table] += conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            ordinal: Dict[Tuple[int, int], int] = {}
+            for guild_id, user_id, _, *totals in conn.execute(HOST_TOTALS_SQL):
+                number = ordinal[(guild_id, user_id)] = ordinal.get((guild_id, user_id), 0) + 1
+                hosts[(guild_id, user_id, number)] = tuple(totals)
+        finally:
+            conn.close()
+    return counts, hosts
+
+
+def verify(sources: List[Path], targets: List[Path]) -> None:
+    """
+    Сверить число записей и итоги по каждому ведущему до и после переноса
+
+    Raises:
+        RepartitionError: Данные не совпали
+    """
+    source_counts, source_hosts = _read_totals(sources)
+    target_counts, target_hosts = _read_totals(targets)
+
+    errors = [
+        f"{table}: было {source_counts[table]}, стало {target_counts[table]}"
+        for table in TABLES if source_counts[table] != target_counts[table]
+    ]
+    mismatched = [key for key in source_hosts.keys() | target_hosts.keys()
+                  if source_hosts.get(key) != target_hosts.get(key)]
+    if mismatched:
+        errors.append(f"итоги ведущих не совпали: {len(mismatched)} (например, сервер {mismatched[0][0]}, "
+                      f"пользователь {mismatched[0][1]})")
+    if errors:
+        raise RepartitionError("; ".join(errors))
+    logger.info(f"Проверка пройдена: ведущих {len(target_hosts)}, записей "
+                + ", ".join(f"{table} {count}" for table, count in target_counts.items()))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description="Перераспределение базы SQLite по разделам")
+    parser.add_argument("db_path", type=Path, help="Базовый путь к базе (DATABASE_PATH)")
+    parser.add_argument("--from", dest="source", type=int, default=1,
+                        help="Текущее количество разделов (по умолчанию 1)")
+    parser.add_argument("--to", dest="target", type=int, required=True,
+                        help="Новое количество разделов")
+    parser.add_argument("--output", type=Path,
+                        help="Базовый путь для новой базы (по умолчанию тот же)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.source == args.target and not args.output:
+        parser.error("Количество разделов не меняется")
+    if args.target == 1 and not args.output:
+        parser.error("Для объединения в один файл укажите --output")
+
+    try:
+        targets = repartition(args.db_path, args.source, args.target, args.output)
+    except (FileNotFoundError, FileExistsError, RepartitionError) as e:
+        logger.error(str(e))
+        return 1
+
+    logger.info("Готово. Новые файлы:")
+    for path in targets:
+        logger.info(f"  {path}")
+    logger.info(f"Установите DATABASE_PARTITIONS={args.target} и перезапустите бота.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
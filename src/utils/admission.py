@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Контроль допуска команд
+
+Каждая команда стоит сколько-то жетонов: обычная - 1, нумерация и очистка -
+по числу участников голосового канала (столько переименований и записей
+она создаст), экспорт и импорт - фиксированную «тяжёлую» цену. Жетоны
+списываются одновременно из трёх корзин: пользователя, канала и сервера.
+Если в какой-то корзине жетонов не хватает, команда отклоняется с
+CommandOnCooldown (время ожидания считает корзина). Жетоны списываются
+только с команд, прошедших проверки прав: текстовые команды допускаются
+в bot.before_invoke, slash-команды - после собственной проверки прав.
+Справка (!help) не ограничивается.
+
+Сверх этого работает сброс нагрузки: пока очередь переименований или
+задержка цикла событий выше порога, дорогие команды отклоняются для всех,
+а дешёвые (ping, info) продолжают работать.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from discord.ext import commands
+
+logger = logging.getLogger(__name__)
+
+# Команды, цена которых - число участников голосового канала автора
+RENAME_COMMANDS = ("number", "clear")
+
+# Фиксированная цена остальных дорогих команд (по умолчанию - 1)
+COMMAND_COSTS = {
+    "export": 10,
+    "exportall": 50,
+    "import": 50,
+    "logs": 2,
+    "hosts": 2,
+    "stats": 2,
+}
+
+# Области корзин и тип для CommandOnCooldown
+SCOPES = {
+    "user": commands.BucketType.user,
+    "channel": commands.BucketType.channel,
+    "guild": commands.BucketType.guild,
+}
+
+# Корзины, не тронутые дольше (сек), удаляются при очистке
+IDLE_BUCKET_TTL = 3600.0
+
+
+class BotOverloaded(commands.CheckFailure):
+    """Команда отклонена сбросом нагрузки"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Бот перегружен ({reason})")
+        self.reason = reason
+
+
+class TokenBucket:
+    """Корзина жетонов: capacity жетонов, пополняется на capacity за per секунд"""
+
+    __slots__ = ("capacity", "per", "tokens", "updated_at")
+
+    def __init__(self, capacity: float, per: float, now: Optional[float] = None):
+        self.capacity = capacity
+        self.per = per
+        self.tokens = capacity
+        self.updated_at = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / self.per)
+        self.updated_at = now
+
+    def retry_after(self, cost: float, now: float) -> float:
+        """Через сколько секунд наберётся cost жетонов (0 - уже есть)"""
+        self._refill(now)
+        missing = cost - self.tokens
+        return 0.0 if missing <= 0 else missing * self.per / self.capacity
+
+    def consume(self, cost: float) -> None:
+        self.tokens -= cost
+
+
+class AdmissionController:
+    """Корзины жетонов по пользователям, каналам и серверам плюс сброс нагрузки"""
+
+    def __init__(self, bot, limits: Dict[str, Tuple[float, float]],
+                 max_rename_backlog: int = 500, max_loop_lag: float = 0.5,
+                 lag_probe_interval: float = 0.5, enabled: bool = True):
+        """
+        Инициализация
+
+        Args:
+            bot: Экземпляр бота
+            limits: {"user"|"channel"|"guild": (жетонов, за_секунд)}; отсутствующая
+                область не ограничивается
+            max_rename_backlog: Порог очереди переименований для сброса нагрузки
+            max_loop_lag: Порог задержки цикла событий для сброса нагрузки (сек)
+            lag_probe_interval: Период замера задержки цикла событий (сек)
+            enabled: Ограничивать команды (иначе только учёт нагрузки)
+        """
+        self.bot = bot
+        self.enabled = enabled
+        self.limits = {scope: limit for scope, limit in limits.items() if scope in SCOPES}
+        self.max_rename_backlog = max_rename_backlog
+        self.max_loop_lag = max_loop_lag
+        self.lag_probe_interval = lag_probe_interval
+
+        # Текущая нагрузка
+        self.rename_backlog = 0
+        self.loop_lag = 0.0
+
+        # Счётчики для !info
+        self.admitted = 0
+        self.throttled = 0
+        self.shed = 0
+
+        self._buckets: Dict[Tuple[str, int], TokenBucket] = {}
+        self._lag_task: Optional[asyncio.Task] = None
+
+    # Жизненный цикл
+
+    def start(self) -> None:
+        """Запустить замер задержки цикла событий"""
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.create_task(self._probe_loop_lag())
+
+    def stop(self) -> None:
+        if self._lag_task and not self._lag_task.done():
+            self._lag_task.cancel()
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "shed": self.shed,
+            "rename_backlog": self.rename_backlog,
+            "loop_lag_ms": round(self.loop_lag * 1000)
+        }
+
+    # Допуск команд
+
+    async def admit(self, ctx: commands.Context, name: Optional[str] = None) -> bool:
+        """
+        Допуск команды, уже прошедшей проверки прав
+
+        Для текстовых команд вызывается из bot.before_invoke - после всех
+        проверок и разбора аргументов, поэтому команда, отклонённая
+        проверкой прав, жетонов не тратит. Slash-команды вызывают его сами.
+
+        Args:
+            ctx: Контекст команды
+            name: Имя команды (по умолчанию ctx.command)
+
+        Raises:
+            BotOverloaded: Дорогая команда во время перегрузки
+            commands.CommandOnCooldown: Не хватает жетонов
+        """
+        if not self.enabled:
+            return True
+
+        # Справка (!help) тоже вызывает before_invoke, но ничего не нагружает
+        help_command = self.bot.help_command
+        if help_command is not None and ctx.command is help_command._command_impl:
+            return True
+
+        if name is None:
+            name = ctx.command.qualified_name if ctx.command else ""
+        cost = self.command_cost(ctx, name)
+
+        reason = self.overload_reason()
+        if reason and cost > 1:
+            self.shed += 1
+            logger.warning(f"Сброс нагрузки: команда {name} отклонена ({reason})")
+            raise BotOverloaded(reason)
+
+        if ctx.author.id not in self.bot.config.global_admins:
+            self._take_tokens(ctx, name, cost)
+
+        self.admitted += 1
+        return True
+
+    def command_cost(self, ctx: commands.Context, name: str) -> int:
+        """Оценка цены команды в жетонах"""
+        if name in RENAME_COMMANDS:
+            voice = getattr(ctx.author, "voice", None)
+            if voice and voice.channel:
+                return 1 + len(voice.channel.voice_states)
+            return 1
+        return COMMAND_COSTS.get(name, 1)
+
+    def overload_reason(self) -> Optional[str]:
+        """Причина сброса нагрузки (None - нагрузка в норме)"""
+        if self.rename_backlog > self.max_rename_backlog:
+            return f"очередь переименований {self.rename_backlog}"
+        if self.loop_lag > self.max_loop_lag:
+            return f"задержка цикла событий {self.loop_lag * 1000:.0f} мс"
+        return None
+
+    def _take_tokens(self, ctx: commands.Context, name: str, cost: int) -> None:
+        now = time.monotonic()
+        targets: List[Tuple[str, TokenBucket, float]] = []
+
+        for scope, (capacity, per) in self.limits.items():
+            key_id = self._scope_id(ctx, scope)
+            if key_id is None:
+                continue
+            bucket = self._buckets.get((scope, key_id))
+            if bucket is None:
+                # Новая корзина - от того же момента, иначе она «недополнена» на доли жетона
+                bucket = self._buckets[(scope, key_id)] = TokenBucket(capacity, per, now)
+            # Команда дороже корзины допускается только с полной корзиной
+            scope_cost = min(cost, capacity)
+            retry_after = bucket.retry_after(scope_cost, now)
+            if retry_after > 0:
+                self.throttled += 1
+                logger.info(f"Команда {name} ограничена по {scope} {key_id}: ждать {retry_after:.1f} с")
+                raise commands.CommandOnCooldown(
+                    commands.Cooldown(capacity, per), retry_after, SCOPES[scope]
+                )
+            targets.append((scope, bucket, scope_cost))
+
+        # Жетоны списываются, только если хватило во всех корзинах
+        for _, bucket, scope_cost in targets:
+            bucket.consume(scope_cost)
+
+        if len(self._buckets) > 10000:
+            self._drop_idle_buckets(now)
+
+    @staticmethod
+    def _scope_id(ctx: commands.Context, scope: str) -> Optional[int]:
+        if scope == "user":
+            return ctx.author.id
+        if scope == "channel":
+            return ctx.channel.id if ctx.channel else None
+        return ctx.guild.id if ctx.guild else None
+
+    def _drop_idle_buckets(self, now: float) -> None:
+        idle = [key for key, bucket in self._buckets.items() if now - bucket.updated_at > IDLE_BUCKET_TTL]
+        for key in idle:
+            del self._buckets[key]
+
+    # Учёт нагрузки
+
+    @contextlib.contextmanager
+    def rename_batch(self, count: int) -> Iterator["RenameBatch"]:
+        """
+        Учесть пачку переименований в очереди
+
+        ``with admission.rename_batch(n) as batch: ... batch.done()`` после каждого
+        переименования; невыполненные снимаются с очереди при выходе.
+        """
+        batch = RenameBatch(self, count)
+        self.rename_backlog += count
+        try:
+            yield batch
+        finally:
+            self.rename_backlog -= batch.remaining
+
+    async def _probe_loop_lag(self) -> None:
+        # Насколько позже запланированного просыпается короткий sleep
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.lag_probe_interval)
+            lag = max(0.0, time.monotonic() - started - self.lag_probe_interval)
+            # Плавное среднее: единичный всплеск не включает сброс нагрузки
+            self.loop_lag = self.loop_lag * 0.5 + lag * 0.5
+            if lag > self.max_loop_lag:
+                logger.warning(f"Задержка цикла событий {lag * 1000:.0f} мс")
+
+
+class RenameBatch:
+    """Оставшиеся переименования одной команды"""
+
+    __slots__ = ("controller", "remaining")
+
+    def __init__(self, controller: AdmissionController, count: int):
+        self.controller = controller
+        self.remaining = count
+
+    def done(self) -> None:
+        """Отметить одно выполненное переименование"""
+        if self.remaining > 0:
+            self.remaining -= 1
+            self.controller.rename_backlog -= 1
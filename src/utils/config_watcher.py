@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Применение изменений config.json без перезапуска
+
+Наблюдатель раз в интервал сравнивает os.stat файла (время изменения,
+размер, inode) с запомненным - это один системный вызов, файл читается
+только после изменения. Разбор и замена снимка выполняются в
+Config.reload; ошибочный файл не применяется, бот продолжает работать
+с прежними настройками. После изменения features модули загружаются
+и выгружаются здесь же, в цикле событий бота.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigWatcher:
+    """Отслеживание config.json и перезагрузка настроек"""
+
+    def __init__(self, bot, interval: float = 2.0):
+        """
+        Инициализация
+
+        Args:
+            bot: Экземпляр бота (конфигурация берётся из bot.config)
+            interval: Период проверки файла (сек)
+        """
+        self.bot = bot
+        self.interval = interval
+
+        # Счётчики для отладки
+        self.reloads = 0
+        self.failures = 0
+
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def start(self) -> None:
+        """Запомнить текущее состояние файла и начать проверки"""
+        if self._task is None or self._task.done():
+            self._stat = self._read_stat()
+            self._task = asyncio.create_task(self._watch())
+
+    def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def reload(self) -> Dict[str, List[str]]:
+        """
+        Перечитать конфигурацию сейчас (!reloadconfig и наблюдатель)
+
+        Returns:
+            Результат Config.reload
+
+        Raises:
+            ValueError: Файл не разобран, действуют прежние настройки
+        """
+        async with self._lock:
+            self._stat = self._read_stat()
+            try:
+                changes = await asyncio.to_thread(self.bot.config.reload)
+            except ValueError as e:
+                self.failures += 1
+                logger.error(f"Конфигурация не перезагружена, действуют прежние настройки: {e}")
+                raise
+                
+            if "features" in changes["applied"]:
+                await self._apply_features(changes)
+
+        self.reloads += 1
+        if changes["applied"]:
+            logger.info(f"Конфигурация перезагружена: {', '.join(changes['applied'])}")
+        if changes["restart_required"]:
+            logger.warning(
+                f"Изменения вступят в силу после перезапуска: {', '.join(changes['restart_required'])}"
+            )
+        return changes
+
+    async def _apply_features(self, changes: Dict[str, List[str]]) -> None:
+        """Привести загруженные модули к новым features (при ошибке - до перезапуска)"""
+        try:
+            await self.bot.apply_features()
+        except Exception as e:
+            logger.error(f"Модули не загружены или не выгружены по новым features: {e}", exc_info=e)
+            changes["applied"].remove("features")
+            changes["restart_required"].append("features")
+            
+    def _read_stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.bot.config.config_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            stat = self._read_stat()
+            # Удалённый файл не сбрасывает настройки - ждём, пока он появится
+            if stat is None or stat == self._stat:
+                continue
+            try:
+                await self.reload()
+            except ValueError:
+                pass
+            except Exception as e:
+                logger.error(f"Ошибка перезагрузки конфигурации: {e}")
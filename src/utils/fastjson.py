@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+JSON бота: стандартный модуль json или orjson
+
+Через этот модуль проходят настройки серверов в хранилище, экспорт,
+импорт и архив журнала действий. orjson включается профилем выполнения
+"fast" (см. utils.runtime); без установленного orjson всегда используется
+json. Результат одинаков по содержанию: текст UTF-8 без экранирования
+не-ASCII символов, ключи-числа становятся строками.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+_use_orjson = False
+
+
+def use_fast_json(enabled: bool) -> None:
+    """Включить orjson (если установлен)"""
+    global _use_orjson
+    _use_orjson = enabled and HAS_ORJSON
+
+
+def backend() -> str:
+    """Имя используемой реализации"""
+    return "orjson" if _use_orjson else "json"
+
+
+def dumps(obj: Any) -> str:
+    """Сериализовать в строку JSON"""
+    if _use_orjson:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Разобрать JSON (ошибка формата - ValueError, как у json)"""
+    if _use_orjson:
+        return orjson.loads(data)
+    return json.loads(data)
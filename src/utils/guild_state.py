@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Состояние серверов в памяти
+
+Всё, что бот помнит о сервере между командами (открытая сессия нумерации,
+блокировка переименований), хранится в одной компактной записи реестра.
+Запись создаётся при первом обращении и вытесняется, когда сервер
+простаивает дольше TTL или записей больше лимита (первыми - давно не
+использованные). Записи с открытой сессией или занятой блокировкой не
+вытесняются. Так память растёт с числом активных серверов, а не всех
+серверов бота; вытесненное загружается заново при следующей команде.
+
+Префиксы команд сюда не входят: они нужны для каждого сообщения чата и
+живут в собственном невытесняемом кэше (utils.prefixes).
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class GuildState:
+    """Состояние одного сервера"""
+
+    __slots__ = ("guild_id", "session_id", "last_used", "_lock")
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.session_id: Optional[int] = None
+        self.last_used = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Блокировка переименований сервера (создаётся при первом обращении)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def pinned(self) -> bool:
+        """Запись нельзя вытеснять: открыта сессия или идёт переименование"""
+        return self.session_id is not None or (self._lock is not None and self._lock.locked())
+
+    def size(self) -> int:
+        """Примерный размер записи в байтах"""
+        size = sys.getsizeof(self)
+        if self._lock is not None:
+            size += sys.getsizeof(self._lock) + sys.getsizeof(self._lock.__dict__)
+        return size
+
+
+class GuildStateRegistry:
+    """Реестр состояний серверов с вытеснением простаивающих"""
+
+    def __init__(self, max_guilds: int = 5000, idle_ttl: float = 1800.0,
+                 sweep_interval: float = 300.0):
+        """
+        Инициализация
+
+        Args:
+            max_guilds: Записей в памяти (сверх - вытесняются давно не использованные)
+            idle_ttl: Через сколько секунд простоя запись вытесняется
+            sweep_interval: Период проверки простаивающих (сек)
+        """
+        self.max_guilds = max_guilds
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+
+        # Счётчики для !info
+        self.created = 0
+        self.evicted = 0
+
+        self._states: "OrderedDict[int, GuildState]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    # Жизненный цикл
+
+    def start(self) -> None:
+        """Запустить периодическое вытеснение простаивающих"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sweep())
+
+    def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    # Доступ к записям
+
+    def get(self, guild_id: int) -> GuildState:
+        """Запись сервера (создаётся при отсутствии)"""
+        state = self.peek(guild_id)
+        if state is None:
+            state = self._states[guild_id] = GuildState(guild_id)
+            self.created += 1
+            if len(self._states) > self.max_guilds:
+                self._evict_overflow()
+        return state
+
+    def peek(self, guild_id: int) -> Optional[GuildState]:
+        """Запись сервера, если она в памяти (без создания)"""
+        state = self._states.get(guild_id)
+        if state is not None:
+            state.last_used = time.monotonic()
+            self._states.move_to_end(guild_id)
+        return state
+
+    def forget(self, guild_id: int) -> None:
+        """Удалить запись (бот ушёл с сервера)"""
+        self._states.pop(guild_id, None)
+
+    def active_sessions(self) -> Dict[int, int]:
+        """Открытые сессии нумерации: {guild_id: session_id}"""
+        return {
+            guild_id: state.session_id
+            for guild_id, state in self._states.items()
+            if state.session_id is not None
+        }
+
+    # Вытеснение
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Вытеснить записи, простаивающие дольше idle_ttl
+
+        Returns:
+            Сколько записей вытеснено
+        """
+        deadline = (now if now is not None else time.monotonic()) - self.idle_ttl
+        idle = []
+        # Записи упорядочены по последнему обращению - дальше только свежие
+        for guild_id, state in self._states.items():
+            if state.last_used > deadline:
+                break
+            if not state.pinned:
+                idle.append(guild_id)
+
+        for guild_id in idle:
+            del self._states[guild_id]
+        self.evicted += len(idle)
+
+        # Словарь не уменьшается при удалении - после волны вытеснения пересоздаём
+        if len(idle) > len(self._states):
+            self._states = OrderedDict(self._states)
+        return len(idle)
+
+    def _evict_overflow(self) -> None:
+        excess = len(self._states) - self.max_guilds
+        victims = []
+        for guild_id, state in self._states.items():
+            if len(victims) >= excess:
+                break
+            if not state.pinned:
+                victims.append(guild_id)
+
+        for guild_id in victims:
+            del self._states[guild_id]
+        self.evicted += len(victims)
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            evicted = self.evict_idle()
+            if evicted:
+                logger.debug(f"Вытеснено простаивающих серверов: {evicted}, в памяти: {len(self._states)}")
+
+    # Отчёт
+
+    def footprint(self) -> Dict[str, int]:
+        """Сколько записей в памяти и сколько они занимают (байт, примерно)"""
+        sessions = locks = 0
+        size = sys.getsizeof(self._states)
+        for guild_id, state in self._states.items():
+            size += state.size() + sys.getsizeof(guild_id)
+            sessions += state.session_id is not None
+            locks += state._lock is not None
+
+        return {
+            "guilds": len(self._states),
+            "sessions": sessions,
+            "locks": locks,
+            "created": self.created,
+            "evicted": self.evicted,
+            "bytes": size
+        }
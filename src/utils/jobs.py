@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Учёт выполняющихся длительных команд для корректной остановки
+
+Нумерация, очистка и импорт регистрируются на время работы. При остановке
+бот перестаёт принимать команды и ждёт их завершения не дольше заданного
+срока; не успевшие отменяются, а их прогресс (сколько из скольких
+выполнено) возвращается вызывающему для записи в журнал.
+"""
+
+import asyncio
+import contextlib
+import logging
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждать отменённые задачи после истечения срока (сек)
+CANCEL_GRACE = 5.0
+
+
+class Job:
+    """Одна выполняющаяся команда"""
+
+    __slots__ = ("name", "guild_id", "user_id", "channel", "total", "done", "task")
+
+    def __init__(self, name: str, ctx, total: int, task: Optional[asyncio.Task]):
+        self.name = name
+        self.guild_id = ctx.guild.id if ctx.guild else None
+        self.user_id = ctx.author.id
+        self.channel = ctx.channel
+        self.total = total
+        self.done = 0
+        self.task = task
+
+    def advance(self, count: int = 1) -> None:
+        """Отметить выполненные шаги"""
+        self.done += count
+
+    @property
+    def progress(self) -> str:
+        return f"{self.done}/{self.total}" if self.total else "-"
+
+
+class JobTracker:
+    """Реестр выполняющихся команд"""
+
+    def __init__(self):
+        self.accepting = True
+        self._jobs: Dict[asyncio.Task, Job] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    @contextlib.contextmanager
+    def track(self, name: str, ctx, total: int = 0) -> Iterator[Job]:
+        """
+        Зарегистрировать текущую задачу как выполняющуюся команду
+
+        Args:
+            name: Имя команды (для журнала)
+            ctx: Контекст команды
+            total: Число шагов (переименований), 0 - без прогресса
+
+        Yields:
+            Job - вызывайте job.advance() после каждого шага
+        """
+        task = asyncio.current_task()
+        job = Job(name, ctx, total, task)
+        self._jobs[task] = job
+        self._idle.clear()
+        try:
+            yield job
+        finally:
+            self._jobs.pop(task, None)
+            if not self._jobs:
+                self._idle.set()
+
+    def stop_accepting(self) -> None:
+        """Больше не принимать команды"""
+        self.accepting = False
+
+    async def drain(self, timeout: float) -> List[Job]:
+        """
+        Дождаться завершения команд
+
+        Args:
+            timeout: Сколько ждать (сек); затем оставшиеся команды отменяются
+
+        Returns:
+            Прерванные команды
+        """
+        if self._jobs:
+            logger.info(f"Ожидание завершения команд: {len(self._jobs)} (не дольше {timeout:.0f} с)")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return []
+        except asyncio.TimeoutError:
+            pass
+
+        return await self.cancel_all()
+
+    async def cancel_all(self) -> List[Job]:
+        """Отменить все выполняющиеся команды и дождаться их отмены"""
+        interrupted = list(self._jobs.values())
+        for job in interrupted:
+            job.task.cancel()
+        if interrupted:
+            await asyncio.wait([job.task for job in interrupted], timeout=CANCEL_GRACE)
+        return interrupted
@@ -1,15 +1,34 @@
 # -*- coding: utf-8 -*-
 """
 Модуль настройки логирования
+
+Логгеры только кладут записи в очередь (QueueHandler). Форматирование и
+запись в консоль и файл выполняет фоновый поток (QueueListener), поэтому
+вызов logger.info в цикле событий не ждёт диска.
+
+Текущий лог пишется в <имя>.log. В полночь и при превышении размера он
+переименовывается в <имя>_ГГГГ-ММ-ДД[.N].log, а отдельный поток сжимает
+его в .gz и удаляет архивы старше срока хранения.
 """
 
+import asyncio
+import atexit
+import gzip
 import logging
 import logging.handlers
 import os
+import queue
+import shutil
 import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+import discord
+
+from . import fastjson
 
 # Цветные логи для консоли
 try:
@@ -18,21 +37,319 @@ try:
 except ImportError:
     COLORLOG_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+# Допустимые значения LOG_FORMAT
+LOG_FORMATS = ("text", "json")
+
+FILE_FORMAT = '%(asctime)s | %(name)-20s | %(levelname)-8s | %(funcName)-20s | %(message)s'
+CONSOLE_FORMAT = '%(asctime)s | %(name)-20s | %(levelname)-8s | %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON (для сборщиков логов)"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "process": record.process,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return fastjson.dumps(entry)
+        
+        
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не форматирует запись в вызывающем потоке"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Сообщения бота - уже готовые f-строки; форматирует фоновый поток
+        return record
+        
+        
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_queue_handler = _EnqueueHandler(_log_queue)
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_handlers: List[logging.Handler] = []
+_extra_handlers: List[logging.Handler] = []
+_listener_lock = threading.Lock()
+
 
+def _console_handler(log_level: str, log_format: str) -> logging.Handler:
+    """Обработчик для консоли"""
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(getattr(logging, log_level.upper()))
+    
+    if log_format == "json":
+        console_formatter = JsonFormatter()
+    elif COLORLOG_AVAILABLE:
+        # Цветной вывод
+        console_formatter = colorlog.ColoredFormatter(
+            f'%(log_color)s{CONSOLE_FORMAT}',
+            datefmt=DATE_FORMAT,
+            log_colors={
+                'DEBUG': 'cyan',
+                'INFO': 'green',
+                'WARNING': 'yellow',
+                'ERROR': 'red',
+                'CRITICAL': 'red,bg_white',
+            }
+        )
+    else:
+        console_formatter = logging.Formatter(CONSOLE_FORMAT, datefmt=DATE_FORMAT)
+        
+    console_handler.setFormatter(console_formatter)
+    return console_handler
+    
+    
+class DailyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Ротация в полночь и по размеру; сжатие и удаление архивов - в фоновом потоке"""
+    
+    def __init__(self, log_dir: Path, file_name: str, max_bytes: int, retention_days: int):
+        """
+        Инициализация
+        
+        Args:
+            log_dir: Директория для логов
+            file_name: Имя файла без расширения
+            max_bytes: Максимальный размер файла лога (0 - без ротации по размеру)
+            retention_days: Сколько дней хранить архивы
+        """
+        self.log_dir = Path(log_dir)
+        self.file_name = file_name
+        self.retention_days = retention_days
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        
+        log_file = self.log_dir / f"{file_name}.log"
+        # Лог, оставшийся с прошлого запуска, относится к дню последней записи
+        self.day = (
+            date.fromtimestamp(log_file.stat().st_mtime) if log_file.exists() else date.today()
+        )
+        super().__init__(log_file, maxBytes=max_bytes, backupCount=0, encoding='utf-8')
+        
+        # Архивы, не сжатые до остановки, и просроченные
+        for archive in self.log_dir.glob(f"{file_name}_*.log"):
+            _log_maintenance.submit(archive, self.log_dir, file_name, retention_days)
+        _log_maintenance.submit(None, self.log_dir, file_name, retention_days)
+        
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if date.today() != self.day:
+            return True
+        return bool(super().shouldRollover(record))
+        
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+            
+        log_file = Path(self.baseFilename)
+        if log_file.exists() and log_file.stat().st_size > 0:
+            archive = self._archive_path(self.day)
+            os.replace(log_file, archive)
+            _log_maintenance.submit(archive, self.log_dir, self.file_name, self.retention_days)
+            
+        self.day = date.today()
+        self.stream = self._open()
+        
+    def _archive_path(self, day: date) -> Path:
+        # Несколько ротаций по размеру за день: _2024-05-01.log, _2024-05-01.1.log, ...
+        index = 0
+        while True:
+            suffix = f".{index}" if index else ""
+            archive = self.log_dir / f"{self.file_name}_{day.isoformat()}{suffix}.log"
+            if not archive.exists() and not archive.with_name(archive.name + ".gz").exists():
+                return archive
+            index += 1
+            
+            
+class _LogMaintenance:
+    """Фоновый поток: сжатие архивов логов и удаление просроченных"""
+    
+    def __init__(self):
+        self._tasks: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        
+    def submit(self, archive: Optional[Path], log_dir: Path, file_name: str, retention_days: int) -> None:
+        """Сжать архив (если задан) и удалить архивы старше retention_days"""
+        self._tasks.put((archive, log_dir, file_name, retention_days))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-maintenance", daemon=True)
+                self._thread.start()
+                
+    def _run(self):
+        while True:
+            archive, log_dir, file_name, retention_days = self._tasks.get()
+            try:
+                if archive is not None:
+                    compress_log(archive)
+                clean_old_logs(log_dir, retention_days, pattern=f"{file_name}_*.log*")
+            except Exception as e:
+                # Запись уходит в очередь; поток записи логов этот поток не ждёт
+                logger.error(f"Ошибка обслуживания логов {log_dir}: {e}")
+                
+                
+_log_maintenance = _LogMaintenance()
+
+
+def compress_log(path: Path) -> Path:
+    """
+    Сжать файл лога в .gz (исходный файл удаляется)
+    
+    Returns:
+        Путь к сжатому файлу
+    """
+    target = path.with_name(path.name + ".gz")
+    partial = path.with_name(path.name + ".gz.tmp")
+    with open(path, 'rb') as source, gzip.open(partial, 'wb', compresslevel=6) as destination:
+        shutil.copyfileobj(source, destination, 1024 * 1024)
+    # Дата изменения архива - дата последней записи, по ней считается срок хранения
+    stat = path.stat()
+    os.utime(partial, (stat.st_atime, stat.st_mtime))
+    os.replace(partial, target)
+    path.unlink()
+    return target
+    
+    
+def _file_handler(log_dir: Path, log_format: str, file_name: str,
+                  max_bytes: int, retention_days: int) -> logging.Handler:
+    """Обработчик для файла"""
+    file_handler = DailyRotatingFileHandler(log_dir, file_name, max_bytes, retention_days)
+    file_handler.setLevel(logging.DEBUG)
+    if log_format == "json":
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(FILE_FORMAT, datefmt=DATE_FORMAT))
+    return file_handler
+    
+    
+def _start_listener(handlers: Optional[List[logging.Handler]] = None) -> None:
+    """
+    Запустить фоновый поток записи заново (прежний дописывает очередь и завершается)
+    
+    Args:
+        handlers: Новые обработчики консоли и файла (None - оставить прежние)
+    """
+    global _listener, _listener_handlers
+    
+    with _listener_lock:
+        if _listener:
+            _listener.stop()
+        if handlers is not None:
+            for handler in _listener_handlers:
+                handler.close()
+            _listener_handlers = handlers
+            
+        _listener = logging.handlers.QueueListener(
+            _log_queue, *_listener_handlers, *_extra_handlers, respect_handler_level=True
+        )
+        _listener.start()
+        
+        
+def attach_log_handler(handler: logging.Handler) -> None:
+    """
+    Добавить обработчик в фоновый поток (сохраняется при configure_logging)
+    
+    Поток перезапускается и дописывает очередь - из цикла событий
+    вызывайте через asyncio.to_thread.
+    """
+    if handler not in _extra_handlers:
+        _extra_handlers.append(handler)
+        _start_listener()
+        
+        
+def detach_log_handler(handler: logging.Handler) -> None:
+    """
+    Убрать обработчик, добавленный attach_log_handler
+    
+    Записи, уже стоящие в очереди, обработчик получит до возврата; из цикла
+    событий вызывайте через asyncio.to_thread.
+    """
+    if handler in _extra_handlers:
+        _extra_handlers.remove(handler)
+        _start_listener()
+        
+        
+def stop_logging() -> None:
+    """Дописать очередь и остановить фоновый поток (вызывается при выходе)"""
+    global _listener
+    
+    with _listener_lock:
+        if _listener:
+            _listener.stop()
+            _listener = None
+        for handler in _listener_handlers:
+            # Как logging.shutdown: поток вывода мог быть уже закрыт
+            try:
+                handler.flush()
+            except (OSError, ValueError):
+                pass
+            
+            
+atexit.register(stop_logging)
+
+
+def configure_logging(log_dir: Path = None,
+                      log_level: str = "INFO",
+                      log_format: str = "text",
+                      file_name: str = "bot",
+                      max_bytes: int = 10 * 1024 * 1024,  # 10MB
+                      retention_days: int = 30) -> None:
+    """
+    Настройка вывода всех логов процесса
+    
+    Логгеры setup_logger и корневой логгер (get_logger, discord.py) пишут
+    в одну очередь; консоль и файл обслуживает фоновый поток.
+    
+    Args:
+        log_dir: Директория для логов (None - только консоль)
+        log_level: Уровень логирования
+        log_format: text или json (строка JSON на запись)
+        file_name: Начало имени файла лога
+        max_bytes: Максимальный размер файла лога (0 - ротация только в полночь)
+        retention_days: Сколько дней хранить сжатые архивы логов
+    """
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Неизвестный формат логов: {log_format} (допустимо: {', '.join(LOG_FORMATS)})")
+        
+    handlers = [_console_handler(log_level, log_format)]
+    if log_dir:
+        handlers.append(_file_handler(log_dir, log_format, file_name, max_bytes, retention_days))
+    _start_listener(handlers)
+    
+    # Логгеры get_logger(__name__) и библиотек передают записи корневому
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, log_level.upper()))
+    if _queue_handler not in root.handlers:
+        root.addHandler(_queue_handler)
+        
+        
 def setup_logger(name: str = None, 
                 log_dir: Path = None, 
                 log_level: str = "INFO",
                 max_bytes: int = 10 * 1024 * 1024,  # 10MB
-                backup_count: int = 30) -> logging.Logger:
+                retention_days: int = 30) -> logging.Logger:
     """
-    Настройка логгера с ротацией файлов и цветным выводом
+    Настройка логгера с выводом через фоновый поток
     
     Args:
         name: Имя логгера
-        log_dir: Директория для логов
+        log_dir: Директория для логов (если задана - перенастраивает вывод процесса)
         log_level: Уровень логирования
         max_bytes: Максимальный размер файла лога
-        backup_count: Количество резервных копий
+        retention_days: Сколько дней хранить архивы логов
         
     Returns:
         Настроенный логгер
@@ -46,53 +363,13 @@ def setup_logger(name: str = None,
         
     logger.setLevel(getattr(logging, log_level.upper()))
     
-    # Форматирование
-    file_format = '%(asctime)s | %(name)-20s | %(levelname)-8s | %(funcName)-20s | %(message)s'
-    console_format = '%(asctime)s | %(name)-20s | %(levelname)-8s | %(message)s'
-    date_format = '%Y-%m-%d %H:%M:%S'
-    
-    # Обработчик для файла
     if log_dir:
-        log_dir = Path(log_dir)
-        log_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Имя файла с текущей датой
-        log_file = log_dir / f"bot_{datetime.now().strftime('%Y-%m-%d')}.log"
-        
-        # Ротация по размеру
-        file_handler = logging.handlers.RotatingFileHandler(
-            log_file,
-            maxBytes=max_bytes,
-            backupCount=backup_count,
-            encoding='utf-8'
-        )
-        file_handler.setLevel(logging.DEBUG)
-        file_formatter = logging.Formatter(file_format, datefmt=date_format)
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-    
-    # Обработчик для консоли
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, log_level.upper()))
-    
-    if COLORLOG_AVAILABLE:
-        # Цветной вывод
-        console_formatter = colorlog.ColoredFormatter(
-            f'%(log_color)s{console_format}',
-            datefmt=date_format,
-            log_colors={
-                'DEBUG': 'cyan',
-                'INFO': 'green',
-                'WARNING': 'yellow',
-                'ERROR': 'red',
-                'CRITICAL': 'red,bg_white',
-            }
-        )
-    else:
-        console_formatter = logging.Formatter(console_format, datefmt=date_format)
+        configure_logging(log_dir, log_level, max_bytes=max_bytes, retention_days=retention_days)
+    elif _listener is None:
+        # До configure_logging - только консоль
+        _start_listener([_console_handler(log_level, "text")])
         
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    logger.addHandler(_queue_handler)
     
     # Отключаем пропаганду логов вверх по иерархии
     logger.propagate = False
@@ -114,78 +391,173 @@ def get_logger(name: str) -> logging.Logger:
 
 
 class DiscordLogHandler(logging.Handler):
-    """Обработчик для отправки критических логов в Discord канал"""
+    """
+    Обработчик для отправки критических логов в Discord канал
+    
+    emit только складывает запись в ограниченный буфер, группируя
+    одинаковые ошибки (тот же логгер и строка кода) со счётчиком. Задача в
+    цикле событий бота отправляет накопленное одним сообщением не чаще раза
+    в interval секунд. При переполнении буфера вытесняются самые старые
+    группы, а число потерянных записей попадает в следующее сообщение.
+    """
+    
+    # Уровни: эмодзи и цвет embed
+    LEVEL_STYLES = {
+        logging.WARNING: ("⚠️", 0xFFA500),  # Оранжевый
+        logging.ERROR: ("❌", 0xFF0000),    # Красный
+        logging.CRITICAL: ("🚨", 0x8B0000)  # Тёмно-красный
+    }
     
-    def __init__(self, bot, channel_id: int, min_level: int = logging.ERROR):
+    # Лимиты embed Discord (с запасом)
+    MAX_FIELDS = 10
+    FIELD_VALUE_LIMIT = 1000
+    
+    def __init__(self, bot, channel_id: int, min_level: int = logging.ERROR,
+                 interval: float = 60.0, max_groups: int = 50):
+        """
+        Инициализация
+        
+        Args:
+            bot: Экземпляр бота
+            channel_id: ID канала для уведомлений
+            min_level: Минимальный уровень записей
+            interval: Не чаще одного сообщения за столько секунд
+            max_groups: Размер буфера (разных ошибок между отправками)
+        """
         super().__init__()
         self.bot = bot
         self.channel_id = channel_id
+        self.interval = interval
+        self.max_groups = max_groups
         self.setLevel(min_level)
         
+        # Группы записей до отправки: ключ -> данные группы
+        self._groups: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._dropped = 0
+        self._buffer_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        
     def emit(self, record):
-        """Отправка лога в Discord"""
+        """Добавить запись в буфер (вызывается из потока записи логов)"""
         try:
-            # Форматируем сообщение
-            log_entry = self.format(record)
+            # Для f-строк шаблон - место в коде; для %-шаблонов - ещё и сам шаблон
+            key = (record.name, record.pathname, record.lineno, record.msg if record.args else None)
+            message = record.getMessage()
+            if record.exc_info and record.exc_info[1] is not None:
+                error = record.exc_info[1]
+                message += f"\n{type(error).__name__}: {error}"
+                
+            with self._buffer_lock:
+                group = self._groups.get(key)
+                if group is None:
+                    while len(self._groups) >= self.max_groups:
+                        _, oldest = self._groups.popitem(last=False)
+                        self._dropped += oldest["count"]
+                    self._groups[key] = {
+                        "name": record.name,
+                        "func": record.funcName,
+                        "line": record.lineno,
+                        "levelno": record.levelno,
+                        "message": message,
+                        "count": 1,
+                        "first": record.created,
+                        "last": record.created
+                    }
+                else:
+                    group["count"] += 1
+                    group["levelno"] = max(group["levelno"], record.levelno)
+                    group["message"] = message
+                    group["last"] = record.created
+        except Exception:
+            self.handleError(record)
             
-            # Определяем эмодзи по уровню
-            emoji = {
-                logging.WARNING: "⚠️",
-                logging.ERROR: "❌",
-                logging.CRITICAL: "🚨"
-            }.get(record.levelno, "📝")
+    def start(self) -> None:
+        """Запустить периодическую отправку (в цикле событий бота)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
             
-            # Создаём embed
-            embed = {
-                "title": f"{emoji} {record.levelname}",
-                "description": f"```{log_entry[:1900]}```",
-                "color": {
-                    logging.WARNING: 0xFFA500,  # Оранжевый
-                    logging.ERROR: 0xFF0000,    # Красный
-                    logging.CRITICAL: 0x8B0000  # Тёмно-красный
-                }.get(record.levelno, 0x808080),
-                "timestamp": datetime.utcnow().isoformat(),
-                "fields": [
-                    {"name": "Logger", "value": record.name, "inline": True},
-                    {"name": "Function", "value": record.funcName, "inline": True},
-                    {"name": "Line", "value": str(record.lineno), "inline": True}
-                ]
-            }
+    async def stop(self) -> None:
+        """Остановить периодическую отправку и отправить остаток"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        await self.flush_to_discord()
+        
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush_to_discord()
             
-            # Отправляем асинхронно
-            self.bot.loop.create_task(self._send_to_discord(embed))
+    async def flush_to_discord(self) -> None:
+        """Отправить накопленные записи одним сообщением"""
+        with self._buffer_lock:
+            groups = list(self._groups.values())
+            dropped = self._dropped
+            self._groups.clear()
+            self._dropped = 0
             
-        except Exception:
-            self.handleError(record)
+        if not groups and not dropped:
+            return
+            
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            return
             
-    async def _send_to_discord(self, embed_data):
-        """Асинхронная отправка в Discord"""
         try:
-            channel = self.bot.get_channel(self.channel_id)
-            if channel:
-                embed = self.bot.discord.Embed.from_dict(embed_data)
-                await channel.send(embed=embed)
+            await channel.send(embed=self._build_embed(groups, dropped))
         except Exception as e:
-            print(f"Ошибка отправки лога в Discord: {e}")
-
-
-def clean_old_logs(log_dir: Path, days_to_keep: int = 30):
+            # Не ERROR: сбой отправки не должен порождать новые уведомления
+            logger.warning(f"Не удалось отправить уведомление об ошибках в Discord: {e}")
+            
+    def _build_embed(self, groups: List[dict], dropped: int) -> discord.Embed:
+        levelno = max((group["levelno"] for group in groups), default=logging.ERROR)
+        emoji, color = self.LEVEL_STYLES.get(levelno, ("📝", 0x808080))
+        total = sum(group["count"] for group in groups)
+        
+        embed = discord.Embed(
+            title=f"{emoji} {logging.getLevelName(levelno)}: записей {total + dropped}",
+            color=color,
+            timestamp=datetime.now(timezone.utc)
+        )
+        
+        # Самые частые ошибки - первыми
+        groups = sorted(groups, key=lambda group: group["count"], reverse=True)
+        for group in groups[:self.MAX_FIELDS]:
+            repeat = f" ×{group['count']}" if group["count"] > 1 else ""
+            embed.add_field(
+                name=f"{group['name']}:{group['line']} ({group['func']}){repeat}"[:250],
+                value=f"```{group['message'][:self.FIELD_VALUE_LIMIT]}```",
+                inline=False
+            )
+            
+        footer = []
+        if len(groups) > self.MAX_FIELDS:
+            hidden = groups[self.MAX_FIELDS:]
+            footer.append(f"ещё {len(hidden)} видов ошибок ({sum(group['count'] for group in hidden)} записей)")
+        if dropped:
+            footer.append(f"потеряно при переполнении буфера: {dropped}")
+        if footer:
+            embed.set_footer(text="; ".join(footer))
+        return embed
+        
+        
+def clean_old_logs(log_dir: Path, days_to_keep: int = 30, pattern: str = "*.log*"):
     """
     Очистка старых логов
     
     Args:
         log_dir: Директория с логами
         days_to_keep: Сколько дней хранить логи
+        pattern: Какие файлы проверять
     """
     if not log_dir.exists():
         return
         
     cutoff_date = datetime.now().timestamp() - (days_to_keep * 24 * 60 * 60)
     
-    for log_file in log_dir.glob("*.log*"):
+    for log_file in log_dir.glob(pattern):
         if log_file.stat().st_mtime < cutoff_date:
             try:
                 log_file.unlink()
-                logging.info(f"Удалён старый лог: {log_file}")
+                logger.info(f"Удалён старый лог: {log_file}")
             except Exception as e:
-                logging.error(f"Ошибка удаления лога {log_file}: {e}") 
\ No newline at end of file
+                logger.error(f"Ошибка удаления лога {log_file}: {e}") 
\ No newline at end of file
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Профиль кэша участников и загрузка участников по запросу
+
+Профиль "full" - поведение discord.py по умолчанию: при запуске бот
+загружает (chunk) всех участников каждого сервера и держит их в памяти.
+На больших серверах это сотни тысяч объектов Member, хотя нумерации нужны
+только участники голосовых каналов.
+
+Профиль "voice" кэширует участников голосовых каналов и вошедших на сервер
+после запуска, а серверы при запуске не загружает. Недостающих участников
+команды догружают сами (voice_channel_members); конвертеры discord.py
+(@упоминание, ID) запрашивают участника у шлюза при промахе кэша.
+"""
+
+import logging
+from typing import Any, Dict, List
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Допустимые значения MEMORY_PROFILE
+MEMORY_PROFILES = ("full", "voice")
+
+# Сколько ID принимает один запрос участников к шлюзу
+QUERY_MEMBERS_LIMIT = 100
+
+
+def member_cache_options(profile: str) -> Dict[str, Any]:
+    """
+    Параметры клиента discord.py для профиля памяти
+
+    Args:
+        profile: Один из MEMORY_PROFILES
+
+    Returns:
+        member_cache_flags и chunk_guilds_at_startup
+    """
+    if profile not in MEMORY_PROFILES:
+        raise ValueError(f"Неизвестный профиль памяти: {profile} (допустимо: {', '.join(MEMORY_PROFILES)})")
+
+    if profile == "full":
+        return {
+            "member_cache_flags": discord.MemberCacheFlags.all(),
+            "chunk_guilds_at_startup": True
+        }
+    return {
+        "member_cache_flags": discord.MemberCacheFlags(voice=True, joined=True),
+        "chunk_guilds_at_startup": False
+    }
+
+
+async def voice_channel_members(channel: discord.VoiceChannel) -> List[discord.Member]:
+    """
+    Участники голосового канала с догрузкой отсутствующих в кэше
+
+    VoiceChannel.members пропускает участников, чьих объектов Member нет в
+    кэше. Обычно шлюз присылает их вместе с голосовым состоянием, но
+    на всякий случай недостающие запрашиваются у шлюза по ID.
+
+    Args:
+        channel: Голосовой канал
+
+    Returns:
+        Участники канала
+    """
+    guild = channel.guild
+    missing = [user_id for user_id in channel.voice_states if guild.get_member(user_id) is None]
+
+    for start in range(0, len(missing), QUERY_MEMBERS_LIMIT):
+        batch = missing[start:start + QUERY_MEMBERS_LIMIT]
+        try:
+            await guild.query_members(user_ids=batch, cache=True)
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить участников канала {channel.id}: {e}")
+            break
+    if missing:
+        logger.debug(f"Догружено участников канала {channel.id}: {len(missing)}")
+
+    return channel.members
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Периоды для рейтингов ведущих
+"""
+
+from typing import Optional
+
+from discord.ext import commands
+
+# Длина окна в днях (включая текущий день)
+PERIOD_DAYS = {
+    "day": 1,
+    "week": 7,
+    "month": 30,
+}
+
+# Допустимые написания периода в командах
+PERIOD_ALIASES = {
+    "day": "day", "d": "day", "today": "day", "день": "day", "сегодня": "day",
+    "week": "week", "w": "week", "неделя": "week", "неделю": "week",
+    "month": "month", "m": "month", "месяц": "month",
+    "all": "all", "total": "all", "всё": "all", "все": "all", "всего": "all",
+}
+
+# Подписи для embed
+PERIOD_TITLES = {
+    "day": "за сегодня",
+    "week": "за неделю",
+    "month": "за месяц",
+    "all": "за всё время",
+}
+
+
+def parse_period(value: Optional[str]) -> Optional[str]:
+    """
+    Привести название периода к каноническому виду
+
+    Args:
+        value: Период, введённый пользователем
+
+    Returns:
+        Ключ из PERIOD_DAYS или None для рейтинга за всё время
+
+    Raises:
+        ValueError: Если период не распознан
+    """
+    if value is None:
+        return None
+
+    period = PERIOD_ALIASES.get(value.lower())
+    if period is None:
+        raise ValueError(value)
+    return None if period == "all" else period
+
+
+class PeriodConverter(commands.Converter):
+    """Конвертер аргумента периода для команд"""
+
+    async def convert(self, ctx: commands.Context, argument: str) -> Optional[str]:
+        try:
+            return parse_period(argument)
+        except ValueError:
+            raise commands.BadArgument(
+                f"неизвестный период `{argument}`. Доступно: day, week, month, all"
+            )
@@ -197,4 +197,11 @@ def requires_admin():
         if hasattr(bot, 'permission_system'):
             return bot.permission_system.is_admin(ctx.author)
         return False
+    return commands.check(predicate)
+
+
+def requires_global_admin():
+    """Декоратор для команд глобального администратора (данные всех серверов)"""
+    async def predicate(ctx: commands.Context) -> bool:
+        return ctx.author.id in ctx.bot.config.global_admins
     return commands.check(predicate) 
\ No newline at end of file
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Префиксы команд по серверам
+
+Префикс сервера хранится в его настройках (ключ "prefix") и после первого
+обращения живёт в памяти. Кэш отдельный от bot.guild_states и не
+вытесняется: это одна короткая строка на сервер, а промах кэша означал бы
+чтение настроек из базы на каждое сообщение чата простаивавшего сервера.
+
+Через этот же кэш on_message отсеивает сообщения, не начинающиеся с
+префикса, до разбора команды - обычный чат не создаёт Context и не
+трогает базу.
+"""
+
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ограничения на префикс сервера
+PREFIX_MAX_LENGTH = 5
+
+
+class PrefixCache:
+    """Кэш префиксов серверов поверх настроек в хранилище"""
+
+    def __init__(self, bot, default: str):
+        """
+        Инициализация
+
+        Args:
+            bot: Экземпляр бота (хранилище берётся из bot.db)
+            default: Префикс по умолчанию (BOT_PREFIX) - для ЛС и серверов без своего
+        """
+        self.bot = bot
+        self.default = default
+        self._prefixes: Dict[int, str] = {}
+
+    def cached(self, guild_id: Optional[int]) -> Optional[str]:
+        """Префикс из памяти без обращения к хранилищу (None - ещё не загружен)"""
+        if guild_id is None:
+            return self.default
+        return self._prefixes.get(guild_id)
+
+    async def get(self, guild_id: Optional[int]) -> str:
+        """Префикс сервера (загружается из настроек при первом обращении)"""
+        prefix = self.cached(guild_id)
+        if prefix is None:
+            settings = await self.bot.db.get_guild_settings(guild_id)
+            prefix = settings.get('prefix') or self.default
+            self._prefixes[guild_id] = prefix
+        return prefix
+
+    async def set(self, guild_id: int, prefix: Optional[str]) -> str:
+        """
+        Сохранить префикс сервера
+
+        Args:
+            guild_id: ID сервера
+            prefix: Новый префикс (None - вернуть префикс по умолчанию)
+
+        Returns:
+            Действующий префикс
+        """
+        settings = await self.bot.db.get_guild_settings(guild_id)
+        if prefix is None or prefix == self.default:
+            settings.pop('prefix', None)
+            prefix = self.default
+        else:
+            settings['prefix'] = prefix
+        await self.bot.db.update_guild_settings(guild_id, settings)
+
+        self._prefixes[guild_id] = prefix
+        return prefix
+
+    def forget(self, guild_id: int) -> None:
+        """Сбросить кэш сервера (настройки изменены в обход set или бот ушёл)"""
+        self._prefixes.pop(guild_id, None)
+
+    async def is_command_candidate(self, message) -> bool:
+        """
+        Может ли сообщение быть текстовой командой
+
+        Проверка дешёвая: первый символ и префикс сервера из памяти.
+        """
+        content = message.content
+        if not content or message.author.bot:
+            return False
+
+        guild_id = message.guild.id if message.guild else None
+        prefix = self.cached(guild_id)
+        if prefix is None:
+            prefix = await self.get(guild_id)
+        return content[0] == prefix[0] and content.startswith(prefix)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Объединение обновлений статуса бота
+
+Смена статуса - операция шлюза с жёстким лимитом (около 5 в минуту).
+При волне присоединений или переподключений события приходят пачкой,
+поэтому запросы объединяются: не чаще одного обновления за интервал,
+и публикуется всегда актуальное на момент отправки число серверов.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceManager:
+    """Отложенное и объединённое обновление статуса"""
+
+    def __init__(self, bot, interval: float = 60.0):
+        """
+        Инициализация
+
+        Args:
+            bot: Экземпляр бота
+            interval: Минимальный интервал между обновлениями (сек)
+        """
+        self.bot = bot
+        self.interval = interval
+
+        # Счётчики для !info и отладки
+        self.requested = 0
+        self.published = 0
+        self.coalesced = 0
+        self.skipped = 0
+
+        self._dirty = False
+        self._force = False
+        self._last_name: Optional[str] = None
+        self._last_published_at = float("-inf")
+        self._task: Optional[asyncio.Task] = None
+
+    def request_update(self, force: bool = False) -> None:
+        """
+        Запросить обновление статуса
+
+        Args:
+            force: Отправить, даже если текст не изменился (после нового
+                подключения к шлюзу статус сбрасывается)
+        """
+        self.requested += 1
+        self._dirty = True
+        self._force = self._force or force
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        else:
+            self.coalesced += 1
+            logger.debug(f"Обновление статуса объединено с ожидающим (всего объединено: {self.coalesced})")
+
+    def stop(self) -> None:
+        """Отменить ожидающее обновление"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requested": self.requested,
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "skipped": self.skipped
+        }
+
+    def _activity_name(self) -> str:
+        return f"{len(self.bot.guilds)} серверов | {self.bot.config.prefix}help"
+
+    async def _run(self) -> None:
+        # Запросы, пришедшие во время отправки, обрабатываются следующим кругом
+        while self._dirty:
+            delay = self._last_published_at + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self._dirty = False
+            force, self._force = self._force, False
+            await self._publish(force)
+
+    async def _publish(self, force: bool) -> None:
+        name = self._activity_name()
+        if name == self._last_name and not force:
+            self.skipped += 1
+            return
+
+        try:
+            await self.bot.change_presence(
+                activity=discord.Activity(type=discord.ActivityType.watching, name=name)
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось обновить статус: {e}")
+            return
+        finally:
+            self._last_published_at = time.monotonic()
+
+        self._last_name = name
+        self.published += 1
+        logger.debug(f"Статус обновлён: {name} ({self.stats})")
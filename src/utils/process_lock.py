@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Межпроцессная блокировка на файле
+
+В кластерном режиме каждый процесс бота запускает одни и те же фоновые
+задачи. Операции, которые должны выполняться один раз на весь кластер
+(синхронизация команд, архивация журнала, резервные копии), берут
+эксклюзивную блокировку fcntl на файл в общей директории. Блокировка
+снимается ядром и при падении процесса, поэтому не «зависает».
+
+Блокировка исключает только одновременное выполнение: процесс, пришедший
+после завершения задачи, возьмёт её снова. Задачи, которые не должны
+повторяться в течение интервала, дополнительно хранят время последнего
+выполнения (bot_meta или свежесть копии на диске).
+
+Без fcntl (Windows) блокировка всегда считается взятой - там поддерживается
+только запуск одним процессом.
+"""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessLock:
+    """
+    Эксклюзивная блокировка файла для async with
+
+    ``async with ProcessLock(path) as acquired`` - acquired равно False, если
+    блокировку держит другой процесс (при wait=False).
+    """
+
+    def __init__(self, path: Path, wait: bool = False, poll_interval: float = 0.5):
+        """
+        Инициализация
+
+        Args:
+            path: Файл блокировки
+            wait: Ждать освобождения вместо немедленного отказа
+            poll_interval: Период повторных попыток при ожидании (сек)
+        """
+        self.path = Path(path)
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    async def __aenter__(self) -> bool:
+        if not HAS_FCNTL:
+            return True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    if not self.wait:
+                        os.close(fd)
+                        logger.debug(f"Блокировка {self.path.name} занята другим процессом")
+                        return False
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                # PID владельца - для отладки
+                os.ftruncate(fd, 0)
+                os.write(fd, str(os.getpid()).encode())
+                self._fd = fd
+                return True
+        except BaseException:
+            # Отмена во время ожидания (остановка бота) - дескриптор не должен утечь
+            os.close(fd)
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Профиль выполнения
+
+"default" - стандартный цикл событий asyncio и модуль json.
+"fast" - uvloop вместо цикла событий asyncio и orjson для JSON самого
+бота (utils.fastjson). Обе библиотеки необязательны: если какой-то нет,
+используется стандартная реализация. discord.py разбирает сообщения
+шлюза через orjson сам, если тот установлен, независимо от профиля.
+
+Профиль применяется до запуска цикла событий: run() вместо asyncio.run().
+"""
+
+import asyncio
+import logging
+from typing import Any, Coroutine, Dict
+
+from . import fastjson
+
+try:
+    import uvloop
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
+logger = logging.getLogger(__name__)
+
+# Допустимые значения RUNTIME_PROFILE
+RUNTIME_PROFILES = ("default", "fast")
+
+
+def apply_runtime_profile(profile: str) -> Dict[str, str]:
+    """
+    Применить профиль: политика цикла событий и реализация JSON
+
+    Args:
+        profile: Один из RUNTIME_PROFILES
+
+    Returns:
+        {"loop": "uvloop"|"asyncio", "json": "orjson"|"json"} - что используется на деле
+    """
+    if profile not in RUNTIME_PROFILES:
+        raise ValueError(f"Неизвестный профиль выполнения: {profile} (допустимо: {', '.join(RUNTIME_PROFILES)})")
+
+    fast = profile == "fast"
+    if fast and HAS_UVLOOP:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    fastjson.use_fast_json(fast)
+
+    active = {
+        "loop": "uvloop" if fast and HAS_UVLOOP else "asyncio",
+        "json": fastjson.backend()
+    }
+    if fast and (not HAS_UVLOOP or not fastjson.HAS_ORJSON):
+        missing = [name for name, ok in (("uvloop", HAS_UVLOOP), ("orjson", fastjson.HAS_ORJSON)) if not ok]
+        logger.warning(f"Профиль fast: не установлены {', '.join(missing)}, используются стандартные реализации")
+    return active
+
+
+def run(main: Coroutine[Any, Any, Any], profile: str) -> Any:
+    """asyncio.run() с применённым профилем"""
+    active = apply_runtime_profile(profile)
+    logger.info(f"Профиль выполнения {profile}: цикл событий {active['loop']}, JSON {active['json']}")
+    return asyncio.run(main)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Замер времени запуска по этапам
+
+Отсчёт идёт от импорта этого модуля - main.py импортирует его первым.
+Этапы: импорт модулей, инициализация хранилища, загрузка расширений
+(каждого отдельно), подключение к шлюзу до on_ready. Этапы, идущие
+параллельно, замеряются каждый своим временем, поэтому их сумма может
+быть больше общего времени до готовности.
+"""
+
+import contextlib
+import logging
+import time
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STARTED = time.perf_counter()
+
+
+class StartupTimer:
+    """Длительности этапов запуска"""
+
+    def __init__(self, started: float = PROCESS_STARTED):
+        self.started = started
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_after: Optional[float] = None
+
+    def elapsed(self) -> float:
+        """Секунд с начала запуска"""
+        return time.perf_counter() - self.started
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+        logger.debug(f"Этап запуска «{name}»: {seconds:.3f} с")
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Замерить этап: ``with timer.phase("база данных"): ...``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def ready(self) -> bool:
+        """
+        Отметить готовность (первый on_ready)
+
+        Returns:
+            True при первом вызове - тогда стоит вывести summary()
+        """
+        if self.ready_after is not None:
+            return False
+        self.ready_after = self.elapsed()
+        return True
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name} {seconds:.2f} с" for name, seconds in self.phases)
+        total = f"{self.ready_after:.2f} с" if self.ready_after is not None else "ещё не готов"
+        return f"{total} ({phases})" if phases else total
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетное разрешение ID пользователей для списков
+
+Списки (ведущие, права, журнал, администраторы) показывают до десятка
+пользователей, которых часто нет в кэше discord.py. Запросы fetch_user
+для промахов выполняются параллельно с ограничением числа одновременных,
+повторяющиеся ID запрашиваются один раз, а результаты - в том числе
+«пользователь удалён» - кэшируются на время TTL.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class UserResolver:
+    """Кэш пользователей с TTL, отрицательными записями и параллельной догрузкой"""
+
+    def __init__(self, bot, ttl: float = 900.0, negative_ttl: float = 3600.0,
+                 concurrency: int = 5, timeout: float = 3.0, max_entries: int = 10000):
+        """
+        Инициализация
+
+        Args:
+            bot: Экземпляр бота
+            ttl: Сколько хранить найденного пользователя (сек)
+            negative_ttl: Сколько помнить, что пользователь удалён (сек)
+            concurrency: Одновременных запросов fetch_user
+            timeout: Сколько ждать догрузки для одного списка (сек);
+                не успевшие показываются запасным именем
+            max_entries: Размер кэша (старые записи вытесняются)
+        """
+        self.bot = bot
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.max_entries = max_entries
+
+        # Счётчики для отладки
+        self.hits = 0
+        self.fetched = 0
+        self.not_found = 0
+        self.failed = 0
+
+        self._cache: "OrderedDict[int, Tuple[float, Optional[discord.User]]]" = OrderedDict()
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "fetched": self.fetched,
+            "not_found": self.not_found,
+            "failed": self.failed,
+            "cached": len(self._cache)
+        }
+
+    async def resolve_many(self, user_ids: Iterable[int]) -> Dict[int, Optional[discord.User]]:
+        """
+        Найти пользователей по ID
+
+        Args:
+            user_ids: ID пользователей (повторы допустимы)
+
+        Returns:
+            {user_id: User или None} - None для удалённых и не загруженных вовремя
+        """
+        result: Dict[int, Optional[discord.User]] = {}
+        misses = []
+        now = time.monotonic()
+
+        for user_id in dict.fromkeys(user_ids):
+            user = self.bot.get_user(user_id)
+            if user is None:
+                entry = self._cache.get(user_id)
+                if entry is None or entry[0] <= now:
+                    misses.append(user_id)
+                    continue
+                self._cache.move_to_end(user_id)
+                user = entry[1]
+            self.hits += 1
+            result[user_id] = user
+
+        if misses and not self.bot.is_closed():
+            tasks = {user_id: self._fetch_task(user_id) for user_id in misses}
+            # Не успевшие запросы не отменяются: они дополнят кэш для следующего раза
+            await asyncio.wait(tasks.values(), timeout=self.timeout)
+            for user_id, task in tasks.items():
+                if task.done() and not task.cancelled():
+                    result[user_id] = task.result()
+
+        for user_id in misses:
+            result.setdefault(user_id, None)
+        return result
+
+    async def resolve(self, user_id: int) -> Optional[discord.User]:
+        """Найти одного пользователя по ID"""
+        return (await self.resolve_many([user_id]))[user_id]
+
+    def _fetch_task(self, user_id: int) -> asyncio.Task:
+        # Одновременные списки с тем же ID ждут один запрос
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(user_id))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        return task
+
+    async def _fetch(self, user_id: int) -> Optional[discord.User]:
+        async with self._semaphore:
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.NotFound:
+                self.not_found += 1
+                self._store(user_id, None, self.negative_ttl)
+                return None
+            except (discord.HTTPException, OSError, asyncio.TimeoutError) as e:
+                # Discord недоступен - не кэшируем, вызывающий покажет запасное имя
+                self.failed += 1
+                logger.debug(f"Не удалось загрузить пользователя {user_id}: {e}")
+                return None
+
+        self.fetched += 1
+        self._store(user_id, user, self.ttl)
+        return user
+
+    def _store(self, user_id: int, user: Optional[discord.User], ttl: float) -> None:
+        self._cache[user_id] = (time.monotonic() + ttl, user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
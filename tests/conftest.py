@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Общие фикстуры тестов
+
+PostgreSQL для тестов хранилища: TEST_DATABASE_URL, если задан, иначе
+временный локальный сервер из пакета pgserver (requirements-dev.txt,
+бинарники PostgreSQL входят в пакет). Без обоих тесты PostgreSQL
+пропускаются.
+
+Конфигурация бота для тестов - make_config: config.json во временной
+директории, все файлы бота внутри неё.
+"""
+
+import json
+import os
+
+import pytest
+
+from src.config import Config
+
+
+@pytest.fixture(scope="session")
+def postgres_url(tmp_path_factory):
+    """URL базы PostgreSQL для тестов"""
+    url = os.getenv("TEST_DATABASE_URL", "")
+    if url:
+        yield url
+        return
+
+    pgserver = pytest.importorskip("pgserver", reason="нет TEST_DATABASE_URL и пакета pgserver")
+    server = pgserver.get_server(tmp_path_factory.mktemp("postgres"), cleanup_mode="stop")
+    try:
+        yield server.get_uri()
+    finally:
+        server.cleanup()
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Создать Config из временного config.json: make_config(prefix="?")"""
+
+    def make(**values):
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps({
+            "database_path": str(tmp_path / "data" / "bot.db"),
+            "database_url": "memory://",
+            "logs_dir": str(tmp_path / "logs"),
+            "log_archive_dir": str(tmp_path / "data" / "archive"),
+            "backup_dir": str(tmp_path / "data" / "backups"),
+            "cluster_lock_dir": str(tmp_path / "data" / "locks"),
+            **values
+        }), encoding='utf-8')
+        return Config(str(config_path))
+
+    return make
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Контроль допуска команд
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from discord.ext import commands
+
+from src.bot import NumericBot
+from src.utils.admission import AdmissionController, BotOverloaded, TokenBucket
+
+ADMIN_ID = 1
+
+
+def _bot():
+    return SimpleNamespace(config=SimpleNamespace(global_admins=frozenset({ADMIN_ID})), help_command=None)
+
+
+def _ctx(name="ping", user_id=5, channel_id=10, guild_id=20, voice_members=0, command=None):
+    voice = None
+    if voice_members:
+        voice = SimpleNamespace(channel=SimpleNamespace(voice_states={i: None for i in range(voice_members)}))
+    return SimpleNamespace(
+        command=command or SimpleNamespace(qualified_name=name),
+        author=SimpleNamespace(id=user_id, voice=voice),
+        channel=SimpleNamespace(id=channel_id),
+        guild=SimpleNamespace(id=guild_id)
+    )
+
+
+def _admit(controller, ctx, name=None):
+    return asyncio.run(controller.admit(ctx, name))
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(10, 60)
+    now = bucket.updated_at
+
+    assert bucket.retry_after(10, now) == 0
+    bucket.consume(10)
+    assert bucket.retry_after(1, now) == pytest.approx(6.0)
+    assert bucket.retry_after(1, now + 6) == pytest.approx(0.0)
+    # Пополнение не выше ёмкости
+    assert bucket.retry_after(10, now + 3600) == 0 and bucket.tokens == 10
+
+
+def test_user_bucket_throttles_and_other_users_pass():
+    controller = AdmissionController(_bot(), {"user": (3, 60)})
+
+    for _ in range(3):
+        _admit(controller, _ctx())
+    with pytest.raises(commands.CommandOnCooldown) as error:
+        _admit(controller, _ctx())
+
+    assert error.value.retry_after == pytest.approx(20, abs=0.1)
+    assert error.value.type is commands.BucketType.user
+    assert _admit(controller, _ctx(user_id=6))
+    assert controller.stats["throttled"] == 1 and controller.stats["admitted"] == 4
+
+
+def test_tokens_taken_only_if_every_scope_allows():
+    controller = AdmissionController(_bot(), {"user": (10, 60), "guild": (2, 60)})
+
+    _admit(controller, _ctx(user_id=5))
+    _admit(controller, _ctx(user_id=6))
+    with pytest.raises(commands.CommandOnCooldown):
+        _admit(controller, _ctx(user_id=5))
+
+    # Отклонённая по серверу команда не списала жетон пользователя
+    user_bucket = controller._buckets[("user", 5)]
+    assert user_bucket.tokens == pytest.approx(9, abs=0.01)
+
+
+def test_rename_cost_follows_voice_channel_and_is_capped():
+    controller = AdmissionController(_bot(), {"user": (5, 60)})
+
+    assert controller.command_cost(_ctx(voice_members=12), "number") == 13
+    assert controller.command_cost(_ctx(), "export") == 10
+    # Команда дороже корзины допускается с полной корзиной
+    assert _admit(controller, _ctx(voice_members=12), "number")
+    with pytest.raises(commands.CommandOnCooldown):
+        _admit(controller, _ctx())
+
+
+def test_overload_sheds_expensive_commands_only():
+    controller = AdmissionController(_bot(), {}, max_rename_backlog=5)
+
+    with controller.rename_batch(10) as batch:
+        with pytest.raises(BotOverloaded):
+            _admit(controller, _ctx(), "export")
+        assert _admit(controller, _ctx(), "ping")
+        for _ in range(6):
+            batch.done()
+        assert controller.overload_reason() is None
+
+    assert controller.rename_backlog == 0
+    assert controller.stats["shed"] == 1
+
+
+def test_global_admins_and_disabled_controller_not_limited():
+    controller = AdmissionController(_bot(), {"user": (1, 60)})
+    for _ in range(5):
+        _admit(controller, _ctx(user_id=ADMIN_ID))
+
+    disabled = AdmissionController(_bot(), {"user": (1, 60)}, enabled=False)
+    for _ in range(5):
+        _admit(disabled, _ctx())
+
+    assert controller.stats["throttled"] == 0 and disabled.stats["throttled"] == 0
+
+
+def test_help_is_not_charged(make_config):
+    bot = NumericBot(make_config())
+    controller = AdmissionController(bot, {"user": (1, 60)})
+    help_ctx = _ctx(command=bot.get_command("help"))
+
+    for _ in range(5):
+        _admit(controller, help_ctx)
+    assert _admit(controller, _ctx())
+    with pytest.raises(commands.CommandOnCooldown):
+        _admit(controller, _ctx())
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Резервные копии SQLite
+"""
+
+import asyncio
+import gzip
+import os
+import sqlite3
+import time
+
+import pytest
+
+from src.backup import SQLiteBackup
+
+
+def _make_db(path, corrupt=False):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE items (item_id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("CREATE INDEX idx_items_name ON items(name)")
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [(f"item {i}",) for i in range(100)])
+    conn.commit()
+    if corrupt:
+        # Страницы индекса остаются в файле без записи в схеме - integrity_check это видит
+        conn.execute("PRAGMA writable_schema=ON")
+        conn.execute("DELETE FROM sqlite_master WHERE name = 'idx_items_name'")
+        conn.commit()
+    conn.close()
+    return path
+
+
+def _old_snapshot(backup_dir, stem, stamp, hours_ago):
+    path = backup_dir / f"{stem}_{stamp}.db.gz"
+    path.write_bytes(b"")
+    mtime = time.time() - hours_ago * 3600
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_backup_is_readable_copy(tmp_path):
+    source = _make_db(tmp_path / "bot.db")
+    backup = SQLiteBackup(tmp_path / "backups")
+
+    created = asyncio.run(backup.run([source]))
+
+    assert len(created) == 1 and created[0].suffix == ".gz"
+    restored = tmp_path / "restored.db"
+    with gzip.open(created[0], 'rb') as f_in:
+        restored.write_bytes(f_in.read())
+    conn = sqlite3.connect(restored)
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 100
+    conn.close()
+    assert not list((tmp_path / "backups").glob("*.tmp"))
+
+
+def test_rotation_keeps_latest(tmp_path):
+    source = _make_db(tmp_path / "bot.db")
+    backup_dir = tmp_path / "backups"
+    backup_dir.mkdir()
+    old = [
+        _old_snapshot(backup_dir, "bot", f"2020010{day}_000000", 48)
+        for day in range(1, 5)
+    ]
+    other = _old_snapshot(backup_dir, "other", "20200101_000000", 48)
+
+    created = asyncio.run(SQLiteBackup(backup_dir, keep=2).run([source]))
+
+    remaining = sorted(path.name for path in backup_dir.glob("bot_*"))
+    assert remaining == sorted([old[-1].name, created[0].name])
+    assert other.exists()
+
+
+def test_min_age_skips_fresh_snapshot(tmp_path):
+    source = _make_db(tmp_path / "bot.db")
+    backup_dir = tmp_path / "backups"
+    backup_dir.mkdir()
+    fresh = _old_snapshot(backup_dir, "bot", "20990101_000000", 1)
+    backup = SQLiteBackup(backup_dir)
+
+    assert asyncio.run(backup.run([source], min_age_hours=6)) == []
+
+    os.utime(fresh, (time.time() - 7 * 3600,) * 2)
+    assert len(asyncio.run(backup.run([source], min_age_hours=6))) == 1
+
+
+def test_integrity_failure_leaves_no_snapshot(tmp_path):
+    source = _make_db(tmp_path / "bot.db", corrupt=True)
+    backup_dir = tmp_path / "backups"
+
+    with pytest.raises(sqlite3.DatabaseError, match="integrity_check"):
+        asyncio.run(SQLiteBackup(backup_dir).run([source]))
+
+    assert list(backup_dir.iterdir()) == []
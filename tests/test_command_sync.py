@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Синхронизация slash-команд по хэшу дерева
+"""
+
+import asyncio
+
+import discord
+
+from src.bot import COMMAND_TREE_META_KEY, NumericBot
+from src.storage.memory import MemoryStorage
+
+
+async def _ping(interaction: discord.Interaction):
+    pass
+
+
+async def _pong(interaction: discord.Interaction):
+    pass
+
+
+def _bot(config):
+    bot = NumericBot(config)
+    bot.db = MemoryStorage()
+    bot.synced = 0
+
+    async def sync():
+        bot.synced += 1
+        return bot.tree.get_commands()
+
+    bot.tree.sync = sync
+    bot.tree.add_command(discord.app_commands.Command(name="ping", description="Проверка", callback=_ping))
+    return bot
+
+
+def test_sync_only_when_tree_changes(make_config):
+    async def scenario():
+        bot = _bot(make_config())
+        await bot.db.initialize()
+
+        await bot.sync_commands()
+        stored = await bot.db.get_meta(COMMAND_TREE_META_KEY)
+        await bot.sync_commands()
+        unchanged = bot.synced
+
+        bot.tree.add_command(discord.app_commands.Command(name="pong", description="Ответ", callback=_pong))
+        await bot.sync_commands()
+        return stored, unchanged, bot.synced, await bot.db.get_meta(COMMAND_TREE_META_KEY)
+
+    stored, unchanged, synced, changed = asyncio.run(scenario())
+
+    assert unchanged == 1
+    assert synced == 2
+    assert stored is not None and changed != stored
+
+
+def test_force_sync_and_failed_sync_keeps_old_hash(make_config):
+    async def scenario():
+        bot = _bot(make_config())
+        await bot.db.initialize()
+        await bot.db.set_meta(COMMAND_TREE_META_KEY, "старый")
+
+        await bot.sync_commands()
+        forced_hash = bot.command_tree_hash()
+        await bot.sync_commands(force=True)
+        after_force = bot.synced
+
+        async def fail():
+            raise discord.DiscordException("нет ответа")
+
+        bot.tree.sync = fail
+        bot.tree.add_command(discord.app_commands.Command(name="pong", description="Ответ", callback=_pong))
+        await bot.sync_commands()
+        return after_force, forced_hash, await bot.db.get_meta(COMMAND_TREE_META_KEY)
+
+    after_force, forced_hash, stored = asyncio.run(scenario())
+
+    assert after_force == 2
+    # Хэш сохраняется только после успешной синхронизации
+    assert stored == forced_hash
+
+
+def test_hash_is_stable_across_registration_order(make_config):
+    first = _bot(make_config())
+    first.tree.add_command(discord.app_commands.Command(name="pong", description="Ответ", callback=_pong))
+
+    second = _bot(make_config())
+    second.tree.remove_command("ping")
+    second.tree.add_command(discord.app_commands.Command(name="pong", description="Ответ", callback=_pong))
+    second.tree.add_command(discord.app_commands.Command(name="ping", description="Проверка", callback=_ping))
+
+    assert first.command_tree_hash() == second.command_tree_hash()
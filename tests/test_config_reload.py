@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Перезагрузка config.json без перезапуска
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.config import HOT_RELOAD_KEYS
+from src.utils.config_watcher import ConfigWatcher
+
+
+def _update(config, **values):
+    data = json.loads(config.config_path.read_text(encoding='utf-8'))
+    data.update(values)
+    config.config_path.write_text(json.dumps(data), encoding='utf-8')
+
+
+def test_hot_keys_applied_others_need_restart(make_config):
+    config = make_config(global_admins=[1])
+    snapshot = config.snapshot
+
+    _update(config, global_admins=[1, 2], number_formats=["^\\d+\\)\\s*"], prefix="?", backup_keep=3)
+    changes = config.reload()
+
+    assert sorted(changes["applied"]) == ["global_admins", "number_formats"]
+    assert sorted(changes["restart_required"]) == ["backup_keep", "prefix"]
+    assert set(changes["applied"]) <= set(HOT_RELOAD_KEYS)
+    assert config.global_admins == frozenset({1, 2})
+    assert config.number_patterns[0].match("12) Имя")
+    # Остальное - до перезапуска, прежний снимок не изменён
+    assert (config.prefix, config.backup_keep) == ("!", 7)
+    assert snapshot.global_admins == frozenset({1})
+
+
+def test_unchanged_file_applies_nothing(make_config):
+    config = make_config()
+    snapshot = config.snapshot
+
+    assert config.reload() == {"applied": [], "restart_required": []}
+    assert config.snapshot is snapshot
+
+
+@pytest.mark.parametrize("content", [
+    "{не json",
+    json.dumps({"guild_state_max": "много", "global_admins": [9]}),
+])
+def test_broken_file_keeps_current_snapshot(make_config, content):
+    config = make_config(global_admins=[1])
+    snapshot = config.snapshot
+    config.config_path.write_text(content, encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        config.reload()
+
+    assert config.snapshot is snapshot
+
+
+def test_missing_file_is_an_error(make_config):
+    config = make_config()
+    config.config_path.unlink()
+
+    with pytest.raises(ValueError, match="не найден"):
+        config.reload()
+
+
+def test_watcher_counts_failures(make_config):
+    config = make_config()
+    watcher = ConfigWatcher(SimpleNamespace(config=config))
+
+    async def scenario():
+        valid = config.config_path.read_text(encoding='utf-8')
+        config.config_path.write_text("{", encoding='utf-8')
+        with pytest.raises(ValueError):
+            await watcher.reload()
+        config.config_path.write_text(valid, encoding='utf-8')
+        _update(config, default_language="en")
+        return await watcher.reload()
+
+    changes = asyncio.run(scenario())
+
+    assert "default_language" in changes["applied"]
+    assert (watcher.failures, watcher.reloads) == (1, 1)
+    assert config.default_language == "en"
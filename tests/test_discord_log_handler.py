@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Уведомления об ошибках в канал Discord
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from src.utils.logger import DiscordLogHandler
+
+CHANNEL_ID = 42
+
+
+class FakeChannel:
+    def __init__(self):
+        self.embeds = []
+
+    async def send(self, embed):
+        self.embeds.append(embed)
+
+
+def _handler(max_groups=50):
+    channel = FakeChannel()
+    bot = SimpleNamespace(get_channel=lambda channel_id: channel if channel_id == CHANNEL_ID else None)
+    return DiscordLogHandler(bot, CHANNEL_ID, max_groups=max_groups), channel
+
+
+def _record(message, line=10, level=logging.ERROR, name="src.cogs.numbering"):
+    return logging.LogRecord(name, level, "numbering.py", line, message, None, None, func="number")
+
+
+def test_same_place_is_grouped_with_latest_message():
+    handler, channel = _handler()
+    for user in range(3):
+        handler.handle(_record(f"Не удалось переименовать {user}"))
+    handler.handle(_record("Сбой базы", line=20, level=logging.CRITICAL))
+
+    asyncio.run(handler.flush_to_discord())
+
+    [embed] = channel.embeds
+    assert embed.title == "🚨 CRITICAL: записей 4"
+    first = embed.fields[0]
+    assert first.name == "src.cogs.numbering:10 (number) ×3"
+    assert "Не удалось переименовать 2" in first.value
+    assert embed.footer.text is None
+
+
+def test_overflow_drops_oldest_groups_and_reports_count():
+    handler, channel = _handler(max_groups=2)
+    handler.handle(_record("первая", line=1))
+    handler.handle(_record("первая", line=1))
+    handler.handle(_record("вторая", line=2))
+    handler.handle(_record("третья", line=3))
+
+    asyncio.run(handler.flush_to_discord())
+    asyncio.run(handler.flush_to_discord())
+
+    [embed] = channel.embeds
+    assert embed.title == "❌ ERROR: записей 4"
+    assert [field.name.split(":")[1].split()[0] for field in embed.fields] == ["2", "3"]
+    assert embed.footer.text == "потеряно при переполнении буфера: 2"
+
+
+def test_many_groups_are_summarised_in_footer():
+    handler, channel = _handler()
+    for line in range(DiscordLogHandler.MAX_FIELDS + 2):
+        handler.handle(_record("ошибка", line=line))
+
+    asyncio.run(handler.flush_to_discord())
+
+    [embed] = channel.embeds
+    assert len(embed.fields) == DiscordLogHandler.MAX_FIELDS
+    assert embed.footer.text == "ещё 2 видов ошибок (2 записей)"
+
+
+def test_missing_channel_keeps_nothing_and_sends_nothing():
+    handler, channel = _handler()
+    handler.channel_id = CHANNEL_ID + 1
+    handler.handle(_record("ошибка"))
+
+    asyncio.run(handler.flush_to_discord())
+
+    assert channel.embeds == []
+    assert not handler._groups
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Загрузка модулей бота по Config.features
+"""
+
+import asyncio
+import json
+
+from src.bot import NumericBot
+from src.storage.memory import MemoryStorage
+
+
+def _bot(config):
+    bot = NumericBot(config)
+    bot.db = MemoryStorage()
+    bot.synced = 0
+
+    async def sync():
+        bot.synced += 1
+        return []
+
+    bot.tree.sync = sync
+    return bot
+
+
+def test_disabled_features_are_not_loaded(make_config):
+    async def scenario():
+        bot = _bot(make_config(features={"admin_commands": False, "maintenance": False}))
+        async with bot:
+            await bot.load_extensions()
+            return sorted(bot.extensions), sorted(bot.cogs)
+
+    extensions, cogs = asyncio.run(scenario())
+
+    assert extensions == ["src.cogs.numbering", "src.cogs.settings"]
+    assert "Обслуживание" not in cogs
+
+
+def test_apply_features_after_reload(make_config):
+    async def scenario():
+        config = make_config(features={"admin_commands": False})
+        bot = _bot(config)
+        async with bot:
+            await bot.db.initialize()
+            await bot.load_extensions()
+            unchanged = await bot.apply_features()
+
+            values = json.loads(config.config_path.read_text(encoding='utf-8'))
+            values["features"] = {"admin_commands": True, "maintenance": False}
+            config.config_path.write_text(json.dumps(values), encoding='utf-8')
+            applied = config.reload()["applied"]
+
+            changed = await bot.apply_features()
+            await bot._sync_task
+            return unchanged, applied, sorted(changed), sorted(bot.extensions), bot.synced
+
+    unchanged, applied, changed, extensions, synced = asyncio.run(scenario())
+
+    assert unchanged == []
+    assert applied == ["features"]
+    assert changed == ["admin", "maintenance"]
+    assert extensions == ["src.cogs.admin", "src.cogs.numbering", "src.cogs.settings"]
+    # Набор команд изменился - синхронизация по хэшу
+    assert synced == 1
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Реестр состояний серверов
+"""
+
+import asyncio
+import time
+
+from src.utils.guild_state import GuildStateRegistry
+
+
+def test_overflow_evicts_least_recently_used():
+    registry = GuildStateRegistry(max_guilds=3)
+    for guild_id in (1, 2, 3):
+        registry.get(guild_id)
+    registry.peek(1)
+
+    registry.get(4)
+
+    assert registry.peek(2) is None
+    assert [guild_id for guild_id in (1, 3, 4) if registry.peek(guild_id)] == [1, 3, 4]
+    assert registry.footprint()["evicted"] == 1
+
+
+def test_pinned_states_survive_overflow_and_ttl():
+    async def scenario():
+        registry = GuildStateRegistry(max_guilds=2, idle_ttl=60)
+        registry.get(1).session_id = 10
+        locked = registry.get(2)
+        async with locked.lock:
+            # Вытеснять можно только новую запись - остальные заняты
+            registry.get(3)
+            in_memory = sorted(registry._states)
+            evicted_while_locked = registry.evict_idle(now=time.monotonic() + 3600)
+        return registry, in_memory, evicted_while_locked
+
+    registry, in_memory, evicted_while_locked = asyncio.run(scenario())
+
+    assert in_memory == [1, 2] and evicted_while_locked == 0
+    assert registry.evict_idle(now=time.monotonic() + 3600) == 1
+    assert registry.active_sessions() == {1: 10} and len(registry) == 1
+
+
+def test_idle_ttl_keeps_recent_entries():
+    registry = GuildStateRegistry(idle_ttl=60)
+    for guild_id in (1, 2, 3):
+        registry.get(guild_id)
+    now = time.monotonic()
+    registry.get(1).last_used = now - 120
+    registry.get(2).last_used = now - 120
+    # Порядок реестра - по последнему обращению
+    registry._states.move_to_end(3)
+
+    assert registry.evict_idle(now=now) == 2
+    assert registry.peek(3) is not None and len(registry) == 1
+
+
+def test_forget_and_footprint():
+    registry = GuildStateRegistry()
+    registry.get(1).session_id = 5
+    registry.get(2).lock
+
+    footprint = registry.footprint()
+    assert (footprint["guilds"], footprint["sessions"], footprint["locks"]) == (2, 1, 1)
+    assert footprint["bytes"] > 0
+
+    registry.forget(1)
+    assert registry.active_sessions() == {}
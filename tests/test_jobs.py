@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Учёт длительных команд при остановке
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.utils.jobs import JobTracker
+
+CTX = SimpleNamespace(guild=SimpleNamespace(id=20), author=SimpleNamespace(id=5), channel=None)
+
+
+async def _command(jobs, steps, delay, finished):
+    with jobs.track("number", CTX, total=steps) as job:
+        for _ in range(steps):
+            await asyncio.sleep(delay)
+            job.advance()
+    finished.append(steps)
+
+
+def test_drain_waits_for_finishing_commands():
+    async def scenario():
+        jobs = JobTracker()
+        finished = []
+        task = asyncio.create_task(_command(jobs, 3, 0.01, finished))
+        await asyncio.sleep(0)
+        jobs.stop_accepting()
+        interrupted = await jobs.drain(timeout=1)
+        await task
+        return jobs, interrupted, finished
+
+    jobs, interrupted, finished = asyncio.run(scenario())
+
+    assert interrupted == [] and finished == [3]
+    assert not jobs.accepting and len(jobs) == 0
+
+
+def test_drain_timeout_cancels_and_reports_progress():
+    async def scenario():
+        jobs = JobTracker()
+        finished = []
+        fast = asyncio.create_task(_command(jobs, 1, 0.01, finished))
+        slow = asyncio.create_task(_command(jobs, 100, 0.02, finished))
+        await asyncio.sleep(0)
+        interrupted = await jobs.drain(timeout=0.1)
+        await asyncio.gather(fast, slow, return_exceptions=True)
+        return jobs, interrupted, finished, slow
+
+    jobs, interrupted, finished, slow = asyncio.run(scenario())
+
+    assert finished == [1]
+    assert [job.name for job in interrupted] == ["number"]
+    done, total = map(int, interrupted[0].progress.split("/"))
+    assert total == 100 and 0 < done < 100
+    assert slow.cancelled() and len(jobs) == 0
+
+
+def test_drain_without_jobs_returns_immediately():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        interrupted = await JobTracker().drain(timeout=5)
+        return interrupted, loop.time() - started
+
+    interrupted, elapsed = asyncio.run(scenario())
+    assert interrupted == [] and elapsed < 0.1
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Архивация журнала действий
+"""
+
+import asyncio
+import gzip
+from datetime import datetime, timedelta
+
+from src.log_archive import ARCHIVE_PATTERN, LogArchiver, iter_archived_logs
+from src.storage.memory import MemoryStorage
+
+
+async def _old_logs(storage, guild_id, days_ago, count):
+    timestamp = (datetime.utcnow() - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S')
+    records = [
+        ("action_log", {"user_id": 1001, "action": "number", "details": f"{guild_id}:{number}", "timestamp": timestamp})
+        for number in range(count)
+    ]
+
+    async def batches():
+        yield records
+
+    await storage.import_guild_data(guild_id, "Сервер", batches())
+    return timestamp[:7]
+
+
+def _log(log_id, guild_id=1):
+    return {"log_id": log_id, "guild_id": guild_id, "user_id": 1001, "action": "number",
+            "details": "", "timestamp": "2025-01-15 10:00:00"}
+
+
+def test_run_moves_expired_logs(tmp_path):
+    async def scenario():
+        storage = MemoryStorage()
+        await storage.initialize()
+        month = await _old_logs(storage, 1, days_ago=100, count=7)
+        await _old_logs(storage, 2, days_ago=100, count=3)
+        await storage.log_action(1, 1001, "number", "свежая")
+
+        archiver = LogArchiver(storage, tmp_path, retention_days=30, batch_size=4, pause=0)
+        assert await archiver.run() == 10
+
+        remaining = (await storage.get_logs_page(1))["logs"]
+        assert [log["details"] for log in remaining] == ["свежая"]
+        assert (tmp_path / ARCHIVE_PATTERN.format(month=month)).exists()
+
+        archived = list(iter_archived_logs(tmp_path, guild_id=1, month=month))
+        assert sorted(log["details"] for log in archived) == sorted(f"1:{number}" for number in range(7))
+        assert len(list(iter_archived_logs(tmp_path))) == 10
+
+    asyncio.run(scenario())
+
+
+def test_retention_disabled(tmp_path):
+    async def scenario():
+        storage = MemoryStorage()
+        await storage.initialize()
+        await _old_logs(storage, 1, days_ago=100, count=2)
+        assert await LogArchiver(storage, tmp_path, retention_days=0).run() == 0
+        assert len((await storage.get_logs_page(1))["logs"]) == 2
+
+    asyncio.run(scenario())
+
+
+def test_repeated_batch_is_skipped(tmp_path):
+    archiver = LogArchiver(None, tmp_path, retention_days=30)
+    batch = [_log(log_id) for log_id in range(1, 6)]
+    # Сбой между записью порции и удалением: та же порция дописана ещё раз
+    archiver._append_to_archive(batch)
+    archiver._append_to_archive(batch)
+    archiver._append_to_archive([_log(6), _log(7, guild_id=2)])
+
+    assert [log["log_id"] for log in iter_archived_logs(tmp_path)] == [1, 2, 3, 4, 5, 6, 7]
+    assert [log["log_id"] for log in iter_archived_logs(tmp_path, guild_id=2)] == [7]
+
+
+def test_dedup_window_is_bounded(tmp_path):
+    path = tmp_path / ARCHIVE_PATTERN.format(month="2025-01")
+    # Повтор дальше окна не отсеивается - память ограничена окном
+    ids = [1, 2, 1, 3, 4, 5, 1]
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for log_id in ids:
+            f.write(f'{{"log_id": {log_id}, "guild_id": 1, "timestamp": "2025-01-15 10:00:00"}}\n')
+
+    assert [log["log_id"] for log in iter_archived_logs(tmp_path, dedup_window=3)] == [1, 2, 3, 4, 5, 1]
+    assert [log["log_id"] for log in iter_archived_logs(tmp_path, dedup_window=10)] == [1, 2, 3, 4, 5]
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Ротация файла лога в полночь и по размеру
+"""
+
+import gzip
+import logging
+import os
+import time
+from datetime import date, timedelta
+
+from src.utils.logger import DailyRotatingFileHandler
+
+
+def _record(message):
+    return logging.LogRecord("tests", logging.INFO, __file__, 1, message, None, None)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "фоновое обслуживание логов не завершилось"
+        time.sleep(0.01)
+
+
+def test_size_rotation_numbers_archives_of_the_day(tmp_path):
+    handler = DailyRotatingFileHandler(tmp_path, "bot", max_bytes=100, retention_days=30)
+    try:
+        for index in range(6):
+            handler.emit(_record(f"запись {index} " + "x" * 60))
+    finally:
+        handler.close()
+
+    today = date.today().isoformat()
+    expected = {f"bot_{today}.log.gz", f"bot_{today}.1.log.gz"}
+    _wait_for(lambda: expected <= {path.name for path in tmp_path.iterdir()})
+
+    with gzip.open(tmp_path / f"bot_{today}.log.gz", 'rt', encoding='utf-8') as archive:
+        assert archive.read().startswith("запись 0")
+    assert (tmp_path / "bot.log").stat().st_size <= 100
+
+
+def test_midnight_rotation_uses_day_of_last_write(tmp_path):
+    yesterday = date.today() - timedelta(days=1)
+    handler = DailyRotatingFileHandler(tmp_path, "bot", max_bytes=0, retention_days=30)
+    try:
+        handler.emit(_record("вчерашняя запись"))
+        handler.day = yesterday
+        handler.emit(_record("сегодняшняя запись"))
+    finally:
+        handler.close()
+
+    archive = tmp_path / f"bot_{yesterday.isoformat()}.log.gz"
+    _wait_for(archive.exists)
+    with gzip.open(archive, 'rt', encoding='utf-8') as f:
+        assert f.read().strip() == "вчерашняя запись"
+    assert (tmp_path / "bot.log").read_text(encoding='utf-8').strip() == "сегодняшняя запись"
+
+
+def test_expired_archives_removed_on_start(tmp_path):
+    expired = tmp_path / "bot_2020-01-01.log.gz"
+    fresh = tmp_path / "bot_2099-01-01.log.gz"
+    other = tmp_path / "other_2020-01-01.log.gz"
+    for path in (expired, fresh, other):
+        path.write_bytes(b"")
+    old = time.time() - 40 * 86400
+    os.utime(expired, (old, old))
+    os.utime(other, (old, old))
+
+    DailyRotatingFileHandler(tmp_path, "bot", max_bytes=0, retention_days=30).close()
+
+    _wait_for(lambda: not expired.exists())
+    assert fresh.exists() and other.exists()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Запись логов через очередь и фоновый поток
+"""
+
+import logging
+import threading
+
+from src.utils.logger import attach_log_handler, detach_log_handler, setup_logger
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((threading.current_thread(), self.format(record)))
+
+
+def test_records_are_formatted_in_background_thread():
+    logger = setup_logger("tests.queue")
+    handler = CollectingHandler()
+    attach_log_handler(handler)
+    try:
+        logger.info("первая %s", "запись")
+        logger.warning("вторая запись")
+    finally:
+        # Отключение дописывает очередь: записи уже у обработчика
+        detach_log_handler(handler)
+
+    assert [message for _, message in handler.records] == ["первая запись", "вторая запись"]
+    assert all(thread is not threading.main_thread() for thread, _ in handler.records)
+
+
+def test_detached_handler_gets_no_new_records():
+    logger = setup_logger("tests.queue")
+    handler = CollectingHandler()
+    attach_log_handler(handler)
+    detach_log_handler(handler)
+    detach_log_handler(handler)
+
+    logger.info("после отключения")
+    # Перезапуск потока дописывает очередь
+    other = CollectingHandler()
+    attach_log_handler(other)
+    detach_log_handler(other)
+
+    assert handler.records == []
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Слияние результатов разделов PartitionedDatabase
+"""
+
+import asyncio
+
+from src.storage.partitioned import PartitionedDatabase
+
+# Момент ухода каждого сервера; серверы расходятся по разным разделам
+LEFT_AT = {
+    1: "2024-01-05 00:00:00",
+    2: "2024-01-01 00:00:00",
+    3: "2024-01-03 00:00:00",
+    4: "2024-01-02 00:00:00",
+    5: "2024-01-04 00:00:00",
+    6: "2024-02-01 00:00:00",
+    7: None,
+}
+
+
+async def _departed(path, left_before, limit):
+    storage = PartitionedDatabase(path, 3)
+    await storage.initialize()
+    try:
+        for guild_id, left_at in LEFT_AT.items():
+            await storage.ensure_guild_exists(guild_id, f"Сервер {guild_id}")
+            for partition in storage.partitions:
+                await partition.connection.execute(
+                    "UPDATE guilds SET left_at = ? WHERE guild_id = ?", (left_at, guild_id)
+                )
+                await partition.connection.commit()
+        return await storage.get_departed_guilds(left_before, limit)
+    finally:
+        await storage.close()
+
+
+def test_departed_guilds_merged_by_left_at(tmp_path):
+    departed = asyncio.run(_departed(tmp_path / "bot.db", "2024-01-31 00:00:00", 100))
+
+    assert departed == [2, 4, 3, 5, 1]
+
+
+def test_departed_guilds_limit_applies_after_merge(tmp_path):
+    departed = asyncio.run(_departed(tmp_path / "bot.db", "2024-12-31 00:00:00", 3))
+
+    assert departed == [2, 4, 3]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Периоды рейтингов ведущих
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from discord.ext import commands
+
+from src.storage.base import StorageBackend
+from src.utils.periods import PERIOD_DAYS, PeriodConverter, parse_period
+
+
+@pytest.mark.parametrize("value, period", [
+    ("day", "day"), ("D", "day"), ("сегодня", "day"),
+    ("week", "week"), ("Неделю", "week"),
+    ("month", "month"), ("m", "month"),
+    ("all", None), ("всё", None), (None, None),
+])
+def test_parse_period_aliases(value, period):
+    assert parse_period(value) == period
+
+
+def test_parse_period_unknown():
+    with pytest.raises(ValueError):
+        parse_period("year")
+
+
+def test_converter_reports_bad_argument():
+    converter = PeriodConverter()
+    assert asyncio.run(converter.convert(None, "Week")) == "week"
+    with pytest.raises(commands.BadArgument):
+        asyncio.run(converter.convert(None, "year"))
+
+
+@pytest.mark.parametrize("period", sorted(PERIOD_DAYS))
+def test_period_start_includes_today(period):
+    today = datetime.utcnow().date()
+    start = StorageBackend._period_start(period)
+    assert start == (today - timedelta(days=PERIOD_DAYS[period] - 1)).isoformat()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Кэш префиксов серверов
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.storage.memory import MemoryStorage
+from src.utils.prefixes import PrefixCache
+
+GUILD_ID = 100
+
+
+class CountingStorage(MemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.settings_reads = 0
+
+    async def get_guild_settings(self, guild_id):
+        self.settings_reads += 1
+        return await super().get_guild_settings(guild_id)
+
+
+async def _cache():
+    storage = CountingStorage()
+    await storage.initialize()
+    await storage.ensure_guild_exists(GUILD_ID, "Сервер")
+    return PrefixCache(SimpleNamespace(db=storage), "!"), storage
+
+
+def _message(content, guild_id=GUILD_ID, bot=False):
+    return SimpleNamespace(
+        content=content,
+        author=SimpleNamespace(bot=bot),
+        guild=SimpleNamespace(id=guild_id) if guild_id else None
+    )
+
+
+def test_prefix_loaded_once_and_updated_by_set():
+    async def scenario():
+        prefixes, storage = await _cache()
+        first = await prefixes.get(GUILD_ID)
+        await prefixes.get(GUILD_ID)
+        reads = storage.settings_reads
+
+        custom = await prefixes.set(GUILD_ID, "?")
+        stored = (await storage.get_guild_settings(GUILD_ID)).get("prefix")
+        reset = await prefixes.set(GUILD_ID, "!")
+        return first, reads, custom, stored, reset, await storage.get_guild_settings(GUILD_ID)
+
+    first, reads, custom, stored, reset, settings = asyncio.run(scenario())
+
+    assert (first, reads) == ("!", 1)
+    assert (custom, stored) == ("?", "?")
+    # Префикс по умолчанию не хранится в настройках
+    assert reset == "!" and "prefix" not in settings
+
+
+def test_forget_reloads_from_storage():
+    async def scenario():
+        prefixes, storage = await _cache()
+        await prefixes.get(GUILD_ID)
+        await storage.update_guild_settings(GUILD_ID, {"prefix": "$"})
+        stale = await prefixes.get(GUILD_ID)
+        prefixes.forget(GUILD_ID)
+        return stale, prefixes.cached(GUILD_ID), await prefixes.get(GUILD_ID)
+
+    assert asyncio.run(scenario()) == ("!", None, "$")
+
+
+def test_is_command_candidate():
+    async def scenario():
+        prefixes, storage = await _cache()
+        await prefixes.set(GUILD_ID, "??")
+        checks = [
+            await prefixes.is_command_candidate(_message("??help")),
+            await prefixes.is_command_candidate(_message("?help")),
+            await prefixes.is_command_candidate(_message("!help")),
+            await prefixes.is_command_candidate(_message("")),
+            await prefixes.is_command_candidate(_message("??help", bot=True)),
+            await prefixes.is_command_candidate(_message("!help", guild_id=None)),
+        ]
+        return checks, storage.settings_reads
+
+    checks, reads = asyncio.run(scenario())
+
+    assert checks == [True, False, False, False, False, True]
+    # Проверки - только по памяти
+    assert reads == 1
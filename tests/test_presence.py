@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Объединение обновлений статуса
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.utils.presence import PresenceManager
+
+
+class FakeBot:
+    def __init__(self, guilds=3):
+        self.guilds = [object()] * guilds
+        self.config = SimpleNamespace(prefix="!")
+        self.published = []
+
+    async def change_presence(self, activity):
+        self.published.append(activity.name)
+
+
+def test_burst_is_coalesced_into_one_update():
+    async def scenario():
+        bot = FakeBot()
+        presence = PresenceManager(bot, interval=0.05)
+        for count in range(4, 9):
+            bot.guilds = [object()] * count
+            presence.request_update()
+        await presence._task
+        return bot.published, presence.stats
+
+    published, stats = asyncio.run(scenario())
+
+    # Публикуется актуальное на момент отправки число серверов
+    assert published == ["8 серверов | !help"]
+    assert stats == {"requested": 5, "published": 1, "coalesced": 4, "skipped": 0}
+
+
+def test_request_during_interval_waits_and_unchanged_name_is_skipped():
+    async def scenario():
+        bot = FakeBot()
+        presence = PresenceManager(bot, interval=0.1)
+        presence.request_update()
+        await presence._task
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        bot.guilds.append(object())
+        presence.request_update()
+        await presence._task
+        waited = loop.time() - started
+
+        presence.request_update()
+        await presence._task
+        presence.request_update(force=True)
+        await presence._task
+        return bot.published, presence.stats, waited
+
+    published, stats, waited = asyncio.run(scenario())
+
+    assert waited >= 0.05
+    assert published == ["3 серверов | !help", "4 серверов | !help", "4 серверов | !help"]
+    assert stats["skipped"] == 1 and stats["published"] == 3
+
+
+def test_failed_update_is_not_remembered():
+    async def scenario():
+        bot = FakeBot()
+
+        async def fail(activity):
+            raise RuntimeError("шлюз недоступен")
+
+        bot.change_presence = fail
+        presence = PresenceManager(bot, interval=0)
+        presence.request_update()
+        await presence._task
+
+        del bot.change_presence
+        presence.request_update()
+        await presence._task
+        return bot.published, presence.stats
+
+    published, stats = asyncio.run(scenario())
+
+    assert published == ["3 серверов | !help"]
+    assert stats["published"] == 1
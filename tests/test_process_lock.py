@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Межпроцессная блокировка на файле
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from src.utils import process_lock
+from src.utils.process_lock import ProcessLock
+
+pytestmark = pytest.mark.skipif(not process_lock.HAS_FCNTL, reason="нет fcntl")
+
+
+def _open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_second_holder_is_refused(tmp_path):
+    async def scenario():
+        path = tmp_path / "job.lock"
+        async with ProcessLock(path) as first:
+            async with ProcessLock(path) as second:
+                pass
+        async with ProcessLock(path) as again:
+            pass
+        return first, second, again
+
+    assert asyncio.run(scenario()) == (True, False, True)
+
+
+def test_waiter_acquires_after_release(tmp_path):
+    async def scenario():
+        path = tmp_path / "job.lock"
+        order = []
+
+        async def waiter():
+            async with ProcessLock(path, wait=True, poll_interval=0.01) as acquired:
+                order.append(("waiter", acquired))
+
+        async with ProcessLock(path):
+            task = asyncio.create_task(waiter())
+            await asyncio.sleep(0.05)
+            order.append(("holder", True))
+        await task
+        return order
+
+    assert asyncio.run(scenario()) == [("holder", True), ("waiter", True)]
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="нет /proc")
+def test_cancelled_waiter_closes_descriptor(tmp_path):
+    async def scenario():
+        path = tmp_path / "job.lock"
+        async with ProcessLock(path):
+            before = _open_fds()
+            waiter = ProcessLock(path, wait=True, poll_interval=0.01)
+            task = asyncio.create_task(waiter.__aenter__())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return before, _open_fds()
+
+    before, after = asyncio.run(scenario())
+    assert after == before
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Перераспределение базы SQLite по разделам
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from src.storage.partitioned import PartitionedDatabase
+from src.storage.repartition import RepartitionError, repartition, verify
+
+
+async def _fill(storage):
+    await storage.initialize()
+    await storage.set_meta("command_tree_hash", "abc123")
+    for guild_id in range(1, 11):
+        await storage.ensure_guild_exists(guild_id, f"Сервер {guild_id}")
+        for user in range(3):
+            host_id = await storage.add_or_update_host(guild_id, 100 + user, f"Ведущий {user}")
+            for number in range(user + 1):
+                session_id = await storage.start_numbering_session(guild_id, 5, host_id, 3 + number)
+                await storage.end_numbering_session(session_id)
+        await storage.log_action(guild_id, 100, "number", "запись")
+    snapshot = {
+        guild_id: await storage.get_statistics(guild_id) for guild_id in range(1, 11)
+    }
+    await storage.close()
+    return snapshot
+
+
+async def _read(storage):
+    await storage.initialize()
+    try:
+        stats = {guild_id: await storage.get_statistics(guild_id) for guild_id in range(1, 11)}
+        return stats, await storage.get_meta("command_tree_hash")
+    finally:
+        await storage.close()
+
+
+def test_round_trip_keeps_statistics_and_meta(tmp_path):
+    expected = asyncio.run(_fill(PartitionedDatabase(tmp_path / "bot.db", 2)))
+
+    repartition(tmp_path / "bot.db", 2, 1, tmp_path / "merged.db")
+    repartition(tmp_path / "merged.db", 1, 4)
+
+    stats, tree_hash = asyncio.run(_read(PartitionedDatabase(tmp_path / "merged.db", 4)))
+    assert stats == expected
+    assert tree_hash == "abc123"
+
+
+def test_verify_detects_broken_host_reference(tmp_path):
+    asyncio.run(_fill(PartitionedDatabase(tmp_path / "bot.db", 2)))
+    targets = repartition(tmp_path / "bot.db", 2, 1, tmp_path / "merged.db")
+
+    conn = sqlite3.connect(targets[0])
+    conn.execute("UPDATE numbering_sessions SET host_id = host_id + 1 "
+                 "WHERE session_id = (SELECT MIN(session_id) FROM numbering_sessions)")
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(RepartitionError):
+        verify([tmp_path / "bot.p0.db", tmp_path / "bot.p1.db"], targets)
+
+
+def test_refuses_to_overwrite(tmp_path):
+    asyncio.run(_fill(PartitionedDatabase(tmp_path / "bot.db", 2)))
+    repartition(tmp_path / "bot.db", 2, 1, tmp_path / "merged.db")
+    with pytest.raises(FileExistsError):
+        repartition(tmp_path / "bot.db", 2, 1, tmp_path / "merged.db")
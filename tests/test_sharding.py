@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Автоматический шардинг и задержка по шардам
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.bot import NumericBot, ShardedNumericBot, create_bot
+from src.cogs.settings import SHARD_LIST_LIMIT, SettingsCog, format_latency
+from src.storage.memory import MemoryStorage
+
+# Сервер шарда 1 из 2 (shard_id = (guild_id >> 22) % shard_count)
+SHARD_0_GUILD = 2 << 22
+SHARD_1_GUILD = 3 << 22
+
+
+def test_create_bot_respects_auto_shard(make_config):
+    assert type(create_bot(make_config())) is NumericBot
+
+    bot = create_bot(make_config(auto_shard=True, shard_count=4, shard_ids=[0, 1]))
+    assert isinstance(bot, ShardedNumericBot)
+    assert (bot.shard_count, bot.shard_ids) == (4, [0, 1])
+    assert not bot.owns_all_shards
+
+    assert create_bot(make_config(auto_shard=True)).owns_all_shards
+
+
+def test_partial_shards_mark_only_own_guilds_left(make_config):
+    async def scenario():
+        bot = create_bot(make_config(auto_shard=True, shard_count=2, shard_ids=[1]))
+        bot.db = MemoryStorage()
+        await bot.db.initialize()
+        for guild_id in (SHARD_0_GUILD, SHARD_1_GUILD):
+            await bot.db.ensure_guild_exists(guild_id, f"Сервер {guild_id}")
+        bot._connection.user = SimpleNamespace(id=1)
+
+        # Процесс ещё не видит ни одного сервера
+        await bot.on_ready()
+        bot.presence.stop()
+        return await bot.db.get_departed_guilds("9999-12-31")
+
+    assert asyncio.run(scenario()) == [SHARD_1_GUILD]
+
+
+def test_shard_summary_marks_current_and_truncates():
+    latencies = [(shard_id, 0.05) for shard_id in range(SHARD_LIST_LIMIT + 3)]
+    latencies[2] = (2, float("inf"))
+    cog = SettingsCog(SimpleNamespace(shard_latencies=lambda: latencies))
+
+    lines = cog._shard_summary(current=1).splitlines()
+
+    assert len(lines) == SHARD_LIST_LIMIT + 1
+    assert lines[1] == "➡️ Шард 1: 50мс"
+    assert lines[2] == "▫️ Шард 2: —"
+    assert lines[-1] == "...и ещё 3"
+
+
+def test_format_latency():
+    assert format_latency(0.1234) == "123мс"
+    assert format_latency(float("nan")) == "—"
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+Общий контракт хранилищ
+
+Одни и те же сценарии выполняются для SQLite, SQLite с разделами, хранилища
+в памяти и PostgreSQL: команды бота не должны зависеть от выбранного
+DATABASE_URL. PostgreSQL - TEST_DATABASE_URL или временный локальный
+сервер (фикстура postgres_url в conftest.py).
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.database import Database
+from src.export import GuildExporter
+from src.restore import restore_export
+from src.storage.memory import MemoryStorage
+from src.storage.partitioned import PartitionedDatabase
+
+# Смещение ID сервера в соседний шард (шард = (guild_id >> 22) % shard_count)
+OTHER_SHARD = 1 << 22
+
+
+def _create_storage(request, tmp_path):
+    backend = request.param
+    if backend == "sqlite":
+        return Database(tmp_path / "bot.db")
+    if backend == "partitioned":
+        return PartitionedDatabase(tmp_path / "bot.db", 3)
+    if backend == "memory":
+        return MemoryStorage()
+
+    pytest.importorskip("asyncpg")
+    from src.storage.postgres import PostgresStorage
+    return PostgresStorage(request.getfixturevalue("postgres_url"), min_size=1, max_size=2)
+
+
+@pytest.fixture(params=["sqlite", "partitioned", "memory", "postgres"])
+def run(request, tmp_path):
+    """Выполнить сценарий scenario(storage, guild_id) на свежем хранилище"""
+    storage = _create_storage(request, tmp_path)
+
+    def runner(scenario):
+        async def main():
+            await storage.initialize()
+            # Случайные ID: база PostgreSQL может быть общей для запусков тестов.
+            # guild_id .. guild_id + 3 - шард 0 из 2, OTHER_SHARD + ... - шард 1
+            guild_id = random.randrange(10 ** 17 >> 23, 10 ** 18 >> 23) << 23
+            try:
+                await scenario(storage, guild_id)
+            finally:
+                for base in (guild_id, guild_id + OTHER_SHARD):
+                    for cleanup_id in range(base, base + 4):
+                        await storage.mark_guild_left(cleanup_id)
+                        while await storage.purge_guild_data(cleanup_id):
+                            pass
+                await storage.close()
+
+        asyncio.run(main())
+
+    return runner
+
+
+async def _run_sessions(storage, guild_id, sessions):
+    """Провести сессии [(user_id, nickname), ...], вернуть host_id по user_id"""
+    await storage.ensure_guild_exists(guild_id, "Тестовый сервер")
+    host_ids = {}
+    for user_id, nickname in sessions:
+        host_ids[user_id] = await storage.add_or_update_host(guild_id, user_id, nickname)
+        session_id = await storage.start_numbering_session(guild_id, 555, host_ids[user_id], 8)
+        await storage.end_numbering_session(session_id)
+    return host_ids
+
+
+async def _export_rows(storage, section, guild_id):
+    rows = []
+    async for chunk in storage.iter_export_rows(section, guild_id, chunk_size=2):
+        rows.extend(chunk)
+    return rows
+
+
+def test_host_upsert_keeps_id_and_updates_nickname(run):
+    async def scenario(storage, guild_id):
+        await storage.ensure_guild_exists(guild_id, "Тестовый сервер")
+        first = await storage.add_or_update_host(guild_id, 1001, "Ведущий")
+        second = await storage.add_or_update_host(guild_id, 1001, "Ведущий 2")
+        other = await storage.add_or_update_host(guild_id, 1002, "Другой")
+
+        assert first == second
+        assert other != first
+
+        hosts = {row["user_id"]: row for row in await _export_rows(storage, "hosts", guild_id)}
+        assert set(hosts) == {1001, 1002}
+        assert hosts[1001]["nickname"] == "Ведущий 2"
+
+    run(scenario)
+
+
+def test_session_start_and_end(run):
+    async def scenario(storage, guild_id):
+        await storage.ensure_guild_exists(guild_id, "Тестовый сервер")
+        host_id = await storage.add_or_update_host(guild_id, 1001, "Ведущий")
+        first = await storage.start_numbering_session(guild_id, 555, host_id, 8)
+        second = await storage.start_numbering_session(guild_id, 555, host_id, 3)
+        await storage.end_numbering_session(first)
+
+        assert first != second
+        sessions = await _export_rows(storage, "sessions", guild_id)
+        assert [row["participants_count"] for row in sessions] == [8, 3]
+        assert sessions[0]["ended_at"] is not None
+        assert sessions[1]["ended_at"] is None
+        assert all(row["host_user_id"] == 1001 for row in sessions)
+
+        hosts = await storage.get_active_hosts(guild_id)
+        assert [(row["user_id"], row["sessions_count"]) for row in hosts] == [(1001, 2)]
+
+    run(scenario)
+
+
+def test_statistics_all_time_and_period(run):
+    async def scenario(storage, guild_id):
+        await _run_sessions(storage, guild_id, [
+            (1001, "Первый"), (1002, "Второй"), (1001, "Первый"), (1001, "Первый")
+        ])
+
+        for period in (None, "day", "month"):
+            stats = await storage.get_statistics(guild_id, period)
+            assert stats["total_sessions"] == 4
+            assert stats["active_hosts"] == 2
+            assert [(row["user_id"], row["sessions_count"]) for row in stats["top_hosts"]] == [
+                (1001, 3), (1002, 1)
+            ]
+
+        empty = await storage.get_statistics(guild_id + 1)
+        assert empty["total_sessions"] == 0
+        assert empty["top_hosts"] == []
+
+    run(scenario)
+
+
+def test_logs_paging(run):
+    async def scenario(storage, guild_id):
+        await storage.ensure_guild_exists(guild_id, "Тестовый сервер")
+        for number in range(25):
+            await storage.log_action(guild_id, 1001, "number", f"запись {number}")
+        await storage.log_action(guild_id + 1, 1001, "number", "чужой сервер")
+
+        details, cursor = [], None
+        while True:
+            page = await storage.get_logs_page(guild_id, before_id=cursor, limit=10)
+            assert len(page["logs"]) <= 10
+            details.extend(log["details"] for log in page["logs"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        # От новых к старым, без пропусков и повторов
+        assert details == [f"запись {number}" for number in reversed(range(25))]
+
+        recent = await storage.get_recent_logs(guild_id, limit=3)
+        assert [log["details"] for log in recent] == ["запись 24", "запись 23", "запись 22"]
+
+    run(scenario)
+
+
+def test_export_import_round_trip(run):
+    async def scenario(storage, guild_id):
+        target_id = guild_id + 1
+        await _run_sessions(storage, guild_id, [(1001, "Первый"), (1002, "Второй"), (1001, "Первый")])
+        await storage.update_guild_settings(guild_id, {"number_format": "{number}. {nick}"})
+        for number in range(5):
+            await storage.log_action(guild_id, 1001, "number", f"запись {number}")
+
+        exporter = GuildExporter(storage, chunk_size=2)
+        export_file = await exporter.export([{"guild_id": guild_id, "guild_name": "Тестовый сервер"}])
+        try:
+            await restore_export(storage, export_file, target_guild_id=target_id, batch_size=3)
+            # Повторная загрузка того же файла ничего не дублирует
+            export_file.seek(0)
+            await restore_export(storage, export_file, target_guild_id=target_id, batch_size=3)
+            expected = await storage.get_statistics(guild_id)
+            assert await storage.get_statistics(target_id) == expected
+
+            export_file.seek(0)
+            await restore_export(storage, export_file, mode="replace", target_guild_id=target_id)
+            assert await storage.get_statistics(target_id) == expected
+        finally:
+            export_file.close()
+
+        assert (await storage.get_guild_settings(target_id)).get("number_format") == "{number}. {nick}"
+        logs = await storage.get_logs_page(target_id, limit=10)
+        assert [log["details"] for log in logs["logs"]] == [f"запись {number}" for number in reversed(range(5))]
+        sessions = await _export_rows(storage, "sessions", target_id)
+        assert [row["host_user_id"] for row in sessions] == [1001, 1002, 1001]
+
+    run(scenario)
+
+
+async def _batches(records, size=2, fail_after=None):
+    """Порции импорта [(тип, данные), ...]; fail_after - оборвать после N порций"""
+    for number, start in enumerate(range(0, len(records), size)):
+        if fail_after is not None and number >= fail_after:
+            raise RuntimeError("обрыв импорта")
+        yield records[start:start + size]
+
+
+IMPORT_RECORDS = [
+    ("host", {"user_id": 1001, "nickname": "Первый", "is_active": True}),
+    ("host", {"user_id": 1002, "nickname": "Второй", "is_active": True}),
+    ("session", {"channel_id": 1, "host_user_id": 1001, "participants_count": 5,
+                 "started_at": "2025-01-01 10:00:00", "ended_at": "2025-01-01 10:05:00"}),
+    # Две сессии в одну секунду в разных каналах
+    ("session", {"channel_id": 2, "host_user_id": 1002, "participants_count": 4,
+                 "started_at": "2025-01-01 11:00:00", "ended_at": None}),
+    ("session", {"channel_id": 3, "host_user_id": 1001, "participants_count": 3,
+                 "started_at": "2025-01-01 11:00:00", "ended_at": None}),
+    ("action_log", {"user_id": 1001, "action": "number", "details": "канал 1", "timestamp": "2025-01-01 10:00:00"}),
+    ("action_log", {"user_id": 1002, "action": "number", "details": "канал 2", "timestamp": "2025-01-01 11:00:00"}),
+    ("action_log", {"user_id": 1001, "action": "number", "details": "канал 3", "timestamp": "2025-01-01 11:00:00"}),
+]
+
+
+def test_import_merge_fills_gaps_by_natural_key(run):
+    async def scenario(storage, guild_id):
+        hosts = IMPORT_RECORDS[:2]
+        # Уже есть более поздние записи и одна из сессий той же секунды
+        partial = hosts + [IMPORT_RECORDS[4], IMPORT_RECORDS[7]]
+        await storage.import_guild_data(guild_id, "Сервер", _batches(partial))
+
+        for _ in range(2):
+            await storage.import_guild_data(guild_id, "Сервер", _batches(IMPORT_RECORDS))
+
+        sessions = await _export_rows(storage, "sessions", guild_id)
+        assert sorted((row["channel_id"], row["started_at"]) for row in sessions) == [
+            (1, "2025-01-01 10:00:00"), (2, "2025-01-01 11:00:00"), (3, "2025-01-01 11:00:00")
+        ]
+        logs = (await storage.get_logs_page(guild_id, limit=10))["logs"]
+        assert sorted(log["details"] for log in logs) == ["канал 1", "канал 2", "канал 3"]
+
+        stats = await storage.get_statistics(guild_id)
+        assert stats["total_sessions"] == 3
+        assert [(row["user_id"], row["sessions_count"]) for row in stats["top_hosts"]] == [(1001, 2), (1002, 1)]
+
+    run(scenario)
+
+
+def test_import_replace_is_atomic(run):
+    async def scenario(storage, guild_id):
+        await _run_sessions(storage, guild_id, [(1001, "Первый"), (1002, "Второй")])
+        await storage.log_action(guild_id, 1001, "number", "до импорта")
+        before = await storage.get_statistics(guild_id)
+        sessions_before = await _export_rows(storage, "sessions", guild_id)
+
+        with pytest.raises(RuntimeError):
+            await storage.import_guild_data(
+                guild_id, "Сервер", _batches(IMPORT_RECORDS, fail_after=2), replace=True
+            )
+
+        assert await storage.get_statistics(guild_id) == before
+        assert await _export_rows(storage, "sessions", guild_id) == sessions_before
+        logs = (await storage.get_logs_page(guild_id, limit=10))["logs"]
+        assert [log["details"] for log in logs] == ["до импорта"]
+
+    run(scenario)
+
+
+def test_rollups_match_raw_counts(run):
+    async def scenario(storage, guild_id):
+        await _run_sessions(storage, guild_id, [(1001, "Первый"), (1002, "Второй"), (1001, "Первый")])
+        raw = await storage.get_statistics(guild_id)
+
+        # Агрегаты ведутся при записи и совпадают с пересчётом по истории
+        assert await storage.get_statistics(guild_id, "week") == raw
+        await storage.backfill_host_rollups(guild_id)
+        assert await storage.get_statistics(guild_id, "week") == raw
+        await storage.backfill_host_rollups()
+        assert await storage.get_statistics(guild_id, "day") == raw
+
+        period_hosts = await storage.get_active_hosts(guild_id, "month")
+        assert [(row["user_id"], row["sessions_count"]) for row in period_hosts] == [(1001, 2), (1002, 1)]
+
+    run(scenario)
+
+
+def test_reconcile_guilds_with_shard_filter(run):
+    async def scenario(storage, guild_id):
+        stale, renamed, other_shard = guild_id, guild_id + 1, guild_id + OTHER_SHARD
+        new = guild_id + 2
+        await storage.ensure_guild_exists(stale, "Ушёл")
+        await storage.ensure_guild_exists(renamed, "Старое имя")
+        await storage.ensure_guild_exists(other_shard, "Чужой шард")
+        await storage.mark_guild_left(renamed)
+
+        # Процесс видит только шард 0 из 2: сервер шарда 1 не трогает
+        result = await storage.reconcile_guilds(
+            [(renamed, "Новое имя"), (new, "Новый")], shard_count=2, shard_ids=[0]
+        )
+        assert result["added"] == 1
+        assert result["left"] >= 1
+
+        names = {guild["guild_id"]: guild["guild_name"] for guild in await storage.list_guilds()}
+        assert names[renamed] == "Новое имя"
+        assert names[new] == "Новый"
+
+        departed = await storage.get_departed_guilds("9999-12-31 00:00:00", limit=10000)
+        assert stale in departed
+        assert renamed not in departed
+        assert new not in departed
+        assert other_shard not in departed
+
+    run(scenario)
+
+
+def test_purge_departed_guild(run):
+    async def scenario(storage, guild_id):
+        kept = guild_id + 1
+        for target in (guild_id, kept):
+            await _run_sessions(storage, target, [(1001, "Первый"), (1002, "Второй")])
+            for number in range(5):
+                await storage.log_action(target, 1001, "number", f"запись {number}")
+
+        # Пока сервер не отмечен ушедшим, данные не удаляются
+        assert await storage.purge_guild_data(guild_id, batch_size=2) == 0
+        assert (await storage.get_statistics(guild_id))["total_sessions"] == 2
+
+        await storage.mark_guild_left(guild_id)
+        while await storage.purge_guild_data(guild_id, batch_size=2):
+            pass
+
+        assert guild_id not in {guild["guild_id"] for guild in await storage.list_guilds()}
+        assert await _export_rows(storage, "sessions", guild_id) == []
+        assert (await storage.get_logs_page(guild_id))["logs"] == []
+        assert (await storage.get_statistics(guild_id, "week"))["total_sessions"] == 0
+
+        assert (await storage.get_statistics(kept))["total_sessions"] == 2
+        assert len((await storage.get_logs_page(kept))["logs"]) == 5
+
+    run(scenario)
+
+
+def test_meta_values(run):
+    async def scenario(storage, guild_id):
+        key = f"test_meta:{guild_id}"
+        assert await storage.get_meta(key) is None
+        await storage.set_meta(key, "первое")
+        await storage.set_meta(key, "второе")
+        assert await storage.get_meta(key) == "второе"
+
+    run(scenario)
+
+
+def test_period_window_excludes_old_sessions(run):
+    async def scenario(storage, guild_id):
+        now = datetime.utcnow()
+        started = [
+            (now - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            for days in (0, 3, 10, 40)
+        ]
+        records = [("host", {"user_id": 1001, "nickname": "Первый", "is_active": True})] + [
+            ("session", {"channel_id": number, "host_user_id": 1001, "participants_count": 2,
+                         "started_at": started_at, "ended_at": None})
+            for number, started_at in enumerate(started)
+        ]
+        await storage.import_guild_data(guild_id, "Сервер", _batches(records))
+
+        # Импорт пересчитывает агрегаты по истории; окна считаются от сегодняшнего дня
+        expected = {None: 4, "month": 3, "week": 2, "day": 1}
+        for period, total in expected.items():
+            stats = await storage.get_statistics(guild_id, period)
+            assert stats["total_sessions"] == total, period
+            assert [(row["user_id"], row["sessions_count"]) for row in stats["top_hosts"]] == [(1001, total)]
+
+        await storage.backfill_host_rollups(guild_id)
+        assert (await storage.get_statistics(guild_id, "week"))["total_sessions"] == 2
+
+    run(scenario)
+
+
+def test_logs_page_cursor(run):
+    async def scenario(storage, guild_id):
+        await storage.ensure_guild_exists(guild_id, "Тестовый сервер")
+        assert await storage.get_logs_page(guild_id, limit=10) == {"logs": [], "next_cursor": None}
+
+        for number in range(20):
+            await storage.log_action(guild_id, 1001, "number", f"запись {number}")
+
+        first = await storage.get_logs_page(guild_id, limit=10)
+        ids = [log["log_id"] for log in first["logs"]]
+        assert ids == sorted(ids, reverse=True)
+        # Курсор - последняя запись страницы
+        assert first["next_cursor"] == ids[-1]
+
+        # Новые записи не сдвигают уже открытые страницы
+        await storage.log_action(guild_id, 1001, "number", "новая")
+        second = await storage.get_logs_page(guild_id, before_id=first["next_cursor"], limit=10)
+        assert all(log["log_id"] < first["next_cursor"] for log in second["logs"])
+        assert [log["details"] for log in second["logs"]] == [f"запись {number}" for number in reversed(range(10))]
+        # Записей ровно на две страницы - третьей нет
+        assert second["next_cursor"] is None
+
+        assert (await storage.get_logs_page(guild_id, limit=1))["logs"][0]["details"] == "новая"
+
+    run(scenario)
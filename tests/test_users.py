@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетное разрешение ID пользователей
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from src.utils.users import UserResolver
+
+DELETED_USER = 404
+SLOW_USER = 500
+
+
+def _response(status):
+    return SimpleNamespace(status=status, reason="тест")
+
+
+class FakeBot:
+    def __init__(self, cached=()):
+        self.cached = {user_id: f"кэш {user_id}" for user_id in cached}
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    def get_user(self, user_id):
+        return self.cached.get(user_id)
+
+    def is_closed(self):
+        return False
+
+    async def fetch_user(self, user_id):
+        self.calls.append(user_id)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.5 if user_id == SLOW_USER else 0.01)
+            if user_id == DELETED_USER:
+                raise discord.NotFound(_response(404), "Unknown User")
+            return f"загружен {user_id}"
+        finally:
+            self.active -= 1
+
+
+def test_misses_fetched_once_with_limited_concurrency():
+    async def scenario():
+        bot = FakeBot(cached=[1])
+        resolver = UserResolver(bot, concurrency=2)
+        users = await resolver.resolve_many([1, 2, 3, 3, 4, 5, DELETED_USER])
+        again = await resolver.resolve_many([2, DELETED_USER])
+        return bot, resolver, users, again
+
+    bot, resolver, users, again = asyncio.run(scenario())
+
+    assert users[1] == "кэш 1"
+    assert users[3] == "загружен 3"
+    assert users[DELETED_USER] is None
+    assert sorted(bot.calls) == [2, 3, 4, 5, DELETED_USER]
+    assert bot.max_active == 2
+    # Повторный список - из кэша, включая «пользователь удалён»
+    assert again == {2: "загружен 2", DELETED_USER: None}
+    assert resolver.stats["not_found"] == 1 and resolver.stats["hits"] == 3
+
+
+def test_concurrent_lists_share_one_request():
+    async def scenario():
+        bot = FakeBot()
+        resolver = UserResolver(bot)
+        await asyncio.gather(resolver.resolve(7), resolver.resolve_many([7, 8]))
+        return bot.calls
+
+    assert sorted(asyncio.run(scenario())) == [7, 8]
+
+
+def test_slow_fetch_falls_back_and_fills_cache_later():
+    async def scenario():
+        bot = FakeBot()
+        resolver = UserResolver(bot, timeout=0.05)
+        first = await resolver.resolve(SLOW_USER)
+        await asyncio.sleep(0.6)
+        second = await resolver.resolve(SLOW_USER)
+        return first, second, bot.calls
+
+    assert asyncio.run(scenario()) == (None, f"загружен {SLOW_USER}", [SLOW_USER])
+
+
+def test_http_error_is_not_cached():
+    async def scenario():
+        bot = FakeBot()
+
+        async def unavailable(user_id):
+            bot.calls.append(user_id)
+            raise discord.HTTPException(_response(503), "Service Unavailable")
+
+        bot.fetch_user = unavailable
+        resolver = UserResolver(bot)
+        await resolver.resolve(9)
+        await resolver.resolve(9)
+        return bot.calls, resolver.stats["failed"]
+
+    assert asyncio.run(scenario()) == ([9, 9], 2)
+
+
+def test_cache_is_bounded():
+    async def scenario():
+        resolver = UserResolver(FakeBot(), max_entries=3)
+        await resolver.resolve_many(range(10, 16))
+        return list(resolver._cache)
+
+    assert asyncio.run(scenario()) == [13, 14, 15]